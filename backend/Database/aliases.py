@@ -0,0 +1,117 @@
+import os
+import time
+import threading
+
+# Course aliases for versioned collections.
+#
+# A course's collection is rebuilt as a new version ("aws__v20261019T120000") next to the one
+# being served, and the course name ("aws") is an alias pointing at whichever version is live.
+# Swapping the alias is one record write, so readers go from the complete old version to the
+# complete new one with nothing in between (see Database/reindex.py for the build, validation,
+# swap and garbage collection).
+#
+# Each alias is one record of a small collection, ALIAS_COLLECTION (id: the alias, metadata:
+# {"collection": collection name}), so every process sees them through the same store (embedded
+# files or the index server), and snapshots carry them along. Swaps of different aliases write
+# different records and cannot undo each other. Aliases set before they were records live in
+# that collection's metadata and are still read. A name without an alias resolves to itself,
+# which keeps unversioned collections working. Readers cache a resolution for
+# COLLECTION_ALIAS_TTL seconds, so a swap reaches every worker within that time.
+
+ALIAS_COLLECTION = "collection-aliases"
+VERSION_SEPARATOR = "__v"
+COLLECTION_ALIAS_TTL = float(os.getenv("COLLECTION_ALIAS_TTL", "5"))
+
+_resolved = {}   # alias -> (collection name, time.monotonic() when read)
+_resolved_lock = threading.Lock()
+
+
+def new_version():
+    """
+    Returns a version string for a collection built now (UTC, sortable).
+    """
+    return time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+
+
+def versioned_name(alias, version):
+    return f"{alias}{VERSION_SEPARATOR}{version}"
+
+
+def alias_of(collection_name):
+    """
+    Returns the alias a collection name is a version of (the name itself if unversioned).
+    """
+    return collection_name.split(VERSION_SEPARATOR, 1)[0]
+
+
+def _alias_collection(client):
+    try:
+        return client.get_collection(name=ALIAS_COLLECTION)
+    except Exception:
+        return None
+
+
+def get_aliases(client):
+    """
+    Returns {alias: collection name} as stored.
+    """
+    collection = _alias_collection(client)
+    if collection is None:
+        return {}
+    aliases = dict(collection.metadata or {})
+    records = collection.get(include=["metadatas"])
+    aliases.update((alias, metadata["collection"]) for alias, metadata in zip(records["ids"], records["metadatas"]))
+    return aliases
+
+
+def lookup(client, name):
+    """
+    Returns the collection an alias points to as stored, or None if name is not an alias.
+    """
+    collection = _alias_collection(client)
+    if collection is None:
+        return None
+    records = collection.get(ids=[name], include=["metadatas"])
+    if records["ids"]:
+        return records["metadatas"][0]["collection"]
+    return (collection.metadata or {}).get(name)
+
+
+def resolve(client, name, refresh=False):
+    """
+    Returns the collection name an alias points to, or name itself if it is not an alias.
+    Cached per process for COLLECTION_ALIAS_TTL seconds.
+    """
+    with _resolved_lock:
+        cached = _resolved.get(name)
+        if cached is not None and not refresh and time.monotonic() - cached[1] < COLLECTION_ALIAS_TTL:
+            return cached[0]
+    target = lookup(client, name) or name
+    with _resolved_lock:
+        _resolved[name] = (target, time.monotonic())
+    return target
+
+
+def set_alias(client, alias, collection_name):
+    """
+    Points an alias at a collection. Returns the collection it pointed to before (or None).
+    """
+    client.get_collection(name=collection_name)   # fails if the target does not exist
+    previous = lookup(client, alias)
+    collection = client.get_or_create_collection(name=ALIAS_COLLECTION)
+    # Records need an embedding; the alias collection is never queried by vector.
+    collection.upsert(ids=[alias], embeddings=[[0.0]], metadatas=[{"collection": collection_name}])
+    with _resolved_lock:
+        _resolved[alias] = (collection_name, time.monotonic())
+    return previous
+
+
+def versions(client, alias):
+    """
+    Returns the names of every collection holding a version of alias, oldest first: the
+    unversioned collection named alias (if any), then alias__v<version> in version order.
+    """
+    names = [c if isinstance(c, str) else c.name for c in client.list_collections()]
+    prefix = alias + VERSION_SEPARATOR
+    found = sorted(name for name in names if name.startswith(prefix) and "__" not in name[len(prefix):])
+    return ([alias] if alias in names else []) + found
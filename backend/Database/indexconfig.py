@@ -0,0 +1,229 @@
+import os
+import sys
+import time
+import argparse
+from dataclasses import dataclass, asdict
+
+# Add project root to Python path to resolve module imports
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from Database.vectorstore import open_client
+from Database import aliases
+
+# HNSW index settings for Chroma collections.
+#
+#   space            distance: "l2" (squared L2, Chroma's default), "cosine" or "ip"
+#   construction_ef  candidate list size while inserting; higher builds a better graph, slower
+#   search_ef        candidate list size while querying; higher raises recall and latency
+#   M                neighbours per node; higher raises recall, memory and build time
+#
+# Ingestion creates collections with index_config_from_env() (INDEX_SPACE, INDEX_CONSTRUCTION_EF,
+# INDEX_SEARCH_EF, INDEX_M). The settings are stored as the collection's "hnsw:*" metadata, so
+# snapshots carry them along. space, construction_ef and M are fixed when a collection is built:
+# changing them needs a rebuild, which copies the live version of the course (records and
+# centroids) into a new version with the new settings and swaps the course alias to it
+# (Database/reindex.py), so the course is served throughout. search_ef can be changed in place;
+# a process that already has the index loaded keeps the old value, so restart the workers (or
+# the index server) afterwards.
+#
+# Usage (from the backend directory):
+#   python Database/indexconfig.py show aws
+#   python Database/indexconfig.py rebuild aws --config space=cosine,M=32,construction_ef=200,search_ef=64
+#   python Database/indexconfig.py set-search-ef aws 128
+#
+# Pick values with benchmarks/ann_sweep.py.
+
+SPACES = ("l2", "cosine", "ip")
+REBUILD_PAGE_SIZE = int(os.getenv("INDEX_REBUILD_PAGE_SIZE", "5000"))
+
+
+@dataclass
+class IndexConfig:
+    space: str = "l2"
+    construction_ef: int = 100
+    search_ef: int = 100
+    M: int = 16
+
+    def __post_init__(self):
+        if self.space not in SPACES:
+            raise ValueError(f"space must be one of {', '.join(SPACES)}, got '{self.space}'")
+        for name in ("construction_ef", "search_ef", "M"):
+            if int(getattr(self, name)) < 1:
+                raise ValueError(f"{name} must be a positive integer")
+            setattr(self, name, int(getattr(self, name)))
+
+    def metadata(self):
+        """
+        Returns the collection metadata that creates an index with these settings.
+        """
+        return {"hnsw:space": self.space, "hnsw:construction_ef": self.construction_ef,
+                "hnsw:search_ef": self.search_ef, "hnsw:M": self.M}
+
+    def __str__(self):
+        return ",".join(f"{key}={value}" for key, value in asdict(self).items())
+
+
+def index_config_from_env():
+    """
+    Returns the index settings for new collections, from INDEX_* environment variables.
+    """
+    return IndexConfig(space=os.getenv("INDEX_SPACE", "l2"),
+                       construction_ef=int(os.getenv("INDEX_CONSTRUCTION_EF", "100")),
+                       search_ef=int(os.getenv("INDEX_SEARCH_EF", "100")),
+                       M=int(os.getenv("INDEX_M", "16")))
+
+
+def parse_index_config(text, base=None):
+    """
+    Parses "space=cosine,M=32,construction_ef=200,search_ef=64"; keys left out keep their value in base.
+    """
+    values = asdict(base or IndexConfig())
+    for part in filter(None, (part.strip() for part in text.split(","))):
+        key, _, value = part.partition("=")
+        if key not in values:
+            raise ValueError(f"Unknown index setting '{key}'; expected one of {', '.join(values)}")
+        values[key] = value if key == "space" else int(value)
+    return IndexConfig(**values)
+
+
+def index_config_from_metadata(metadata):
+    """
+    Returns the settings recorded in "hnsw:*" collection metadata (the values at creation).
+    """
+    metadata = metadata or {}
+    return IndexConfig(space=metadata.get("hnsw:space", "l2"),
+                       construction_ef=metadata.get("hnsw:construction_ef", 100),
+                       search_ef=metadata.get("hnsw:search_ef", 100),
+                       M=metadata.get("hnsw:M", 16))
+
+
+def index_config_of(collection):
+    """
+    Returns the settings a collection's index was actually built with.
+    """
+    hnsw = (getattr(collection, "configuration", None) or {}).get("hnsw") or {}
+    metadata = collection.metadata or {}
+    return IndexConfig(space=hnsw.get("space", metadata.get("hnsw:space", "l2")),
+                       construction_ef=hnsw.get("ef_construction", metadata.get("hnsw:construction_ef", 100)),
+                       search_ef=hnsw.get("ef_search", metadata.get("hnsw:search_ef", 100)),
+                       M=hnsw.get("max_neighbors", metadata.get("hnsw:M", 16)))
+
+
+def collection_space(collection):
+    """
+    Returns the distance space of a collection ("l2", "cosine" or "ip").
+    """
+    try:
+        return index_config_of(collection).space
+    except ValueError:
+        return "l2"
+
+
+def get_or_create_collection(client, name, config=None, metadata=None):
+    """
+    Returns a collection, creating it with the given settings (default: index_config_from_env())
+    and any other metadata (non-"hnsw:" keys, e.g. a version). An existing collection is returned
+    as it is; if its index was built with different fixed settings a warning is printed, since
+    only a rebuild can change them.
+    """
+    config = config or index_config_from_env()
+    try:
+        collection = client.get_collection(name=name)
+    except Exception:
+        extra = {key: value for key, value in (metadata or {}).items() if not key.startswith("hnsw:")}
+        return client.create_collection(name=name, metadata={**extra, **config.metadata()})
+    current = index_config_of(collection)
+    if (current.space, current.construction_ef, current.M) != (config.space, config.construction_ef, config.M):
+        print(f"Warning: collection '{name}' has index settings {current}, not {config}; "
+              f"run `python Database/indexconfig.py rebuild {name}` to apply them.")
+    return collection
+
+
+def set_search_ef(collection, search_ef):
+    """
+    Changes a collection's query-time search_ef in place (no rebuild needed). It is stored with
+    the collection and used by processes that load the index afterwards. Only the index
+    configuration changes: Chroma refuses metadata updates that carry "hnsw:space", so the
+    "hnsw:search_ef" metadata keeps the creation value and index_config_of() reads the configuration.
+    """
+    collection.modify(configuration={"hnsw": {"ef_search": int(search_ef)}})
+
+
+def copy_records(source, target, page_size=REBUILD_PAGE_SIZE, throttle=None):
+    """
+    Copies every record (ids, embeddings, documents, metadata) of one collection into another.
+
+    Returns:
+        int: Number of records copied.
+    """
+    count = source.count()
+    for offset in range(0, count, page_size):
+        page = source.get(include=["embeddings", "documents", "metadatas"], limit=page_size, offset=offset)
+        target.add(ids=page["ids"], embeddings=page["embeddings"], documents=page["documents"],
+                   metadatas=page["metadatas"])
+        if throttle is not None:
+            throttle(len(page["ids"]))
+    return count
+
+
+def rebuild_collection(client, name, config, page_size=REBUILD_PAGE_SIZE, gc_grace=None):
+    """
+    Rebuilds a course collection's index with new settings, as a new version (Database/reindex.py):
+    the live version's records and centroids are copied into it, no model inference involved; it
+    is validated and the alias swapped to it, so the course is served throughout.
+
+    Returns:
+        int: Number of records copied.
+    """
+    from Database import reindex
+    from Embedding.centroids import docs_collection_name
+
+    live_name = aliases.resolve(client, name, refresh=True)
+    source = client.get_collection(name=live_name)
+
+    def copy(directory, new_name, client, index_config, throttle):
+        copied = copy_records(source, client.get_collection(name=new_name), page_size, throttle)
+        try:
+            docs = client.get_collection(name=docs_collection_name(live_name))
+        except Exception:
+            return copied
+        copy_records(docs, get_or_create_collection(client, docs_collection_name(new_name), index_config), page_size)
+        return copied
+
+    report = reindex.reindex(aliases.alias_of(name), None, client=client, chunks_per_second=0,
+                             gc_grace=reindex.REINDEX_GC_GRACE if gc_grace is None else gc_grace,
+                             ingest=copy, throttle_process=False, index_config=config)
+    return report["records"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show, rebuild or tune the HNSW index of collections.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    show_cmd = commands.add_parser("show", help="Print the index settings of collections.")
+    show_cmd.add_argument("collections", nargs="*", help="Default: every collection.")
+    rebuild_cmd = commands.add_parser("rebuild", help="Rebuild collections with new index settings.")
+    rebuild_cmd.add_argument("collections", nargs="+")
+    rebuild_cmd.add_argument("--config", default="", help="e.g. space=cosine,M=32 (default: INDEX_* environment)")
+    rebuild_cmd.add_argument("--gc-grace", type=float, default=None,
+                             help="Seconds the previous version is kept after the swap (default: REINDEX_GC_GRACE).")
+    ef_cmd = commands.add_parser("set-search-ef", help="Change search_ef in place.")
+    ef_cmd.add_argument("collection")
+    ef_cmd.add_argument("search_ef", type=int)
+    args = parser.parse_args()
+
+    client = open_client()
+    if args.command == "show":
+        names = args.collections or [c if isinstance(c, str) else c.name for c in client.list_collections()]
+        for name in names:
+            collection = client.get_collection(name=aliases.resolve(client, name))
+            print(f"{name}: {index_config_of(collection)} ({collection.count()} records)")
+    elif args.command == "rebuild":
+        config = parse_index_config(args.config, index_config_from_env())
+        for name in args.collections:
+            started = time.perf_counter()
+            copied = rebuild_collection(client, name, config, gc_grace=args.gc_grace)
+            print(f"Rebuilt '{name}' ({copied} records) with {config} in {time.perf_counter() - started:.1f}s")
+    else:
+        set_search_ef(client.get_collection(name=aliases.resolve(client, args.collection)), args.search_ef)
+        print(f"Set search_ef={args.search_ef} on '{args.collection}'; restart workers to pick it up")
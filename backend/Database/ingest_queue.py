@@ -0,0 +1,563 @@
+import os
+import sys
+import json
+import time
+import base64
+import logging
+import argparse
+import threading
+import multiprocessing
+
+# Add project root to Python path to resolve module imports
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from Database.vectorstore import open_client
+from Database.indexconfig import get_or_create_collection, index_config_from_env, index_config_of
+from Database import aliases
+
+# Distributed ingestion through a Redis work queue.
+#
+# A coordinator splits a directory of course material into tasks:
+#   extract  one PDF page range (INGEST_EXTRACT_PAGES pages, text + image OCR) or one PPTX file
+#   embed    INGEST_EMBED_CHUNKS chunk records: embeddings and keywords
+# Any number of worker processes, on any machine that sees the source files and the Redis at
+# REDIS_URL, pull tasks and store their results back in Redis. The coordinator assembles each
+# document's .txt from its extract results, chunks and deduplicates it (cheap, text only), queues
+# its embed tasks, and bulk-upserts the document into the collection once every embed result is in.
+#
+# A claimed task is invisible to other workers for INGEST_VISIBILITY_TIMEOUT seconds; the worker
+# extends that while it runs. A task whose worker died reappears in the queue, and a task that
+# raised is retried, up to INGEST_MAX_ATTEMPTS attempts. Task ids are derived from the document
+# and page range, results are stored first-writer-wins and the collection writes are upserts, so a
+# task that runs twice or a coordinator that is restarted gives the same collection.
+#
+# Usage (from the backend directory):
+#   python Database/ingest_queue.py worker --processes 4          # on every ingest machine
+#   python Database/ingest_queue.py run ../Data/aws               # once, next to the collection
+#
+# Locally, without a Redis server (fakeredis must be installed):
+#   python Database/ingest_queue.py fake-redis --port 6390
+#   REDIS_URL=redis://127.0.0.1:6390/0 python Database/ingest_queue.py worker --processes 4
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+INGEST_VISIBILITY_TIMEOUT = float(os.getenv("INGEST_VISIBILITY_TIMEOUT", "300"))
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "3"))
+INGEST_EXTRACT_PAGES = int(os.getenv("INGEST_EXTRACT_PAGES", "10"))
+INGEST_EMBED_CHUNKS = int(os.getenv("INGEST_EMBED_CHUNKS", "128"))
+INGEST_POLL_SECONDS = float(os.getenv("INGEST_POLL_SECONDS", "0.2"))
+COMMIT_BATCH_SIZE = 5000   # records per upsert, below Chroma's maximum batch size
+
+REDIS_JOBS_NAME = "ingest:jobs"   # set of job names with queued work
+REDIS_JOB_PREFIX = "ingest:job:"  # + "<job>:" + tasks | pending | processing | attempts | results | failed | committed
+
+# Moves the oldest pending task to the processing set, invisible until now + visibility timeout.
+# Returns the task id, or false when nothing is pending.
+CLAIM_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local task_id = redis.call('RPOP', KEYS[1])
+if not task_id then
+    return false
+end
+redis.call('ZADD', KEYS[2], now + tonumber(ARGV[1]), task_id)
+redis.call('HINCRBY', KEYS[3], task_id, 1)
+return task_id
+"""
+
+# Pushes the deadline of a task that is still being processed. Returns 0 if it is not anymore.
+EXTEND_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+if not redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), ARGV[1])
+return 1
+"""
+
+# Stores a task result unless one is already stored (first writer wins) and takes the task off
+# the processing set and the pending list. Returns 1 if this result was stored.
+COMPLETE_SCRIPT = """
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('LREM', KEYS[2], 0, ARGV[1])
+return redis.call('HSETNX', KEYS[3], ARGV[1], ARGV[2])
+"""
+
+# Gives a task that raised back to the queue, or marks it failed after ARGV[3] attempts.
+# Returns 0 if the task was no longer held (its visibility timeout had expired), 1 if requeued, 2 if failed.
+FAIL_SCRIPT = """
+if redis.call('ZREM', KEYS[1], ARGV[1]) == 0 then
+    return 0
+end
+if tonumber(redis.call('HGET', KEYS[3], ARGV[1]) or '0') >= tonumber(ARGV[3]) then
+    redis.call('HSET', KEYS[4], ARGV[1], ARGV[2])
+    return 2
+end
+redis.call('LPUSH', KEYS[2], ARGV[1])
+return 1
+"""
+
+# Requeues every task whose visibility timeout expired (its worker died or stalled), or marks it
+# failed after ARGV[1] attempts. Tasks that have a result by now are dropped. Returns the number requeued.
+REAP_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now)
+local requeued = 0
+for _, task_id in ipairs(expired) do
+    redis.call('ZREM', KEYS[1], task_id)
+    if redis.call('HEXISTS', KEYS[5], task_id) == 0 then
+        if tonumber(redis.call('HGET', KEYS[3], task_id) or '0') >= tonumber(ARGV[1]) then
+            redis.call('HSET', KEYS[4], task_id, 'visibility timeout expired on every attempt')
+        else
+            redis.call('LPUSH', KEYS[2], task_id)
+            requeued = requeued + 1
+        end
+    end
+end
+return requeued
+"""
+
+# Queues a task unless it is already queued, running or done. A failed task is queued again
+# with its attempts reset. Returns 1 if the task was queued.
+ENQUEUE_SCRIPT = """
+if redis.call('HEXISTS', KEYS[4], ARGV[1]) == 1 then
+    return 0
+end
+if redis.call('HDEL', KEYS[5], ARGV[1]) == 0 and redis.call('HSETNX', KEYS[1], ARGV[1], ARGV[2]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+redis.call('HDEL', KEYS[3], ARGV[1])
+redis.call('LPUSH', KEYS[2], ARGV[1])
+return 1
+"""
+
+
+class TaskQueue:
+    """
+    Reliable task queue for one ingestion job, shared by the coordinator and every worker.
+    Each state change is one Lua script call.
+    """
+
+    def __init__(self, client, job, visibility_timeout=INGEST_VISIBILITY_TIMEOUT, max_attempts=INGEST_MAX_ATTEMPTS):
+        self.r = client
+        self.job = job
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        prefix = f"{REDIS_JOB_PREFIX}{job}:"
+        self.tasks_key, self.pending_key, self.processing_key = prefix + "tasks", prefix + "pending", prefix + "processing"
+        self.attempts_key, self.results_key, self.failed_key = prefix + "attempts", prefix + "results", prefix + "failed"
+        self.committed_key = prefix + "committed"
+        self._claim, self._extend, self._complete, self._fail, self._reap, self._enqueue = scripts = [
+            client.register_script(script)
+            for script in (CLAIM_SCRIPT, EXTEND_SCRIPT, COMPLETE_SCRIPT, FAIL_SCRIPT, REAP_SCRIPT, ENQUEUE_SCRIPT)]
+        # Load the scripts up front rather than on a first NOSCRIPT reply: the fakeredis server
+        # used as a local stand-in drops the connection after any error reply.
+        for script in scripts:
+            client.script_load(script.script)
+
+    def enqueue(self, task_id, task):
+        """
+        Queues a task (a JSON-serialisable dict with a "type"). Idempotent per task id.
+
+        Returns:
+            bool: True if the task was queued now.
+        """
+        self.r.sadd(REDIS_JOBS_NAME, self.job)
+        keys = [self.tasks_key, self.pending_key, self.attempts_key, self.results_key, self.failed_key]
+        return bool(self._enqueue(keys=keys, args=[task_id, json.dumps(task)]))
+
+    def claim(self):
+        """
+        Returns (task id, task) for the oldest pending task, now held by the caller, or None.
+        """
+        task_id = self._claim(keys=[self.pending_key, self.processing_key, self.attempts_key],
+                              args=[self.visibility_timeout])
+        if not task_id:
+            return None
+        task_id = task_id.decode()
+        raw = self.r.hget(self.tasks_key, task_id)
+        return (task_id, json.loads(raw)) if raw is not None else None
+
+    def extend(self, task_id):
+        return bool(self._extend(keys=[self.processing_key], args=[task_id, self.visibility_timeout]))
+
+    def complete(self, task_id, result):
+        """
+        Stores a task's result. Returns False if another attempt had already stored one.
+        """
+        return bool(self._complete(keys=[self.processing_key, self.pending_key, self.results_key],
+                                   args=[task_id, json.dumps(result)]))
+
+    def fail(self, task_id, error):
+        keys = [self.processing_key, self.pending_key, self.attempts_key, self.failed_key]
+        return self._fail(keys=keys, args=[task_id, error, self.max_attempts])
+
+    def reap(self):
+        keys = [self.processing_key, self.pending_key, self.attempts_key, self.failed_key, self.results_key]
+        return self._reap(keys=keys, args=[self.max_attempts])
+
+    def results(self, task_ids):
+        """
+        Returns {task id: result} for those of task_ids that have a result.
+        """
+        if not task_ids:
+            return {}
+        values = self.r.hmget(self.results_key, task_ids)
+        return {task_id: json.loads(value) for task_id, value in zip(task_ids, values) if value is not None}
+
+    def failures(self):
+        return {k.decode(): v.decode() for k, v in self.r.hgetall(self.failed_key).items()}
+
+    def counts(self):
+        pipe = self.r.pipeline()
+        pipe.llen(self.pending_key)
+        pipe.zcard(self.processing_key)
+        pipe.hlen(self.results_key)
+        pipe.hlen(self.failed_key)
+        return dict(zip(("pending", "processing", "done", "failed"), pipe.execute()))
+
+    def is_committed(self, source):
+        return bool(self.r.sismember(self.committed_key, source))
+
+    def mark_committed(self, source):
+        self.r.sadd(self.committed_key, source)
+
+    def clear(self):
+        """
+        Deletes the job's tasks, results and bookkeeping.
+        """
+        self.r.delete(self.tasks_key, self.pending_key, self.processing_key, self.attempts_key,
+                      self.results_key, self.failed_key, self.committed_key)
+        self.r.srem(REDIS_JOBS_NAME, self.job)
+
+
+def connect(redis_url=REDIS_URL):
+    """
+    Returns a Redis client for the ingestion queue. Unlike the paper jobs there is no in-process
+    fallback: coordinator and workers are separate processes, so they need a shared Redis.
+    """
+    import redis
+    client = redis.Redis.from_url(redis_url, socket_connect_timeout=5)
+    client.ping()
+    return client
+
+
+def active_jobs(client):
+    return sorted(job.decode() for job in client.smembers(REDIS_JOBS_NAME))
+
+
+# --- Task handlers (run by workers) ---
+
+def encode_embeddings(embeddings):
+    return {"dtype": str(embeddings.dtype), "shape": list(embeddings.shape),
+            "data": base64.b64encode(embeddings.tobytes()).decode("ascii")}
+
+
+def decode_embeddings(encoded):
+    import numpy as np
+    return np.frombuffer(base64.b64decode(encoded["data"]), dtype=encoded["dtype"]).reshape(encoded["shape"])
+
+
+def run_extract_task(task):
+    """
+    Extracts the text of one PDF page range or one PPTX file.
+    """
+    # The extractors import their helpers as top-level modules, as when run as scripts. Once
+    # Preprocessing/ is on the path "Preprocessing" names Preprocessing/Preprocessing.py, so they
+    # are imported by their own names too.
+    preprocessing_dir = os.path.join(project_root, "Preprocessing")
+    if preprocessing_dir not in sys.path:
+        sys.path.insert(0, preprocessing_dir)
+    if task["kind"] == "pptx":
+        from texteractionppt import pptx_text
+        return {"text": pptx_text(task["path"])}
+    from texteractionpdf import extract_pdf_pages
+    return {"text": extract_pdf_pages(task["path"], task["page_start"], task["page_end"])}
+
+
+def run_embed_task(task):
+    """
+    Embeds and keywords a slice of a document's chunk records.
+    """
+    from Embedding.chunkrecord import ChunkBatch, ChunkRecord
+    from Embedding.sbert import embed_batch
+    from Embedding.keywordextraction import extract_keywords_batch
+
+    batch = ChunkBatch(task["source"], [ChunkRecord(chunk_id, task["source"], page, text)
+                                        for chunk_id, page, text in task["records"]])
+    embed_batch(batch)
+    extract_keywords_batch(batch)
+    return {"ids": batch.ids, "embeddings": encode_embeddings(batch.embeddings),
+            "keywords": [record.keywords for record in batch]}
+
+
+TASK_HANDLERS = {"extract": run_extract_task, "embed": run_embed_task}
+
+
+def run_task(queue, task_id, task, handlers):
+    """
+    Runs one claimed task, extending its visibility timeout while it runs, and records the outcome.
+    """
+    stop = threading.Event()
+
+    def keep_alive():
+        while not stop.wait(queue.visibility_timeout / 3):
+            if not queue.extend(task_id):
+                return
+
+    heartbeat = threading.Thread(target=keep_alive, daemon=True)
+    heartbeat.start()
+    try:
+        result = handlers[task["type"]](task)
+    except Exception as e:
+        logging.error(f"Ingest task {task_id} failed: {e}")
+        queue.fail(task_id, f"{type(e).__name__}: {e}")
+        return False
+    finally:
+        stop.set()
+    queue.complete(task_id, result)
+    return True
+
+
+def worker_loop(redis_url=REDIS_URL, handlers=None, jobs=None, idle_exit=None, stop_event=None,
+                poll_seconds=INGEST_POLL_SECONDS):
+    """
+    Pulls tasks from every active job (or only `jobs`) and runs them until stop_event is set, or
+    until idle_exit seconds pass without a task.
+
+    Returns:
+        int: Number of tasks run.
+    """
+    handlers = handlers or TASK_HANDLERS
+    client = connect(redis_url)
+    queues = {}
+    ran, idle_since = 0, time.monotonic()
+    while stop_event is None or not stop_event.is_set():
+        claimed = None
+        try:
+            for job in jobs or active_jobs(client):
+                queue = queues.get(job) or queues.setdefault(job, TaskQueue(client, job))
+                claimed = queue.claim()
+                if claimed:
+                    break
+        except Exception as e:
+            logging.error(f"Ingest queue unavailable: {e}")
+            time.sleep(max(poll_seconds, 1))
+            continue
+        if claimed is None:
+            if idle_exit is not None and time.monotonic() - idle_since > idle_exit:
+                break
+            time.sleep(poll_seconds)
+            continue
+        run_task(queue, *claimed, handlers)
+        ran += 1
+        idle_since = time.monotonic()
+    return ran
+
+
+def start_workers(processes, redis_url=REDIS_URL, idle_exit=None):
+    """
+    Starts worker processes (each loads its own embedding model). Returns the processes.
+    """
+    workers = [multiprocessing.Process(target=worker_loop, kwargs={"redis_url": redis_url, "idle_exit": idle_exit},
+                                       name=f"ingest-worker-{i}") for i in range(processes)]
+    for worker in workers:
+        worker.start()
+    return workers
+
+
+# --- Coordinator ---
+
+def source_files(directory, re_extract=False):
+    """
+    Returns the documents of a directory, sorted, as (source file, text file, extract) tuples.
+    Source files whose .txt exists are not extracted again unless re_extract is set; a .txt
+    without its source file is ingested as is.
+    """
+    names = set(os.listdir(directory))
+    documents = {}   # source name -> whether it needs extracting
+    for name in names:
+        if name.endswith((".pdf", ".pptx")):
+            documents[name] = re_extract or name + ".txt" not in names
+        elif name.endswith((".pdf.txt", ".pptx.txt")):
+            documents.setdefault(name[:-len(".txt")], False)
+    return [(os.path.join(directory, name), os.path.join(directory, name + ".txt"), extract)
+            for name, extract in sorted(documents.items())]
+
+
+def extract_tasks(path, pages_per_task=INGEST_EXTRACT_PAGES):
+    """
+    Returns {task id: task} for extracting one source file, in page order.
+    """
+    source = os.path.basename(path)
+    if path.endswith(".pptx"):
+        return {f"extract:{source}": {"type": "extract", "kind": "pptx", "path": os.path.abspath(path)}}
+    import pymupdf
+    with pymupdf.open(path) as doc:
+        page_count = doc.page_count
+    return {f"extract:{source}:{start}-{min(start + pages_per_task - 1, page_count)}":
+            {"type": "extract", "kind": "pdf", "path": os.path.abspath(path), "page_start": start,
+             "page_end": min(start + pages_per_task - 1, page_count)}
+            for start in range(1, page_count + 1, pages_per_task)}
+
+
+def embed_tasks(batch, chunks_per_task=INGEST_EMBED_CHUNKS):
+    """
+    Returns {task id: task} embedding the records of a chunked (and deduplicated) ChunkBatch.
+    """
+    records = batch.records
+    return {f"embed:{batch.source_document}:{records[start].id}":
+            {"type": "embed", "source": batch.source_document,
+             "records": [[record.id, record.page_number, record.text] for record in records[start:start + chunks_per_task]]}
+            for start in range(0, len(records), chunks_per_task)}
+
+
+def commit_document(collection, docs_collection, batch, results):
+    """
+    Fills a ChunkBatch from its embed results and upserts it and its centroids.
+    """
+    import numpy as np
+    from Embedding.centroids import batch_centroids
+
+    keywords, embeddings = {}, []
+    for result in results:
+        keywords.update(zip(result["ids"], result["keywords"]))
+        embeddings.append(decode_embeddings(result["embeddings"]))
+    for record in batch:
+        record.keywords = keywords[record.id]
+    batch.set_embeddings(np.concatenate(embeddings))
+    rows = batch.to_chroma()
+    for start in range(0, len(batch), COMMIT_BATCH_SIZE):
+        collection.upsert(**{key: value[start:start + COMMIT_BATCH_SIZE] for key, value in rows.items()})
+    docs_collection.upsert(**batch_centroids(batch))
+
+
+def run_coordinator(directory, collection_name=None, job=None, client=None, redis_url=REDIS_URL,
+                    dedup=True, re_extract=False, extract_pages=INGEST_EXTRACT_PAGES, embed_chunks=INGEST_EMBED_CHUNKS,
+                    poll_seconds=INGEST_POLL_SECONDS, progress_seconds=10):
+    """
+    Ingests a directory through the work queue and waits until every document is committed.
+    Safe to rerun after a crash: finished tasks and committed documents are not repeated.
+
+    Returns:
+        dict: Counts of documents, tasks and stored chunks.
+    """
+    from Embedding.chunking import create_chunk_batch
+    from Embedding.dedup import ChunkDeduplicator
+    from Embedding.centroids import docs_collection_name
+
+    client = client or open_client()
+    # A course alias is written through to the version it serves (Database/aliases.py);
+    # Database/reindex.py passes a new version's name to build it without touching the live one.
+    collection_name = aliases.resolve(client, collection_name or os.path.basename(os.path.normpath(directory)))
+    queue = TaskQueue(connect(redis_url), job or collection_name)
+    collection = get_or_create_collection(client, collection_name, index_config_from_env())
+    docs_collection = get_or_create_collection(client, docs_collection_name(collection_name), index_config_of(collection))
+    deduplicator = ChunkDeduplicator() if dedup else None
+
+    documents = [{"path": path, "text_path": text_path, "source": os.path.basename(path),
+                  "extract": extract_tasks(path, extract_pages) if extract else {}, "batch": None, "embed": None}
+                 for path, text_path, extract in source_files(directory, re_extract)]
+    for document in documents:
+        for task_id, task in document["extract"].items():
+            queue.enqueue(task_id, task)
+
+    stats = {"documents": len(documents), "extract_tasks": sum(len(d["extract"]) for d in documents),
+             "embed_tasks": 0, "chunks": 0}
+    next_to_chunk, committed, last_progress = 0, 0, time.monotonic()
+    while committed < len(documents):
+        queue.reap()
+        failures = queue.failures()
+        if failures:
+            raise RuntimeError(f"{len(failures)} ingest task(s) failed; fix and rerun to retry them: {failures}")
+
+        # Chunk and deduplicate documents in directory order as their text becomes available, so
+        # the canonical copy of a repeated slide does not depend on which worker finished first.
+        while next_to_chunk < len(documents):
+            document = documents[next_to_chunk]
+            if document["extract"]:
+                results = queue.results(list(document["extract"]))
+                if len(results) < len(document["extract"]):
+                    break
+                text = chr(12).join(results[task_id]["text"] for task_id in document["extract"])
+                with open(document["text_path"], "wb") as f:
+                    f.write(text.encode("utf-8"))
+            batch = create_chunk_batch(document["text_path"])
+            if deduplicator is not None:
+                deduplicator.filter_batch(batch)
+            document["batch"], document["embed"] = batch, embed_tasks(batch, embed_chunks)
+            stats["embed_tasks"] += len(document["embed"])
+            if not queue.is_committed(document["source"]):
+                for task_id, task in document["embed"].items():
+                    queue.enqueue(task_id, task)
+            next_to_chunk += 1
+
+        for document in documents[:next_to_chunk]:
+            if document.get("done"):
+                continue
+            if not queue.is_committed(document["source"]):
+                results = queue.results(list(document["embed"]))
+                if len(results) < len(document["embed"]):
+                    continue
+                if len(document["batch"]):
+                    commit_document(collection, docs_collection, document["batch"],
+                                    [results[task_id] for task_id in document["embed"]])
+                queue.mark_committed(document["source"])
+            document["done"] = True
+            stats["chunks"] += len(document["batch"])
+            committed += 1
+
+        if time.monotonic() - last_progress > progress_seconds:
+            print(f"{committed}/{len(documents)} documents committed; tasks {queue.counts()}")
+            last_progress = time.monotonic()
+        if committed < len(documents):
+            time.sleep(poll_seconds)
+
+    if deduplicator is not None:
+        # Canonical chunks committed before a later document repeated them get its references.
+        for update in deduplicator.pending_updates():
+            collection.update(**update)
+        stats["duplicates_removed"] = deduplicator.removed
+    queue.clear()
+    return stats
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Distributed ingestion over a Redis work queue.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    worker_cmd = commands.add_parser("worker", help="Run ingest workers against REDIS_URL.")
+    worker_cmd.add_argument("--processes", type=int, default=1)
+    worker_cmd.add_argument("--idle-exit", type=float, default=None, help="Exit after this many idle seconds.")
+    run_cmd = commands.add_parser("run", help="Queue a directory and commit it into a collection.")
+    run_cmd.add_argument("directory")
+    run_cmd.add_argument("--collection", default=None, help="Default: the directory name.")
+    run_cmd.add_argument("--job", default=None, help="Default: the collection name.")
+    run_cmd.add_argument("--re-extract", action="store_true", help="Extract sources that already have a .txt.")
+    run_cmd.add_argument("--no-dedup", action="store_true")
+    commands.add_parser("status", help="Print task counts of active jobs.")
+    fake_cmd = commands.add_parser("fake-redis", help="Serve an in-memory Redis stand-in (needs fakeredis).")
+    fake_cmd.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+
+    if args.command == "worker":
+        print(f"Running {args.processes} ingest worker process(es) against {REDIS_URL}")
+        for worker in start_workers(args.processes, idle_exit=args.idle_exit):
+            worker.join()
+    elif args.command == "run":
+        started = time.perf_counter()
+        stats = run_coordinator(args.directory, args.collection, args.job, dedup=not args.no_dedup,
+                                re_extract=args.re_extract)
+        print(f"Ingested {stats} in {time.perf_counter() - started:.1f}s")
+    elif args.command == "status":
+        client = connect()
+        for job in active_jobs(client):
+            print(f"{job}: {TaskQueue(client, job).counts()}")
+    else:
+        from fakeredis import TcpFakeServer
+        server = TcpFakeServer(("127.0.0.1", args.port), server_type="redis")
+        print(f"Fake Redis listening on redis://127.0.0.1:{args.port}/0")
+        server.serve_forever()
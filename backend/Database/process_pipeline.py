@@ -1,60 +1,111 @@
 import sys
 import os
-import chromadb
+import argparse
 
 # Add project root to Python path to resolve module imports
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.insert(0, project_root)
 
-from Embedding.process_pipline import process_pipeline
+from Embedding.process_pipline import process_document
+from Embedding.dedup import ChunkDeduplicator
+from Embedding.centroids import batch_centroids, docs_collection_name
+from Database.vectorstore import open_client
+from Database.indexconfig import get_or_create_collection, index_config_from_env, index_config_of
+from Database import aliases
+from Preprocessing.pagerender import prerender_document
 
 dir = "../Data/aws"
 
-for filename in os.listdir(dir):
-    if filename.endswith(".txt"):
-        file_path = os.path.join(dir, filename)
-        chunk_package = process_pipeline(file_path)
+# Set PRERENDER_PAGES=1 to render a preview of every page that can be cited (every page with a
+# chunk) into the page cache while ingesting, so the first citation preview is already warm.
+PRERENDER_PAGES = os.getenv("PRERENDER_PAGES", "0") == "1"
 
-        list_of_packages = chunk_package
+# Repeated slides (title, agenda, reused figures) are stored once per collection: later copies
+# are dropped before embedding and cited through the canonical chunk's references. DEDUP_CHUNKS=0
+# stores every chunk.
+DEDUP_CHUNKS = os.getenv("DEDUP_CHUNKS", "1") == "1"
 
-        # --- 1. Create a ChromaDB Client ---
-        # The line below creates an in-memory instance of ChromaDB, which does not save files.
-        # client = chromadb.Client()
+# Running this script builds a new version of the course collection next to the live one and
+# swaps the course alias to it once it is complete and validated (Database/reindex.py), so
+# answers never come from a half-populated index. --in-place adds to the live collection instead.
 
-        # To save the database to disk, use PersistentClient.
-        # This will create a 'db' directory inside your 'Database' folder to store the database files.
-        db_path = os.path.join(os.path.dirname(__file__), "db")
-        client = chromadb.PersistentClient(path=db_path)
 
+def ingest_directory(directory, collection_name, client=None, index_config=None, throttle=None):
+    """
+    Chunks, embeds and stores every extracted text file of a directory in a collection.
 
-        # --- 2. Create or Get a Collection ---
-        # A collection is where your data will be stored. Think of it like a table in a SQL database.
-        collection_name = os.path.basename(dir)
-        collection = client.get_or_create_collection(name=collection_name)
+    Args:
+        directory: Directory of "<name>.pdf.txt" / "<name>.pptx.txt" files.
+        collection_name: The collection to write to (created if missing).
+        index_config: HNSW settings for a new collection (default: INDEX_* environment).
+        throttle: Optional callable, called with the number of chunks stored after each
+                  document; it may sleep to cap the ingestion rate (see reindex.RateLimiter).
 
+    Returns:
+        int: Number of chunks stored.
+    """
+    # --- 1. Create a ChromaDB Client ---
+    # open_client() uses PersistentClient, which saves the database to the 'db' directory inside
+    # your 'Database' folder, or the shared index server when VECTOR_STORE_MODE=server.
+    client = client or open_client(db_path=os.path.join(os.path.dirname(__file__), "db"))
 
-        # --- 3. Prepare the data lists from your package(s) ---
-        ids = [pkg['id'] for pkg in list_of_packages]
-        embeddings = [pkg['embedding'] for pkg in list_of_packages]
-        documents = [pkg['text'] for pkg in list_of_packages]
-        metadatas = []
-        for pkg in list_of_packages:
-            metadatas.append({
-                "source": pkg['source_document'],
-                "page": pkg['page_number'],
-                # IMPORTANT: Convert list of keywords to a single string
-                "keywords": ", ".join(pkg['keywords']) 
-            })
+    # --- 2. Create or Get a Collection ---
+    # A collection is where your data will be stored. Think of it like a table in a SQL database.
+    # New collections get the HNSW settings from INDEX_SPACE, INDEX_M, INDEX_CONSTRUCTION_EF and
+    # INDEX_SEARCH_EF (Database/indexconfig.py); existing ones keep theirs until rebuilt.
+    collection = get_or_create_collection(client, collection_name, index_config or index_config_from_env())
+    docs = get_or_create_collection(client, docs_collection_name(collection_name), index_config_of(collection))
 
+    deduplicator = ChunkDeduplicator() if DEDUP_CHUNKS else None
+    stored = 0
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".txt"):
+            continue
+        file_path = os.path.join(directory, filename)
+        # One ChunkBatch per document: records plus a single float32 embedding array.
+        batch = process_document(file_path, deduplicator)
+        if not len(batch):
+            print(f"No new chunks found in {filename}, skipping.")
+            continue
 
-        # --- 4. Add the data to the collection ---
-        # You provide the lists for each corresponding field.
-        collection.add(
-            ids=ids,
-            embeddings=embeddings,
-            documents=documents,
-            metadatas=metadatas
-        )
-
+        # --- 3. Add the data to the collection ---
+        # to_chroma() gives the ids, documents, metadatas (keywords joined into one string) and
+        # the embeddings as the batch's float32 array, so no per-chunk Python lists are built.
+        collection.add(**batch.to_chroma())
+        # Document and section centroids for the first stage of two-stage retrieval.
+        docs.upsert(**batch_centroids(batch))
+        stored += len(batch)
         print(f"Successfully added {collection.count()} item to the collection.")
 
+        # The extracted text sits next to its source as "<name>.pdf.txt".
+        source_pdf = file_path[:-len(".txt")]
+        if PRERENDER_PAGES and source_pdf.endswith(".pdf") and os.path.exists(source_pdf):
+            pages = {record.page_number for record in batch}
+            rendered = prerender_document(source_pdf, pages=pages, formats=("png", "pdf"))
+            print(f"Pre-rendered {rendered} page preview(s) for {os.path.basename(source_pdf)}.")
+
+        if throttle is not None:
+            throttle(len(batch))
+
+    if deduplicator is not None:
+        # Chunks stored with earlier documents get the references of copies found in later ones.
+        for update in deduplicator.pending_updates():
+            collection.update(**update)
+        print(f"Deduplication: {deduplicator.removed} of {deduplicator.seen} chunks were duplicates and were not stored.")
+    return stored
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest a directory of extracted text files into a course collection.")
+    parser.add_argument("directory", nargs="?", default=dir)
+    parser.add_argument("--collection", default=None, help="Course collection (alias); default: the directory name.")
+    parser.add_argument("--in-place", action="store_true", help="Add to the live collection instead of building a new version.")
+    args = parser.parse_args()
+
+    course = args.collection or os.path.basename(os.path.normpath(args.directory))
+    if args.in_place:
+        client = open_client(db_path=os.path.join(os.path.dirname(__file__), "db"))
+        ingest_directory(args.directory, aliases.resolve(client, course), client)
+    else:
+        from Database import reindex
+        reindex.reindex(course, args.directory)
@@ -0,0 +1,254 @@
+import os
+import sys
+import time
+import random
+import argparse
+
+# Add project root to Python path to resolve module imports
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from Database.vectorstore import open_client
+from Database.indexconfig import index_config_from_env, index_config_of
+from Database import aliases
+
+# Zero-downtime re-indexing of a course collection.
+#
+#   1. build     the course directory is ingested into a new version, "<alias>__v<version>",
+#                created with {"version": <version>} metadata, while the live version keeps
+#                serving. The build is throttled so serving latency holds: it runs at
+#                REINDEX_NICE CPU priority with REINDEX_THREADS embedding threads, and stores at
+#                most REINDEX_CHUNKS_PER_SECOND chunks per second (0: no cap).
+#   2. validate  the new version must be non-empty, hold at least REINDEX_MIN_RATIO of the live
+#                version's records, find its own records (a sample queried with their own
+#                embeddings must come back first) and have centroids if the live version has.
+#                A version that fails is deleted and the live one is left alone.
+#   3. swap      the alias is pointed at the new version (Database/aliases.py). Workers pick it up
+#                within COLLECTION_ALIAS_TTL seconds and drop their caches tied to the old version
+#                (sub-indexes, centroids, session context); precomputed answers are stored per
+#                version, so the old version's answers stop being served as well.
+#   4. gc        after REINDEX_GC_GRACE seconds (for requests still running on the old version),
+#                older versions and their "__docs" centroid collections are deleted, keeping the
+#                REINDEX_KEEP_VERSIONS (default 1) most recent ones for `swap` back. Nothing is
+#                deleted for a name that is not a stored alias, since it resolves to itself.
+#
+# Usage (from the backend directory):
+#   python Database/reindex.py build aws ../Data/aws
+#   python Database/reindex.py build aws ../Data/aws --queue     # extract/embed on ingest_queue workers
+#   python Database/reindex.py list aws
+#   python Database/reindex.py swap aws aws__v20261019T120000     # roll back / forward
+#   python Database/reindex.py gc aws
+
+REINDEX_NICE = int(os.getenv("REINDEX_NICE", "10"))
+REINDEX_THREADS = int(os.getenv("REINDEX_THREADS", "1"))
+REINDEX_CHUNKS_PER_SECOND = float(os.getenv("REINDEX_CHUNKS_PER_SECOND", "0"))
+REINDEX_MIN_RATIO = float(os.getenv("REINDEX_MIN_RATIO", "0.8"))
+REINDEX_PROBES = int(os.getenv("REINDEX_PROBES", "50"))
+REINDEX_MIN_SELF_RECALL = float(os.getenv("REINDEX_MIN_SELF_RECALL", "0.9"))
+REINDEX_GC_GRACE = float(os.getenv("REINDEX_GC_GRACE", "60"))
+REINDEX_KEEP_VERSIONS = int(os.getenv("REINDEX_KEEP_VERSIONS", "1"))
+
+DOCS_SUFFIX = "__docs"   # as in Embedding/centroids.py
+
+
+class RateLimiter:
+    """
+    Caps a throughput (units per second) by sleeping after each batch; 0 disables it.
+    """
+
+    def __init__(self, per_second):
+        self.per_second = per_second
+        self.started = time.monotonic()
+        self.done = 0
+
+    def __call__(self, count):
+        if self.per_second <= 0:
+            return
+        self.done += count
+        time.sleep(max(0.0, self.started + self.done / self.per_second - time.monotonic()))
+
+
+def lower_priority(nice=REINDEX_NICE, threads=REINDEX_THREADS):
+    """
+    Runs the rest of this process at a lower CPU priority with fewer embedding threads.
+    """
+    if nice and hasattr(os, "nice"):
+        os.nice(nice)
+    if threads:
+        os.environ["OMP_NUM_THREADS"] = str(threads)
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+
+
+def _exists(client, name):
+    try:
+        return client.get_collection(name=name)
+    except Exception:
+        return None
+
+
+def _delete(client, name):
+    for collection_name in (name, name + DOCS_SUFFIX):
+        if _exists(client, collection_name) is not None:
+            client.delete_collection(collection_name)
+
+
+def build_version(client, alias, directory, chunks_per_second=REINDEX_CHUNKS_PER_SECOND, ingest=None,
+                  index_config=None):
+    """
+    Ingests a directory into a new version of alias, with the live version's index settings
+    unless index_config is given.
+
+    Args:
+        ingest: fn(directory, collection_name, client, index_config, throttle); default
+                Database.process_pipeline.ingest_directory.
+
+    Returns:
+        str: The new version's collection name.
+    """
+    if ingest is None:
+        from Database.process_pipeline import ingest_directory as ingest
+    live = _exists(client, aliases.resolve(client, alias, refresh=True))
+    config = index_config or (index_config_of(live) if live is not None else index_config_from_env())
+    version = aliases.new_version()
+    name = aliases.versioned_name(alias, version)
+    while _exists(client, name) is not None:   # versions have one-second resolution
+        time.sleep(0.2)
+        version = aliases.new_version()
+        name = aliases.versioned_name(alias, version)
+    # The version is fixed at creation (collection metadata cannot be changed alongside hnsw:*).
+    client.create_collection(name=name, metadata={**config.metadata(), "version": version})
+    try:
+        ingest(directory, name, client, config, RateLimiter(chunks_per_second))
+    except BaseException:
+        _delete(client, name)
+        raise
+    return name
+
+
+def validate_version(client, name, live_name=None, probes=REINDEX_PROBES):
+    """
+    Checks a built version before it is swapped in.
+
+    Returns:
+        tuple: (ok, report dict)
+    """
+    collection = client.get_collection(name=name)
+    count = collection.count()
+    report = {"collection": name, "records": count}
+    problems = []
+    if count == 0:
+        problems.append("no records")
+
+    live = _exists(client, live_name) if live_name and live_name != name else None
+    if live is not None:
+        report["live_records"] = live.count()
+        if count < REINDEX_MIN_RATIO * report["live_records"]:
+            problems.append(f"{count} records, under {REINDEX_MIN_RATIO:.0%} of the live version's {report['live_records']}")
+        if _exists(client, live_name + DOCS_SUFFIX) is not None:
+            docs = _exists(client, name + DOCS_SUFFIX)
+            if docs is None or docs.count() == 0:
+                problems.append("no centroids, but the live version has them")
+
+    if count:
+        offsets = random.Random(0).sample(range(count), min(probes, count))
+        found = 0
+        for offset in offsets:
+            record = collection.get(limit=1, offset=offset, include=["embeddings"])
+            result = collection.query(query_embeddings=[record["embeddings"][0]], n_results=1, include=[])
+            found += result["ids"][0][:1] == record["ids"]
+        report["self_recall"] = round(found / len(offsets), 3)
+        if report["self_recall"] < REINDEX_MIN_SELF_RECALL:
+            problems.append(f"self-recall {report['self_recall']} under {REINDEX_MIN_SELF_RECALL}")
+
+    report["problems"] = problems
+    return not problems, report
+
+
+def collect_garbage(client, alias, keep=REINDEX_KEEP_VERSIONS):
+    """
+    Deletes the versions of alias other than the live one and the `keep` newest others.
+
+    Returns:
+        list: The deleted collection names.
+    """
+    live = aliases.lookup(client, alias)
+    if live is None:
+        # Without a stored alias there is no telling which version serves; delete nothing.
+        print(f"'{alias}' is not an alias; not collecting its versions.")
+        return []
+    others = [name for name in aliases.versions(client, alias) if name != live]
+    doomed = others[:len(others) - keep] if keep else others
+    for name in doomed:
+        _delete(client, name)
+    return doomed
+
+
+def reindex(alias, directory, client=None, chunks_per_second=REINDEX_CHUNKS_PER_SECOND,
+            gc_grace=REINDEX_GC_GRACE, ingest=None, throttle_process=True, index_config=None):
+    """
+    Builds, validates and swaps in a new version of alias, then garbage-collects old versions.
+
+    Returns:
+        dict: The validation report, with the swap and the deleted versions.
+    """
+    if throttle_process:
+        lower_priority()
+    client = client or open_client()
+    live_name = aliases.resolve(client, alias, refresh=True)
+    started = time.perf_counter()
+    name = build_version(client, alias, directory, chunks_per_second, ingest, index_config)
+    ok, report = validate_version(client, name, live_name)
+    report["build_seconds"] = round(time.perf_counter() - started, 1)
+    if not ok:
+        _delete(client, name)
+        raise RuntimeError(f"New version of '{alias}' failed validation, kept '{live_name}': {report}")
+
+    report["previous"] = aliases.set_alias(client, alias, name)
+    print(f"'{alias}' now serves '{name}' ({report['records']} records, was '{report['previous'] or live_name}')")
+    time.sleep(gc_grace)
+    report["deleted"] = collect_garbage(client, alias)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild course collections as new versions and swap them in.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_cmd = commands.add_parser("build", help="Build, validate and swap in a new version.")
+    build_cmd.add_argument("alias")
+    build_cmd.add_argument("directory", help="Directory of extracted text files.")
+    build_cmd.add_argument("--chunks-per-second", type=float, default=REINDEX_CHUNKS_PER_SECOND)
+    build_cmd.add_argument("--gc-grace", type=float, default=REINDEX_GC_GRACE)
+    build_cmd.add_argument("--queue", action="store_true",
+                           help="Ingest the source files through Database/ingest_queue.py workers (no rate cap).")
+    list_cmd = commands.add_parser("list", help="List the versions of an alias.")
+    list_cmd.add_argument("alias")
+    swap_cmd = commands.add_parser("swap", help="Point an alias at an existing version.")
+    swap_cmd.add_argument("alias")
+    swap_cmd.add_argument("collection")
+    gc_cmd = commands.add_parser("gc", help="Delete versions that are not served.")
+    gc_cmd.add_argument("alias")
+    gc_cmd.add_argument("--keep", type=int, default=REINDEX_KEEP_VERSIONS)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        ingest = None
+        if args.queue:
+            from Database.ingest_queue import run_coordinator
+            ingest = lambda directory, name, client, config, throttle: run_coordinator(directory, name, client=client)
+        print(reindex(args.alias, args.directory, chunks_per_second=args.chunks_per_second, gc_grace=args.gc_grace,
+                      ingest=ingest))
+        sys.exit(0)
+    client = open_client()
+    if args.command == "list":
+        live = aliases.resolve(client, args.alias, refresh=True)
+        for name in aliases.versions(client, args.alias):
+            print(f"{'*' if name == live else ' '} {name} ({client.get_collection(name=name).count()} records)")
+    elif args.command == "swap":
+        previous = aliases.set_alias(client, args.alias, args.collection)
+        print(f"'{args.alias}' now serves '{args.collection}' (was '{previous or args.alias}')")
+    else:
+        print(f"Deleted: {', '.join(collect_garbage(client, args.alias, args.keep)) or 'nothing'}")
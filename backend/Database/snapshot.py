@@ -0,0 +1,266 @@
+import io
+import os
+import sys
+import json
+import time
+import hashlib
+import zipfile
+import argparse
+from dataclasses import asdict
+
+import numpy as np
+
+# Add project root to Python path to resolve module imports
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from Database.indexconfig import IndexConfig, index_config_of, index_config_from_metadata, get_or_create_collection
+from Database import aliases
+
+# Portable snapshots of Chroma collections, so a node can be provisioned by copying a file and
+# bulk-loading it instead of running ingestion (and the embedding / keyword models) itself.
+#
+# A snapshot is a zip file holding:
+#   manifest.json     format name and version, collection name, record count, embedding
+#                     dimension, collection metadata, the index settings in effect (including a
+#                     search_ef changed after creation), the course aliases pointing at the
+#                     collection (Database/aliases.py) and the SHA-256 of every other member
+#   embeddings.npy    (count, dim) float32, row i belongs to ids[i]
+#   ids.json, documents.json, metadatas.json
+#
+# Usage (from the backend directory):
+#   python Database/snapshot.py export --db Database/db --out snapshots/            # every collection
+#   python Database/snapshot.py export --db Database/db --collection aws --out snapshots/  # aws's live version
+#   python Database/snapshot.py verify snapshots/aws.snapshot
+#   python Database/snapshot.py import snapshots/aws.snapshot --db /srv/chroma --replace
+
+SNAPSHOT_FORMAT = "study-partner-collection-snapshot"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX = ".snapshot"
+EXPORT_PAGE_SIZE = int(os.getenv("SNAPSHOT_PAGE_SIZE", "5000"))
+
+default_db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "db")
+
+
+class SnapshotError(Exception):
+    """Raised for unreadable, corrupt or incompatible snapshot files."""
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _npy_bytes(array):
+    buffer = io.BytesIO()
+    np.save(buffer, array, allow_pickle=False)
+    return buffer.getvalue()
+
+
+def export_collection(collection, out_path, page_size=EXPORT_PAGE_SIZE, alias_names=()):
+    """
+    Writes one collection to a snapshot file.
+
+    Args:
+        collection: A Chroma collection.
+        out_path: Destination file; written to a temporary name and renamed when complete.
+        page_size: Records fetched from Chroma per request.
+        alias_names: Course aliases pointing at the collection, restored on import.
+
+    Returns:
+        dict: The snapshot manifest.
+    """
+    count = collection.count()
+    ids, documents, metadatas = [], [], []
+    embeddings = None
+    for offset in range(0, count, page_size):
+        page = collection.get(include=["embeddings", "documents", "metadatas"], limit=page_size, offset=offset)
+        rows = np.asarray(page["embeddings"], dtype=np.float32)
+        if embeddings is None:
+            embeddings = np.empty((count, rows.shape[1]), dtype=np.float32)
+        embeddings[len(ids):len(ids) + len(rows)] = rows
+        ids.extend(page["ids"])
+        documents.extend(page["documents"])
+        metadatas.extend(page["metadatas"])
+    if embeddings is None:
+        embeddings = np.empty((0, 0), dtype=np.float32)
+    embeddings = embeddings[:len(ids)]
+
+    members = {
+        "embeddings.npy": _npy_bytes(embeddings),
+        "ids.json": json.dumps(ids).encode("utf-8"),
+        "documents.json": json.dumps(documents, ensure_ascii=False).encode("utf-8"),
+        "metadatas.json": json.dumps(metadatas, ensure_ascii=False).encode("utf-8"),
+    }
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "collection": collection.name,
+        "collection_metadata": collection.metadata or {},
+        "index_config": asdict(index_config_of(collection)),
+        "aliases": sorted(alias_names),
+        "count": len(ids),
+        "dim": int(embeddings.shape[1]) if embeddings.size else 0,
+        "dtype": "float32",
+        "checksums": {name: _sha256(data) for name, data in members.items()},
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    tmp_path = out_path + ".tmp"
+    try:
+        with zipfile.ZipFile(tmp_path, "w") as archive:
+            # The float32 block is stored uncompressed so it can be read back without inflating.
+            archive.writestr("embeddings.npy", members.pop("embeddings.npy"), compress_type=zipfile.ZIP_STORED)
+            for name, data in members.items():
+                archive.writestr(name, data, compress_type=zipfile.ZIP_DEFLATED)
+            archive.writestr("manifest.json", json.dumps(manifest, indent=2), compress_type=zipfile.ZIP_DEFLATED)
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return manifest
+
+
+def read_snapshot(path, verify=True):
+    """
+    Reads a snapshot file, checking its format version and (by default) every checksum.
+
+    Returns:
+        tuple: (manifest, ids, embeddings, documents, metadatas)
+    """
+    try:
+        with zipfile.ZipFile(path) as archive:
+            manifest = json.loads(archive.read("manifest.json"))
+            if manifest.get("format") != SNAPSHOT_FORMAT:
+                raise SnapshotError(f"{path} is not a collection snapshot")
+            if manifest.get("version") != SNAPSHOT_VERSION:
+                raise SnapshotError(f"{path} has snapshot version {manifest.get('version')}; "
+                                    f"this build reads version {SNAPSHOT_VERSION}")
+            members = {name: archive.read(name) for name in manifest["checksums"]}
+    except (zipfile.BadZipFile, KeyError, json.JSONDecodeError) as e:
+        raise SnapshotError(f"Unreadable snapshot {path}: {e}") from e
+
+    if verify:
+        for name, expected in manifest["checksums"].items():
+            if _sha256(members[name]) != expected:
+                raise SnapshotError(f"Checksum mismatch for {name} in {path}")
+
+    embeddings = np.load(io.BytesIO(members["embeddings.npy"]), allow_pickle=False)
+    ids = json.loads(members["ids.json"])
+    documents = json.loads(members["documents.json"])
+    metadatas = json.loads(members["metadatas.json"])
+    if not (len(ids) == len(documents) == len(metadatas) == embeddings.shape[0] == manifest["count"]):
+        raise SnapshotError(f"Inconsistent record counts in {path}")
+    return manifest, ids, embeddings, documents, metadatas
+
+
+def import_snapshot(client, path, name=None, replace=False, batch_size=None):
+    """
+    Bulk-loads a snapshot into a Chroma client. No model inference is involved: the stored
+    embeddings, documents and metadata are written as they are. Aliases recorded in the snapshot
+    are pointed at the loaded collection once it is complete.
+
+    Args:
+        client: A Chroma client (PersistentClient or HttpClient).
+        path: The snapshot file.
+        name: Collection name to create (default: the name recorded in the snapshot).
+        replace: Drop an existing collection of that name first; otherwise it must not exist.
+        batch_size: Records per add() call (default: the client's maximum batch size).
+
+    Returns:
+        dict: The snapshot manifest.
+    """
+    manifest, ids, embeddings, documents, metadatas = read_snapshot(path)
+    name = name or manifest["collection"]
+
+    existing = [c if isinstance(c, str) else c.name for c in client.list_collections()]
+    if name in existing:
+        if not replace:
+            raise SnapshotError(f"Collection '{name}' already exists; import with replace to overwrite it")
+        client.delete_collection(name)
+
+    metadata = manifest["collection_metadata"] or {}
+    # Snapshots written before index_config was recorded only have the creation-time "hnsw:*" metadata.
+    config = (IndexConfig(**manifest["index_config"]) if "index_config" in manifest
+              else index_config_from_metadata(metadata))
+    collection = get_or_create_collection(client, name, config, metadata=metadata)
+    if batch_size is None:
+        try:
+            batch_size = client.get_max_batch_size()
+        except Exception:
+            batch_size = 5000
+    for start in range(0, len(ids), batch_size):
+        end = start + batch_size
+        collection.add(ids=ids[start:end], embeddings=embeddings[start:end],
+                       documents=documents[start:end], metadatas=metadatas[start:end])
+    if collection.count() != manifest["count"]:
+        raise SnapshotError(f"Loaded {collection.count()} records into '{name}', expected {manifest['count']}")
+    for alias in manifest.get("aliases", []):
+        aliases.set_alias(client, alias, name)
+    return manifest
+
+
+def _client(db_path):
+    # Honours VECTOR_STORE_MODE: with a shared index server, --db is ignored and the server's store is used.
+    from Database.vectorstore import open_client
+    return open_client(db_path=db_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export, verify and import collection snapshots.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_cmd = commands.add_parser("export", help="Write collections to snapshot files.")
+    export_cmd.add_argument("--db", default=default_db_path, help="Chroma directory to read.")
+    export_cmd.add_argument("--collection", action="append", help="Collection to export (repeatable; default all).")
+    export_cmd.add_argument("--out", required=True, help="Output directory.")
+
+    verify_cmd = commands.add_parser("verify", help="Check a snapshot's version and checksums.")
+    verify_cmd.add_argument("snapshots", nargs="+")
+
+    import_cmd = commands.add_parser("import", help="Bulk-load snapshots into a Chroma store.")
+    import_cmd.add_argument("snapshots", nargs="+")
+    import_cmd.add_argument("--db", default=default_db_path, help="Chroma directory to write.")
+    import_cmd.add_argument("--name", default=None, help="Collection name (single snapshot only).")
+    import_cmd.add_argument("--replace", action="store_true", help="Overwrite existing collections.")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        client = _client(args.db)
+        # Course names are resolved to the version they serve; the alias map itself travels in
+        # the manifests of the collections it points at rather than as a snapshot of its own.
+        names = args.collection or [c if isinstance(c, str) else c.name for c in client.list_collections()
+                                    if (c if isinstance(c, str) else c.name) != aliases.ALIAS_COLLECTION]
+        alias_map = aliases.get_aliases(client)
+        for name in dict.fromkeys(aliases.resolve(client, name, refresh=True) for name in names):
+            started = time.perf_counter()
+            out_path = os.path.join(args.out, name + SNAPSHOT_SUFFIX)
+            manifest = export_collection(client.get_collection(name), out_path,
+                                         alias_names=[alias for alias, target in alias_map.items() if target == name])
+            print(f"Exported {manifest['count']} records from '{name}' to {out_path} "
+                  f"({os.path.getsize(out_path) / 2**20:.1f} MB, {time.perf_counter() - started:.1f}s)")
+    elif args.command == "verify":
+        for path in args.snapshots:
+            manifest = read_snapshot(path)[0]
+            print(f"{path}: OK ({manifest['collection']}, {manifest['count']} records, dim {manifest['dim']}, "
+                  f"created {manifest['created_at']})")
+    else:
+        if args.name and len(args.snapshots) > 1:
+            parser.error("--name can only be used with a single snapshot")
+        client = _client(args.db)
+        for path in args.snapshots:
+            started = time.perf_counter()
+            manifest = import_snapshot(client, path, name=args.name, replace=args.replace)
+            print(f"Loaded {manifest['count']} records into '{args.name or manifest['collection']}' "
+                  f"in {time.perf_counter() - started:.1f}s"
+                  + (f" (serving {', '.join(manifest['aliases'])})" if manifest.get("aliases") else ""))
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except SnapshotError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
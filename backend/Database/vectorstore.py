@@ -0,0 +1,133 @@
+import os
+import sys
+import time
+import logging
+import argparse
+import threading
+import subprocess
+from urllib.parse import urlparse
+
+# One place that decides how this process reaches the vector store. Everything that opens
+# Chroma (Retrival.main, query_db.py, ingestion, snapshots) goes through open_client().
+#
+#   VECTOR_STORE_MODE=embedded  (default) each process opens the Chroma files in CHROMA_DB_PATH
+#                               itself, loading its own copy of the index.
+#   VECTOR_STORE_MODE=server    processes talk to one index server at VECTOR_STORE_URL over
+#                               a pooled HTTP connection; only the server loads the index and
+#                               owns the files, so ingestion can write while workers serve.
+#
+# Start the server with `python Database/vectorstore.py serve`, or let gunicorn start it with
+# VECTOR_STORE_AUTOSTART=1 (see gunicorn.conf.py).
+
+VECTOR_STORE_MODE = os.getenv("VECTOR_STORE_MODE", "embedded")
+VECTOR_STORE_URL = os.getenv("VECTOR_STORE_URL", "http://127.0.0.1:8001")
+VECTOR_STORE_START_TIMEOUT = float(os.getenv("VECTOR_STORE_START_TIMEOUT", "60"))
+default_db_path = os.getenv("CHROMA_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "db"))
+
+MODES = ("embedded", "server")
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _host_port(url):
+    parsed = urlparse(url)
+    return parsed.hostname or "127.0.0.1", parsed.port or 8000, parsed.scheme == "https"
+
+
+def open_client(mode=None, db_path=None, url=None):
+    """
+    Opens a new Chroma client for the configured (or given) mode.
+
+    Args:
+        mode: "embedded" or "server" (default VECTOR_STORE_MODE).
+        db_path: Chroma directory for embedded mode (default CHROMA_DB_PATH / Database/db).
+        url: Index server URL for server mode (default VECTOR_STORE_URL).
+    """
+    import chromadb
+
+    mode = mode or VECTOR_STORE_MODE
+    if mode == "embedded":
+        return chromadb.PersistentClient(path=db_path or default_db_path)
+    if mode == "server":
+        host, port, ssl = _host_port(url or VECTOR_STORE_URL)
+        return chromadb.HttpClient(host=host, port=port, ssl=ssl)
+    raise ValueError(f"Unknown VECTOR_STORE_MODE '{mode}'; expected one of {', '.join(MODES)}")
+
+
+def get_client():
+    """
+    Returns the process-wide client for the configured mode.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = open_client()
+    return _client
+
+
+def server_command(db_path=None, url=None):
+    """
+    Returns the command that runs the Chroma index server for db_path, listening on url.
+    """
+    host, port, _ = _host_port(url or VECTOR_STORE_URL)
+    launcher = "import sys; from chromadb.cli.cli import app; sys.argv[0] = 'chroma'; sys.exit(app())"
+    return [sys.executable, "-c", launcher, "run", "--path", db_path or default_db_path,
+            "--host", host, "--port", str(port)]
+
+
+def wait_for_server(url=None, timeout=VECTOR_STORE_START_TIMEOUT, process=None):
+    """
+    Waits until the index server answers its heartbeat. Raises RuntimeError on timeout or if
+    the server process exits first.
+    """
+    deadline = time.monotonic() + timeout
+    last_error = None
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Index server exited with code {process.returncode}")
+        try:
+            open_client("server", url=url).heartbeat()
+            return
+        except Exception as e:
+            last_error = e
+            time.sleep(0.25)
+    raise RuntimeError(f"Index server at {url or VECTOR_STORE_URL} did not start within {timeout}s: {last_error}")
+
+
+def start_server(db_path=None, url=None, log_file=None):
+    """
+    Starts the index server as a child process and waits for it to accept requests.
+
+    Returns:
+        subprocess.Popen: The server process; terminate() it to stop the server.
+    """
+    process = subprocess.Popen(server_command(db_path, url), stdout=log_file or subprocess.DEVNULL,
+                               stderr=subprocess.STDOUT)
+    try:
+        wait_for_server(url, process=process)
+    except Exception:
+        process.terminate()
+        raise
+    logging.info(f"Index server for {db_path or default_db_path} listening on {url or VECTOR_STORE_URL} (pid {process.pid})")
+    return process
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run or inspect the shared vector index server.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_cmd = commands.add_parser("serve", help="Run the index server in the foreground.")
+    serve_cmd.add_argument("--db", default=default_db_path)
+    serve_cmd.add_argument("--url", default=VECTOR_STORE_URL)
+    status_cmd = commands.add_parser("status", help="List the collections the configured store serves.")
+    status_cmd.add_argument("--mode", choices=MODES, default=VECTOR_STORE_MODE)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        print(f"Serving {args.db} on {args.url}")
+        sys.exit(subprocess.call(server_command(args.db, args.url)))
+    client = open_client(args.mode)
+    for collection in client.list_collections():
+        collection = client.get_collection(collection if isinstance(collection, str) else collection.name)
+        print(f"{collection.name}: {collection.count()} records")
@@ -0,0 +1,89 @@
+import os
+from collections import defaultdict
+
+import numpy as np
+
+# Coarse, document-level embeddings for two-stage retrieval (see Retrival/hierarchical.py).
+#
+# For every source document the ingestion pipeline stores, next to its page chunks, a
+# "document" centroid (the normalised mean of all its chunk embeddings) and one "section"
+# centroid per CENTROID_SECTION_PAGES consecutive pages, so a long book is not reduced to a
+# single averaged vector. They live in a companion collection, "<collection>__docs", with
+# metadata {source, level, page_start, page_end, chunks}.
+
+CENTROID_SECTION_PAGES = int(os.getenv("CENTROID_SECTION_PAGES", "10"))
+DOCS_COLLECTION_SUFFIX = "__docs"
+
+
+def docs_collection_name(collection_name):
+    """
+    Returns the name of the collection holding the centroids for collection_name.
+    """
+    return collection_name + DOCS_COLLECTION_SUFFIX
+
+
+def _unit_mean(embeddings):
+    mean = embeddings.mean(axis=0)
+    return mean / max(float(np.linalg.norm(mean)), 1e-12)
+
+
+def centroid_records(source, pages, embeddings, section_pages=CENTROID_SECTION_PAGES):
+    """
+    Builds the centroid records of one document.
+
+    Args:
+        source: The document's source name (the "source" metadata of its chunks).
+        pages: Page number of each chunk.
+        embeddings: (len(pages), dim) chunk embeddings.
+        section_pages: Pages per section centroid; 0 stores only the document centroid.
+
+    Returns:
+        dict: Keyword arguments for docs_collection.upsert (empty lists for a document without chunks).
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    pages = np.asarray(pages)
+    ids, vectors, metadatas = [], [], []
+    if not len(pages):
+        return {"ids": ids, "embeddings": vectors, "metadatas": metadatas, "documents": []}
+
+    def add(entry_id, level, mask):
+        ids.append(entry_id)
+        vectors.append(_unit_mean(embeddings[mask]))
+        metadatas.append({"source": source, "level": level, "page_start": int(pages[mask].min()),
+                          "page_end": int(pages[mask].max()), "chunks": int(mask.sum())})
+
+    add(f"doc::{source}", "document", np.ones(len(pages), dtype=bool))
+    if section_pages > 0 and pages.max() - pages.min() >= section_pages:
+        sections = (pages - 1) // section_pages
+        for section in np.unique(sections):
+            add(f"section::{source}::{int(section)}", "section", sections == section)
+    return {"ids": ids, "embeddings": np.stack(vectors), "metadatas": metadatas,
+            "documents": [f"{m['source']} pages {m['page_start']}-{m['page_end']}" for m in metadatas]}
+
+
+def batch_centroids(batch, section_pages=CENTROID_SECTION_PAGES):
+    """
+    Returns the centroid records for an embedded ChunkBatch (see centroid_records).
+    """
+    return centroid_records(batch.source_document, [record.page_number for record in batch],
+                            batch.embeddings if len(batch) else np.empty((0, 0)), section_pages)
+
+
+def collection_centroids(collection, section_pages=CENTROID_SECTION_PAGES, page_size=5000):
+    """
+    Computes centroid records for every source in an existing collection, for collections
+    ingested before centroids were stored.
+
+    Returns:
+        list: One centroid_records() dict per source.
+    """
+    by_source = defaultdict(lambda: ([], []))
+    count = collection.count()
+    for offset in range(0, count, page_size):
+        page = collection.get(include=["embeddings", "metadatas"], limit=page_size, offset=offset)
+        for embedding, metadata in zip(page["embeddings"], page["metadatas"]):
+            pages, vectors = by_source[metadata.get("source", "unknown")]
+            pages.append(metadata.get("page", 0))
+            vectors.append(embedding)
+    return [centroid_records(source, pages, np.asarray(vectors, dtype=np.float32), section_pages)
+            for source, (pages, vectors) in by_source.items()]
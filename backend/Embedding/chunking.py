@@ -1,5 +1,6 @@
 import re
 import os
+from .chunkrecord import ChunkBatch, ChunkRecord
 
 #create chunks such that each page is in its own chunk
 # the text file of a doc and ppt has pages numbers. Search for "slide" or "page" to find page breaks
@@ -15,15 +16,15 @@ import os
 #     "embedding": [0.012, -0.045, 0.088, ..., -0.021] # The 384-element vector
 # }
 
-def create_chunks(file_path: str):
+def create_chunk_batch(file_path: str):
     """
-    Chunks a text file from a .pdf.txt or .pptx.txt into page/slide based chunks.
+    Chunks a text file from a .pdf.txt or .pptx.txt into page/slide based chunk records.
 
     Args:
         file_path (str): The path to the text file.
 
     Returns:
-        list: A list of chunk packages, where each package is a dictionary.
+        ChunkBatch: The document's chunks, without embeddings or keywords yet.
     """
     with open(file_path, 'r', encoding='utf-8') as f:
         text = f.read()
@@ -41,40 +42,38 @@ def create_chunks(file_path: str):
     # Split the text by the delimiter
     # The delimiter is kept in the resulting list, so we process pairs of (text, delimiter)
     parts = re.split(f'({delimiter_pattern})', text)
-    
-    chunks = []
+
+    batch = ChunkBatch(source_document)
+    id_prefix = os.path.splitext(source_document)[0]
     chunk_text = parts[0].strip()
     page_number = 1
 
     if chunk_text:
-        chunk_id = f"{os.path.splitext(source_document)[0]}_chunk_{page_number:03d}"
-        chunks.append({
-            "id": chunk_id,
-            "source_document": source_document,
-            "page_number": page_number,
-            "keywords": [],  # To be filled later
-            "text": chunk_text,
-            "embedding": None # To be filled later
-        })
+        batch.records.append(ChunkRecord(f"{id_prefix}_chunk_{page_number:03d}", source_document, page_number, chunk_text))
 
     # Process the rest of the parts
     for i in range(1, len(parts), 2):
         delimiter = parts[i]
         chunk_text = parts[i+1].strip() if (i+1) < len(parts) else ""
-        
+
         page_number_match = re.search(r'\d+', delimiter)
         if page_number_match:
             page_number = int(page_number_match.group(0))
 
         if chunk_text:
-            chunk_id = f"{os.path.splitext(source_document)[0]}_chunk_{page_number + 1:03d}"
-            chunks.append({
-                "id": chunk_id,
-                "source_document": source_document,
-                "page_number": page_number + 1,
-                "keywords": [],
-                "text": chunk_text,
-                "embedding": None
-            })
-
-    return chunks
\ No newline at end of file
+            batch.records.append(ChunkRecord(f"{id_prefix}_chunk_{page_number + 1:03d}", source_document,
+                                             page_number + 1, chunk_text))
+
+    return batch
+
+def create_chunks(file_path: str):
+    """
+    Chunks a text file from a .pdf.txt or .pptx.txt into page/slide based chunks.
+
+    Args:
+        file_path (str): The path to the text file.
+
+    Returns:
+        list: A list of chunk packages, where each package is a dictionary.
+    """
+    return create_chunk_batch(file_path).to_packages()
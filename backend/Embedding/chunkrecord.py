@@ -0,0 +1,104 @@
+import json
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Compact in-memory representation of a document's chunks during ingestion.
+#
+# A ChunkRecord holds one page/slide without its embedding; a ChunkBatch holds every record of
+# one document plus all their embeddings in a single (n, dim) float32 array. The stages fill the
+# batch in place (chunking -> embeddings -> keywords), and the data is only converted to the
+# shapes Chroma expects in to_chroma(), at write time.
+
+EMBEDDING_DTYPE = np.float32
+
+# A canonical chunk that stands for near-duplicates elsewhere (see dedup.py) lists them in its
+# "references" metadata as a JSON array of [source, page] pairs, and carries a "ref:<source>"
+# flag per other source so source-scoped filters still find it.
+REFERENCE_KEY_PREFIX = "ref:"
+
+
+@dataclass(slots=True)
+class ChunkRecord:
+    id: str
+    source_document: str
+    page_number: int
+    text: str
+    keywords: List[str] = field(default_factory=list)
+    references: List[Tuple[str, int]] = field(default_factory=list)   # (source, page) of removed duplicates
+
+    def metadata(self):
+        """
+        Returns the Chroma metadata for this chunk (keywords joined into one string, references
+        to deduplicated copies as a JSON string).
+        """
+        metadata = {
+            "source": self.source_document,
+            "page": self.page_number,
+            "keywords": ", ".join(self.keywords),
+        }
+        if self.references:
+            metadata["references"] = json.dumps([list(reference) for reference in self.references])
+            for source, _ in self.references:
+                if source != self.source_document:
+                    metadata[REFERENCE_KEY_PREFIX + source] = True
+        return metadata
+
+
+@dataclass(slots=True)
+class ChunkBatch:
+    source_document: str
+    records: List[ChunkRecord] = field(default_factory=list)
+    embeddings: Optional[np.ndarray] = None   # (len(records), dim) float32, row i belongs to records[i]
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    @property
+    def texts(self):
+        return [record.text for record in self.records]
+
+    @property
+    def ids(self):
+        return [record.id for record in self.records]
+
+    def set_embeddings(self, embeddings):
+        """
+        Stores the embeddings for all records, as one contiguous float32 array.
+        """
+        embeddings = np.ascontiguousarray(embeddings, dtype=EMBEDDING_DTYPE)
+        if embeddings.ndim != 2 or embeddings.shape[0] != len(self.records):
+            raise ValueError(f"Expected {len(self.records)} embeddings, got array of shape {embeddings.shape}")
+        self.embeddings = embeddings
+
+    def to_chroma(self):
+        """
+        Returns keyword arguments for collection.add / collection.upsert. Embeddings are passed
+        as the float32 array itself; Chroma accepts NumPy input without a list round-trip.
+        """
+        if self.embeddings is None:
+            raise ValueError(f"Batch for {self.source_document} has no embeddings yet")
+        return {
+            "ids": self.ids,
+            "embeddings": self.embeddings,
+            "documents": self.texts,
+            "metadatas": [record.metadata() for record in self.records],
+        }
+
+    def to_packages(self):
+        """
+        Returns the records as the dict "chunk packages" used before ChunkBatch existed.
+        """
+        return [{
+            "id": record.id,
+            "source_document": record.source_document,
+            "page_number": record.page_number,
+            "keywords": record.keywords,
+            "text": record.text,
+            "references": record.references,
+            "embedding": self.embeddings[i].tolist() if self.embeddings is not None else None,
+        } for i, record in enumerate(self.records)]
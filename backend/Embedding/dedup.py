@@ -0,0 +1,150 @@
+import os
+import re
+import hashlib
+import zlib
+
+import numpy as np
+
+# Near-duplicate chunk elimination for ingestion.
+#
+# Course decks repeat slides: title and agenda slides, and the same figures reused across
+# modules. ChunkDeduplicator drops such chunks from a ChunkBatch before they are embedded,
+# keyworded and stored, and records each dropped chunk's (source, page) on the chunk it
+# duplicates (the canonical chunk, the first copy seen), so citations can still point at every copy.
+#
+# Exact duplicates (same text after normalisation) are matched by hash. Near-duplicates are
+# found with MinHash over word shingles and LSH banding: chunks whose signatures agree on every
+# row of some band become candidates, and a candidate is a duplicate when the estimated
+# Jaccard similarity of the two shingle sets is at least DEDUP_THRESHOLD.
+#
+# A deduplicator keeps its state for one ingestion run into one collection, so duplicates are
+# found across all documents of that run, not across collections.
+
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "128"))
+DEDUP_BANDS = int(os.getenv("DEDUP_BANDS", "32"))
+DEDUP_SHINGLE_SIZE = int(os.getenv("DEDUP_SHINGLE_SIZE", "5"))
+DEDUP_UPDATE_BATCH = 5000   # ids per collection.update call, below Chroma's maximum batch size
+
+_MERSENNE_PRIME = (1 << 31) - 1
+
+
+def normalize_text(text):
+    """
+    Lowercases text and reduces it to words separated by single spaces.
+    """
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+def shingles(normalized, size=DEDUP_SHINGLE_SIZE):
+    """
+    Returns the hashed word shingles (runs of `size` words) of normalised text as a uint64 array.
+    Texts shorter than one shingle become a single shingle.
+    """
+    words = normalized.split()
+    grams = {" ".join(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))}
+    return np.fromiter((zlib.crc32(gram.encode("utf-8")) for gram in grams), dtype=np.uint64, count=len(grams))
+
+
+class ChunkDeduplicator:
+    """
+    Finds exact and near-duplicate chunks across the batches of one ingestion run.
+
+    Call filter_batch() on each ChunkBatch before embedding it and write the batch; when the run
+    is done, apply pending_updates() to the collection: those are canonical chunks written with
+    earlier batches that gained references afterwards.
+    """
+
+    def __init__(self, threshold=DEDUP_THRESHOLD, num_perm=DEDUP_NUM_PERM, bands=DEDUP_BANDS,
+                 shingle_size=DEDUP_SHINGLE_SIZE, seed=1):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _MERSENNE_PRIME, size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, size=(num_perm, 1), dtype=np.uint64)
+
+        self._canonical = {}    # chunk id -> canonical ChunkRecord
+        self._signatures = {}   # chunk id -> MinHash signature
+        self._exact = {}        # text digest -> chunk id
+        self._buckets = {}      # (band, band bytes) -> [chunk id]
+        self._dirty = set()     # canonical ids from earlier batches whose references changed
+        self.seen = 0
+        self.removed = 0
+
+    def signature(self, normalized):
+        """
+        Returns the MinHash signature (num_perm uint64 values) of normalised text.
+        """
+        x = shingles(normalized, self.shingle_size) % np.uint64(_MERSENNE_PRIME)
+        return ((self._a * x[None, :] + self._b) % np.uint64(_MERSENNE_PRIME)).min(axis=1)
+
+    def _bands(self, signature):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def find_duplicate(self, normalized, signature=None):
+        """
+        Returns the id of the canonical chunk this text duplicates, or None.
+        """
+        digest = hashlib.sha1(normalized.encode("utf-8")).digest()
+        if digest in self._exact:
+            return self._exact[digest]
+        signature = self.signature(normalized) if signature is None else signature
+        best, best_score = None, self.threshold
+        for key in self._bands(signature):
+            for candidate in self._buckets.get(key, ()):
+                score = float(np.mean(self._signatures[candidate] == signature))
+                if score >= best_score:
+                    best, best_score = candidate, score
+        return best
+
+    def filter_batch(self, batch):
+        """
+        Removes duplicate records from a ChunkBatch in place (before it has embeddings) and adds
+        their (source, page) to the canonical records' references.
+
+        Returns:
+            int: Number of records removed.
+        """
+        if batch.embeddings is not None:
+            raise ValueError("Deduplicate a batch before computing its embeddings")
+        earlier = set(self._canonical)
+        kept = []
+        for record in batch.records:
+            self.seen += 1
+            normalized = normalize_text(record.text)
+            signature = self.signature(normalized)
+            duplicate_of = self.find_duplicate(normalized, signature)
+            if duplicate_of is not None:
+                self._canonical[duplicate_of].references.append((record.source_document, record.page_number))
+                if duplicate_of in earlier:
+                    self._dirty.add(duplicate_of)
+                continue
+            kept.append(record)
+            self._canonical[record.id] = record
+            self._signatures[record.id] = signature
+            self._exact[hashlib.sha1(normalized.encode("utf-8")).digest()] = record.id
+            for key in self._bands(signature):
+                self._buckets.setdefault(key, []).append(record.id)
+        removed = len(batch.records) - len(kept)
+        batch.records = kept
+        self.removed += removed
+        return removed
+
+    def pending_updates(self, batch_size=DEDUP_UPDATE_BATCH):
+        """
+        Returns collection.update keyword arguments, batch_size ids at a time, for canonical chunks
+        of earlier batches whose references changed, and clears the pending set.
+
+        Each update call costs about as much as writing a small batch, so callers apply these once
+        at the end of a run rather than after every document.
+        """
+        ids = sorted(self._dirty)
+        self._dirty.clear()
+        return [{"ids": ids[start:start + batch_size],
+                 "metadatas": [self._canonical[chunk_id].metadata() for chunk_id in ids[start:start + batch_size]]}
+                for start in range(0, len(ids), batch_size)]
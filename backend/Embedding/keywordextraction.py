@@ -1,31 +1,57 @@
 samplechunk = {'id': 'FALLSEM2025-26_VL_BCSE306L_00100_TH_2025-07-25_Introduction-to-AI_chunk_010', 'source_document': 'FALLSEM2025-26_VL_BCSE306L_00100_TH_2025-07-25_Introduction-to-AI.pptx', 'page_number': 10, 'keywords': [], 'text': 'Cont…\nAI in Data Security\nThe security of data is crucial for every company and cyber-attacks are growing very rapidly in the digital world. AI can be used to make your data more safe and secure. Some examples such as AEG bot, AI2 Platform,are used to determine software bug and cyber-attacks in a better way.\n AI in Social Media\nSocial Media sites such as Facebook, Twitter, and Snapchat contain billions of user profiles, which need to be stored and managed in a very efficient way. AI can organize and manage massive amounts of data. AI can analyze lots of data to identify the latest trends, hashtag, and requirement of different users.\nAI in Travel & Transport\nAI is becoming highly demanding for travel industries. AI is capable of doing various travel related works such as from making travel arrangement to suggesting the hotels, flights, and best routes to the customers. Travel industries are using AI-powered chatbots which can make human-like interaction with customers for better and fast response.', 'embedding': None}
 
+import threading
 import yake
 import spacy
 import pytextrank
 
-def extract_keywords(chunk):
-    text = chunk['text']
+# The spaCy pipeline and the YAKE extractor are built once per process and reused for
+# every chunk; loading en_core_web_sm per chunk used to dominate keyword extraction time.
+_nlp = None
+_kw_extractor = None
+_setup_lock = threading.Lock()
 
-    # YAKE keyword extraction
-    kw_extractor = yake.KeywordExtractor(lan="en", n=3, top=5)
-    yake_keywords = [kw for kw, score in kw_extractor.extract_keywords(text)]
+def get_nlp():
+    global _nlp
+    if _nlp is None:
+        with _setup_lock:
+            if _nlp is None:
+                nlp = spacy.load("en_core_web_sm")
+                nlp.add_pipe("textrank")
+                _nlp = nlp
+    return _nlp
 
+def get_kw_extractor():
+    global _kw_extractor
+    if _kw_extractor is None:
+        _kw_extractor = yake.KeywordExtractor(lan="en", n=3, top=5)
+    return _kw_extractor
+
+def combine_keywords(text, doc):
+    # YAKE keyword extraction
+    yake_keywords = [kw for kw, score in get_kw_extractor().extract_keywords(text)]
     # spaCy + pytextrank keyword extraction
-    nlp = spacy.load("en_core_web_sm")
-    nlp.add_pipe("textrank")
-    doc = nlp(text)
     textrank_keywords = [phrase.text for phrase in doc._.phrases[:5]]
-
     # Combine and remove duplicates
-    combined_keywords = list(dict.fromkeys(yake_keywords + textrank_keywords))
-    
-    chunk['keywords'] = combined_keywords
+    return list(dict.fromkeys(yake_keywords + textrank_keywords))
+
+def extract_keywords(chunk):
+    text = chunk['text']
+    chunk['keywords'] = combine_keywords(text, get_nlp()(text))
     return chunk
 
 def extract_keywords_from_chunks(chunks):
     return [extract_keywords(chunk) for chunk in chunks]
 
+def extract_keywords_batch(batch, batch_size=32):
+    """
+    Fills in the keywords of every record in a ChunkBatch, streaming the texts through spaCy with nlp.pipe.
+    """
+    texts = batch.texts
+    for record, text, doc in zip(batch.records, texts, get_nlp().pipe(texts, batch_size=batch_size)):
+        record.keywords = combine_keywords(text, doc)
+    return batch
+
 if __name__ == "__main__":
     print(samplechunk)
     print() 
@@ -1,6 +1,6 @@
-from .chunking import create_chunks
-from .sbert import create_embedding, create_embedding_for_chunks
-from .keywordextraction import extract_keywords, extract_keywords_from_chunks
+from .chunking import create_chunk_batch
+from .sbert import embed_batch
+from .keywordextraction import extract_keywords_batch
 
 
 # chunks = create_chunks("Data/pdf/FALLSEM2025-26_VL_BCSE306L_00100_TH_2025-07-28_Module-2.pdf.txt")
@@ -9,11 +9,26 @@ from .keywordextraction import extract_keywords, extract_keywords_from_chunks
 # chunks = create_chunks("Data/ppts/FALLSEM2025-26_VL_BCSE306L_00100_TH_2025-07-25_Introduction-to-AI.pptx.txt")
 # print(chunks[0])
 
+def process_document(file_path: str, deduplicator=None):
+    """
+    Chunks, embeds and keywords one document, returning a ChunkBatch whose embeddings are a
+    single float32 array. Use batch.to_chroma() to write it.
+
+    With a dedup.ChunkDeduplicator, chunks that duplicate one already seen in this ingestion run
+    are dropped before embedding and recorded as references on the canonical chunk.
+    """
+    batch = create_chunk_batch(file_path)
+    if deduplicator is not None:
+        deduplicator.filter_batch(batch)
+    embed_batch(batch)
+    extract_keywords_batch(batch)
+    return batch
+
 def process_pipeline(file_path: str):
-    chunks = create_chunks(file_path)
-    chunks_embedded = create_embedding_for_chunks(chunks)
-    chunks_final = extract_keywords_from_chunks(chunks_embedded)
-    return chunks_final
+    """
+    Same as process_document, returned as the list of dict chunk packages.
+    """
+    return process_document(file_path).to_packages()
 
 if __name__ == "__main__":
     file_path = "Data/pdf/FALLSEM2025-26_VL_BCSE306L_00100_TH_2025-07-28_Module-1.pdf.txt"
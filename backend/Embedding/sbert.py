@@ -1,21 +1,46 @@
 sample_chunk = {'id': 'FALLSEM2025-26_VL_BCSE306L_00100_TH_2025-07-25_Introduction-to-AI_chunk_010', 'source_document': 'FALLSEM2025-26_VL_BCSE306L_00100_TH_2025-07-25_Introduction-to-AI.pptx', 'page_number': 10, 'keywords': ['Social Media Social', 'Media Social Media', 'digital world', 'Data Security', 'growing very rapidly', 'AI', 'various travel related works', 'Travel industries', 'travel industries', 'data'], 'text': 'Cont…\nAI in Data Security\nThe security of data is crucial for every company and cyber-attacks are growing very rapidly in the digital world. AI can be used to make your data more safe and secure. Some examples such as AEG bot, AI2 Platform,are used to determine software bug and cyber-attacks in a better way.\n AI in Social Media\nSocial Media sites such as Facebook, Twitter, and Snapchat contain billions of user profiles, which need to be stored and managed in a very efficient way. AI can organize and manage massive amounts of data. AI can analyze lots of data to identify the latest trends, hashtag, and requirement of different users.\nAI in Travel & Transport\nAI is becoming highly demanding for travel industries. AI is capable of doing various travel related works such as from making travel arrangement to suggesting the hotels, flights, and best routes to the customers. Travel industries are using AI-powered chatbots which can make human-like interaction with customers for better and fast response.', 'embedding': None}
 
-from sentence_transformers import SentenceTransformer
+import os
+import threading
 
-# Load the model
-model = SentenceTransformer('all-MiniLM-L6-v2')
+# Texts encoded per forward pass when embedding a whole document.
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+
+_model = None
+_model_lock = threading.Lock()
+
+def get_model():
+    """
+    Returns the 'all-MiniLM-L6-v2' model, loading it on first use.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from sentence_transformers import SentenceTransformer
+                _model = SentenceTransformer('all-MiniLM-L6-v2')
+    return _model
 
 def create_embedding(chunk):
     """
     Generates an embedding for the text in a chunk using 'all-MiniLM-L6-v2'.
     """
     text_to_embed = chunk['text']
-    embedding = model.encode(text_to_embed)
+    embedding = get_model().encode(text_to_embed)
     chunk['embedding'] = embedding.tolist()  # Convert numpy array to list for easier handling (e.g., JSON)
     return chunk
 def create_embedding_for_chunks(chunks):
     return [create_embedding(chunk) for chunk in chunks]
 
+def embed_batch(batch, batch_size=EMBEDDING_BATCH_SIZE):
+    """
+    Embeds every chunk of a ChunkBatch in batched forward passes and stores the result
+    in batch.embeddings as one float32 array.
+    """
+    if len(batch):
+        batch.set_embeddings(get_model().encode(batch.texts, batch_size=batch_size, convert_to_numpy=True))
+    return batch
+
 if __name__ == "__main__":
     print("Original chunk:")
     print(sample_chunk)
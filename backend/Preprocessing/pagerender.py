@@ -0,0 +1,161 @@
+import os
+import sys
+import math
+import shutil
+import logging
+import tempfile
+
+# Renders single pages of course PDFs for citation previews, so the frontend can show
+# "(Source: X, Page: N)" without downloading the whole document.
+#
+# Renders are cached on disk:
+#   <cache_dir>/<course_dir>/<file_name>/<version>/<page>_<zoom>.<ext>
+# where <version> is derived from the source's mtime and size, so an edited PDF is re-rendered.
+# The first render of a new version removes the file's older <version> directories.
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+PAGE_CACHE_DIR = os.getenv("PAGE_CACHE_DIR", os.path.join(project_root, 'Data', '.cache', 'pages'))
+
+PAGE_FORMATS = {"png": "image/png", "jpg": "image/jpeg", "pdf": "application/pdf"}
+DEFAULT_ZOOM = float(os.getenv("PAGE_RENDER_ZOOM", "1.0"))    # 1.0 = 72 dpi
+MIN_ZOOM, MAX_ZOOM = 0.25, 3.0
+JPEG_QUALITY = int(os.getenv("PAGE_RENDER_JPEG_QUALITY", "80"))
+
+
+class PageNotFound(Exception):
+    pass
+
+
+def clamp_zoom(zoom):
+    """
+    Limits the zoom factor to a sane range and rounds it, so the cache keys stay few. NaN and
+    infinities (which min/max let through) fall back to DEFAULT_ZOOM.
+    """
+    zoom = float(zoom)
+    if not math.isfinite(zoom):
+        zoom = DEFAULT_ZOOM
+    return round(min(max(zoom, MIN_ZOOM), MAX_ZOOM), 2)
+
+
+def _version(pdf_path):
+    stat = os.stat(pdf_path)
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+
+def cache_path(pdf_path, page_number, fmt="png", zoom=DEFAULT_ZOOM):
+    """
+    Returns where the render of a page is cached. Single-page PDFs do not depend on the zoom.
+    """
+    course_dir = os.path.basename(os.path.dirname(os.path.abspath(pdf_path)))
+    zoom_part = "" if fmt == "pdf" else f"_{clamp_zoom(zoom)}"
+    return os.path.join(PAGE_CACHE_DIR, course_dir, os.path.basename(pdf_path), _version(pdf_path),
+                        f"{page_number}{zoom_part}.{fmt}")
+
+
+def _prune_versions(version_dir):
+    """
+    Removes the renders of every other version of the same source file.
+    """
+    file_dir, current = os.path.split(version_dir)
+    for name in os.listdir(file_dir):
+        if name != current:
+            shutil.rmtree(os.path.join(file_dir, name), ignore_errors=True)
+
+
+def _write(path, data):
+    """
+    Writes a render atomically so concurrent readers never see a partial file. Creating a new
+    version directory prunes the older ones.
+    """
+    version_dir = os.path.dirname(path)
+    if not os.path.isdir(version_dir):
+        os.makedirs(version_dir, exist_ok=True)
+        _prune_versions(version_dir)
+    fd, tmp_path = tempfile.mkstemp(dir=version_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _render(doc, page_number, fmt, zoom):
+    import pymupdf
+
+    if not 1 <= page_number <= doc.page_count:
+        raise PageNotFound(f"Page {page_number} is out of range (1-{doc.page_count})")
+    index = page_number - 1
+    if fmt == "pdf":
+        with pymupdf.open() as single:
+            single.insert_pdf(doc, from_page=index, to_page=index)
+            return single.tobytes(garbage=3, deflate=True)
+    pixmap = doc[index].get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), alpha=False)
+    if fmt == "jpg":
+        return pixmap.tobytes("jpg", jpg_quality=JPEG_QUALITY)
+    return pixmap.tobytes("png")
+
+
+def render_page(pdf_path, page_number, fmt="png", zoom=DEFAULT_ZOOM):
+    """
+    Returns the cached render of one page, rendering and caching it on a miss.
+
+    Args:
+        pdf_path: Path to the source PDF.
+        page_number: 1-based page number, as used in citations.
+        fmt: "png", "jpg" or "pdf" (a single-page PDF).
+        zoom: Scale factor for image formats.
+
+    Returns:
+        str: Path to the cached file.
+    """
+    if fmt not in PAGE_FORMATS:
+        raise ValueError(f"Unsupported page format: {fmt}")
+    zoom = clamp_zoom(zoom)
+    path = cache_path(pdf_path, page_number, fmt, zoom)
+    if os.path.exists(path):
+        return path
+
+    import pymupdf
+    with pymupdf.open(pdf_path) as doc:
+        _write(path, _render(doc, page_number, fmt, zoom))
+    return path
+
+
+def prerender_document(pdf_path, pages=None, formats=("png",), zoom=DEFAULT_ZOOM):
+    """
+    Renders the given pages (all pages by default) of a PDF into the cache, opening it once.
+
+    Returns:
+        int: The number of pages rendered (already cached pages are skipped).
+    """
+    import pymupdf
+
+    zoom = clamp_zoom(zoom)
+    rendered = 0
+    with pymupdf.open(pdf_path) as doc:
+        page_numbers = sorted(set(pages)) if pages else range(1, doc.page_count + 1)
+        for page_number in page_numbers:
+            for fmt in formats:
+                path = cache_path(pdf_path, page_number, fmt, zoom)
+                if os.path.exists(path):
+                    continue
+                try:
+                    _write(path, _render(doc, page_number, fmt, zoom))
+                    rendered += 1
+                except PageNotFound as e:
+                    logging.warning(f"Skipping {pdf_path}: {e}")
+    return rendered
+
+
+if __name__ == "__main__":
+    # Pre-render every page of every PDF in a course directory:
+    #   python Preprocessing/pagerender.py ../Data/aws [zoom]
+    course_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(project_root, 'Data', 'aws')
+    zoom = float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_ZOOM
+    for filename in sorted(os.listdir(course_dir)):
+        if filename.endswith(".pdf"):
+            count = prerender_document(os.path.join(course_dir, filename), zoom=zoom)
+            print(f"{filename}: rendered {count} page(s)")
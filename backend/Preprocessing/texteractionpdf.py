@@ -7,10 +7,14 @@ from imagedescription import extract_text_from_image, generate_image_description
 # - Extracts all images from each page, gets their text description using Google Vision API.
 # - Combines the page text and image text into a single .txt file.
 
-def extract_text_and_images_from_pdf(fname):
+def extract_pdf_pages(fname, first_page=1, last_page=None):
     """
-    Extracts text and images from the given PDF file, gets text from the images,
-    and combines everything into a single text file.
+    Extracts text and images from pages first_page..last_page (1-based, inclusive; default: to
+    the end) of the given PDF file and gets text from the images.
+
+    Returns:
+        str: The pages in the .pdf.txt format. Texts of consecutive page ranges joined with a
+             form feed give the same text as extracting the whole file at once.
     """
     # 2. Initialize time trackers
     start_time = time.time()
@@ -22,11 +26,12 @@ def extract_text_and_images_from_pdf(fname):
     with pymupdf.open(fname) as doc:
         # Create a directory for images, as we still need to save them temporarily
         img_dir = fname + "_images"
-        if not os.path.exists(img_dir):
-            os.makedirs(img_dir)
+        os.makedirs(img_dir, exist_ok=True)
+        last_page = doc.page_count if last_page is None else min(last_page, doc.page_count)
 
         # Process each page one by one
-        for i, page in enumerate(doc):
+        for i in range(first_page - 1, last_page):
+            page = doc[i]
             # 3. Add the sleep logic at the start of the loop
             current_time = time.time()
             if current_time - last_sleep_time >= 60:
@@ -67,8 +72,15 @@ def extract_text_and_images_from_pdf(fname):
             # 5. Add the page completion marker
             all_content_parts.append(f"\npage{i+1} complete\n")
 
-    # 6. Join all the collected parts and write to the final .txt file
-    final_text = chr(12).join(all_content_parts)
+    # 6. Join all the collected parts
+    return chr(12).join(all_content_parts)
+
+def extract_text_and_images_from_pdf(fname):
+    """
+    Extracts text and images from the given PDF file, gets text from the images,
+    and combines everything into a single text file.
+    """
+    final_text = extract_pdf_pages(fname)
     pathlib.Path(fname + ".txt").write_bytes(final_text.encode("utf-8"))
 
 if __name__ == "__main__":
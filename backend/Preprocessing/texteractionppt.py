@@ -3,12 +3,11 @@
 from pptx import Presentation
 import os,  pathlib, sys
 
-def extract_text_from_pptx(file_path):
+def pptx_text(file_path):
     """
-    Extracts text from all slides in the given PPTX file.
+    Returns the text of all slides in the given PPTX file in the .pptx.txt format.
     - For each slide, collects all text from shapes.
     - Marks the end of each slide.
-    - Saves the extracted text as <pptx>.txt.
     """
     prs = Presentation(file_path)
     text_runs = []
@@ -19,8 +18,13 @@ def extract_text_from_pptx(file_path):
                 slide_text.append(shape.text)
         text_runs.append("\n".join(slide_text))
         text_runs.append(f"slide{i+1} complete")
-    text = "\n".join(text_runs)
-    pathlib.Path(file_path + ".txt").write_bytes(text.encode())
+    return "\n".join(text_runs)
+
+def extract_text_from_pptx(file_path):
+    """
+    Extracts text from all slides in the given PPTX file and saves it as <pptx>.txt.
+    """
+    pathlib.Path(file_path + ".txt").write_bytes(pptx_text(file_path).encode())
 
 # Example usage: extract text from a sample PPTX file.
 if __name__ == "__main__":
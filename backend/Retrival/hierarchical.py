@@ -0,0 +1,202 @@
+import os
+import time
+import threading
+
+from utils import metrics
+from Retrival import scoped_index
+from Retrival.scoped_index import Scope
+
+# Two-stage retrieval for course-wide questions.
+#
+# Stage one searches the document and section centroids stored in "<collection>__docs"
+# (Embedding/centroids.py), held in memory per worker and reloaded every DOCS_COLLECTION_TTL
+# seconds, and keeps the HIERARCHICAL_TOP_DOCUMENTS source documents whose closest centroid is
+# nearest the query. Every centroid is scored, so a long book's many sections cannot crowd the
+# other documents out of a fixed candidate list.
+# Stage two runs the page-level search only inside those documents, through their per-source
+# sub-indexes (Retrival/scoped_index.py), and merges the results. The work per query then depends
+# on the number of documents and the size of the few selected documents, not on the whole course.
+# The sub-indexes are copies of chunk embeddings held per worker, bounded by
+# SCOPED_INDEX_MAX_BYTES; a Chroma query with the sources as a `where` filter avoids the copies
+# but scans the filtered chunks (about 20-50 ms per query at 20k chunks, against 3 ms flat).
+#
+# Collections without centroids, or with fewer than HIERARCHICAL_MIN_DOCUMENTS documents, are
+# searched flat as before. HIERARCHICAL_RETRIEVAL=0 always searches flat.
+#
+# Build centroids for collections ingested before they existed (from the backend directory):
+#   python -m Retrival.hierarchical build aws database operating_systems
+
+HIERARCHICAL_RETRIEVAL = os.getenv("HIERARCHICAL_RETRIEVAL", "1") == "1"
+HIERARCHICAL_TOP_DOCUMENTS = int(os.getenv("HIERARCHICAL_TOP_DOCUMENTS", "4"))
+HIERARCHICAL_MIN_DOCUMENTS = int(os.getenv("HIERARCHICAL_MIN_DOCUMENTS", "8"))
+DOCS_COLLECTION_TTL = float(os.getenv("DOCS_COLLECTION_TTL", "60"))
+
+retrieval_queries = metrics.counter("retrieval_queries_total", "Course-wide retrieval queries, by strategy.")
+
+_centroids = {}   # collection name -> (centroid SourceIndex or None, loaded at)
+_centroids_lock = threading.Lock()
+
+
+class CentroidIndex(scoped_index.SourceIndex):
+    """
+    A collection's document and section centroids, with the rows grouped by source so the
+    closest centroid of every source can be taken in one pass.
+    """
+
+    def __init__(self, ids, embeddings, metadatas, space="l2"):
+        import numpy as np
+        order = sorted(range(len(ids)), key=lambda i: metadatas[i]["source"])
+        metadatas = [metadatas[i] for i in order]
+        super().__init__([ids[i] for i in order], np.asarray(embeddings, dtype=np.float32)[order],
+                         [None] * len(ids), metadatas, space)
+        # Source names, and the first row of each source's run of rows.
+        self.sources, self.starts = [], []
+        for row, metadata in enumerate(metadatas):
+            if not self.sources or self.sources[-1] != metadata["source"]:
+                self.sources.append(metadata["source"])
+                self.starts.append(row)
+
+    def source_distances(self, query_embedding):
+        """
+        Distance from the query to each source's closest centroid, in the order of self.sources.
+        """
+        import numpy as np
+        query = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+        return np.minimum.reduceat(self.distances(query), self.starts)
+
+
+def load_centroids(client, collection_name):
+    """
+    Reads a collection's centroids into an in-memory index searched by brute force (a few
+    vectors per document, so this is far cheaper than a Chroma round trip).
+
+    Returns:
+        CentroidIndex: The centroids, or None if the collection has none or has fewer than
+                       HIERARCHICAL_MIN_DOCUMENTS documents.
+    """
+    from Embedding.centroids import docs_collection_name
+    from Database.indexconfig import collection_space
+
+    try:
+        docs = client.get_collection(name=docs_collection_name(collection_name))
+        records = docs.get(include=["embeddings", "metadatas"])
+    except Exception:
+        return None
+    if sum(1 for m in records["metadatas"] if m.get("level") == "document") < HIERARCHICAL_MIN_DOCUMENTS:
+        return None
+    return CentroidIndex(records["ids"], records["embeddings"], records["metadatas"], collection_space(docs))
+
+
+def get_centroids(client, collection_name):
+    """
+    Returns the cached centroid index of a collection (see load_centroids), reloading it after
+    DOCS_COLLECTION_TTL seconds.
+    """
+    with _centroids_lock:
+        entry = _centroids.get(collection_name)
+        if entry and time.monotonic() - entry[1] < DOCS_COLLECTION_TTL:
+            return entry[0]
+    centroids = load_centroids(client, collection_name)
+    with _centroids_lock:
+        _centroids[collection_name] = (centroids, time.monotonic())
+    return centroids
+
+
+def invalidate(collection_name=None):
+    """
+    Drops cached centroids for one collection (or all of them).
+    """
+    with _centroids_lock:
+        for name in [name for name in _centroids if collection_name is None or name == collection_name]:
+            del _centroids[name]
+
+
+def select_documents(centroids, query_embedding, top_documents=HIERARCHICAL_TOP_DOCUMENTS):
+    """
+    Stage one: returns the sources of the top_documents documents whose closest centroid
+    (document or section level) is nearest the query, best first.
+    """
+    import numpy as np
+    distances = centroids.source_distances(query_embedding)
+    k = min(top_documents, len(distances))
+    if k <= 0:
+        return []
+    top = np.argpartition(distances, k - 1)[:k] if k < len(distances) else np.arange(len(distances))
+    return [centroids.sources[i] for i in top[np.argsort(distances[top], kind="stable")]]
+
+
+def merge_results(results, n_results):
+    """
+    Merges collection.query()-shaped results by distance, dropping repeated ids.
+    """
+    rows, seen = [], set()
+    for result in results:
+        for row in zip(result["distances"][0], result["ids"][0], result["documents"][0], result["metadatas"][0]):
+            rows.append(row)
+    rows.sort(key=lambda row: row[0])
+    merged = {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+    for distance, chunk_id, document, metadata in rows:
+        if chunk_id in seen:
+            continue
+        seen.add(chunk_id)
+        merged["ids"][0].append(chunk_id)
+        merged["documents"][0].append(document)
+        merged["metadatas"][0].append(metadata)
+        merged["distances"][0].append(distance)
+        if len(seen) == n_results:
+            break
+    return merged
+
+
+def query(client, collection, query_embedding, n_results, top_documents=HIERARCHICAL_TOP_DOCUMENTS):
+    """
+    Runs a course-wide query, in two stages when the collection has centroids.
+
+    Returns:
+        dict: Results shaped like collection.query() for a single query.
+    """
+    centroids = get_centroids(client, collection.name) if HIERARCHICAL_RETRIEVAL else None
+    if centroids is None:
+        retrieval_queries.inc(strategy="flat")
+        return collection.query(query_embeddings=[query_embedding], n_results=n_results)
+
+    retrieval_queries.inc(strategy="two_stage")
+    sources = select_documents(centroids, query_embedding, top_documents)
+    return merge_results([scoped_index.query(collection, Scope(source, None, None), query_embedding, n_results)
+                          for source in sources], n_results)
+
+
+def build_centroids(client, collection_name):
+    """
+    (Re)builds the centroid collection of an existing collection.
+
+    Returns:
+        int: Number of centroid records written.
+    """
+    from Embedding.centroids import collection_centroids, docs_collection_name
+    from Database.indexconfig import get_or_create_collection, index_config_of
+
+    collection = client.get_collection(name=collection_name)
+    docs = get_or_create_collection(client, docs_collection_name(collection_name), index_config_of(collection))
+    written = 0
+    for records in collection_centroids(collection):
+        docs.upsert(**records)
+        written += len(records["ids"])
+    invalidate(collection_name)
+    return written
+
+
+if __name__ == "__main__":
+    import argparse
+    from Database.vectorstore import open_client
+
+    parser = argparse.ArgumentParser(description="Build document/section centroids for two-stage retrieval.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_cmd = commands.add_parser("build", help="Compute centroids for existing collections.")
+    build_cmd.add_argument("collections", nargs="+")
+    args = parser.parse_args()
+
+    client = open_client()
+    for name in args.collections:
+        started = time.perf_counter()
+        print(f"{name}: {build_centroids(client, name)} centroids in {time.perf_counter() - started:.1f}s")
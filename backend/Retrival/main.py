@@ -1,61 +1,178 @@
-import chromadb
-from sentence_transformers import SentenceTransformer
-import google.generativeai as genai
 import os
-from dotenv import load_dotenv
-import redis
-from  utils.api_key_manager import get_next_api_key
 import re
+import json
+import threading
+from dotenv import load_dotenv
+from utils.api_key_manager import get_scheduler
+from utils.llm_client import generate_text
+from utils.singleflight import SingleFlight
+from utils.microbatch import MicroBatcher
+from utils import metrics
+from utils.tracing import span, cache_lookup
+from Database.vectorstore import open_client
+from Database import aliases
+from Retrival import scoped_index, hierarchical, session_cache
 
 # --- 1. SETUP ---
 # This section initializes the necessary components.
+# chromadb and sentence-transformers are heavy to import and the Chroma setup touches
+# the disk, so nothing is created at import time. Each component is built on first use
+# (or eagerly by warmup()). Gemini calls go through utils.llm_client, which reserves a
+# key from the scheduler for every call.
 
 # Load environment variables from the .env file in the project root
 load_dotenv()
 
-# It's recommended to set your Gemini API key as an environment variable for security.
-# In your terminal, run: export GEMINI_API_KEY='YOUR_API_KEY'
-try:
-    key = get_next_api_key()
-    genai.configure(api_key=os.environ[key])
-except KeyError:
-    print("Error: GEMINI_API_KEY environment variable not set.")
-    exit()
+# Connect to the persistent database stored in the 'Database/db' directory (or CHROMA_DB_PATH),
+# or to the shared index server when VECTOR_STORE_MODE=server (see Database/vectorstore.py)
+db_path = os.getenv("CHROMA_DB_PATH", os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Database', 'db')))
+
+_setup_lock = threading.Lock()
+_embedding_model = None
+_client = None
+
+
+def get_embedding_model():
+    """
+    Returns the embedding model, which must be the same one used to create the embeddings in your database.
+    """
+    global _embedding_model
+    if _embedding_model is None:
+        with _setup_lock:
+            if _embedding_model is None:
+                from sentence_transformers import SentenceTransformer
+                print("Loading embedding model...")
+                _embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+    return _embedding_model
+
+
+# Concurrent requests in a worker encode their queries together: encode requests arriving within
+# QUERY_BATCH_WINDOW_MS of the first waiting one (up to QUERY_BATCH_MAX) run as one batched
+# encode (utils/microbatch.py). QUERY_BATCH_MAX=1 encodes every query on its own thread.
+QUERY_BATCH_WINDOW_MS = float(os.getenv("QUERY_BATCH_WINDOW_MS", "2"))
+QUERY_BATCH_MAX = int(os.getenv("QUERY_BATCH_MAX", "32"))
+
+
+def _encode_batch(texts):
+    return get_embedding_model().encode(texts, batch_size=len(texts), convert_to_numpy=True)
+
+
+_query_batcher = MicroBatcher("query_encode", _encode_batch, window=QUERY_BATCH_WINDOW_MS / 1000,
+                              max_batch=QUERY_BATCH_MAX)
+
+
+def encode_query(text):
+    """
+    Returns the embedding of one query (a numpy vector), batched with concurrent queries.
+    """
+    if QUERY_BATCH_MAX <= 1:
+        return get_embedding_model().encode(text)
+    return _query_batcher.submit(text)
+
+
+def get_client():
+    """
+    Returns the ChromaDB client for the collections where your notes are stored.
+    """
+    global _client
+    if _client is None:
+        with _setup_lock:
+            if _client is None:
+                print("Connecting to vector database...")
+                _client = open_client(db_path=db_path)
+    return _client
 
 
-# Initialize the embedding model, which must be the same one used to create the embeddings in your database.
-print("Loading embedding model...")
-embedding_model = SentenceTransformer('all-MiniLM-L6-v2') 
+def warmup():
+    """
+    Eagerly builds every lazily initialised component so the first request does not pay for it.
+    Called from the gunicorn worker startup hook when PRELOAD_MODELS is enabled.
+    """
+    get_client()
+    get_embedding_model()
+    get_scheduler()
+
+
+_serving = {}   # course collection (alias) -> versioned collection last served by this worker
+_serving_lock = threading.Lock()
+
+
+def get_course_collection(collection_name):
+    """
+    Returns the collection a course name currently points to (see Database/aliases.py). When the
+    alias has moved to a new version, this worker's caches tied to the old one are dropped.
+    """
+    name = aliases.resolve(get_client(), collection_name)
+    with _serving_lock:
+        previous = _serving.get(collection_name)
+        _serving[collection_name] = name
+    if previous is not None and previous != name:
+        print(f"Collection '{collection_name}' moved from '{previous}' to '{name}'; dropping cached state.")
+        scoped_index.invalidate(previous)
+        hierarchical.invalidate(previous)
+    return get_client().get_collection(name=name)
 
-# Initialize the ChromaDB client and get the collection where your notes are stored.
-print("Connecting to vector database...")
-# Connect to the persistent database stored in the 'Database/db' directory
-db_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Database', 'db'))
-client = chromadb.PersistentClient(path=db_path)
 
 # --- 2. THE RAG LOOP ---
 # This function encapsulates the entire Retrieval-Augmented Generation process.
 
-def answer_question(user_question, course_name):
+# Map course_name to collection_name
+COURSE_COLLECTIONS = {
+    "database-systems": "database",
+    "operating-systems": "operating_systems",
+    "cloud-computing": "aws"
+}
+
+# Topic extraction only improves the search query, so it gets a short deadline and falls back
+# to the original question; the final answer uses the default LLM_DEADLINE_SECONDS.
+TOPIC_EXTRACTION_DEADLINE_SECONDS = float(os.getenv("TOPIC_EXTRACTION_DEADLINE_SECONDS", "10"))
+
+# Identical questions for the same course that arrive while one is being answered share
+# that pipeline run (per worker process) instead of each calling Gemini twice.
+LLM_CALLS_PER_ANSWER = 2  # topic extraction + final answer
+_in_flight_answers = SingleFlight()
+answer_requests = metrics.counter("answer_requests_total", "Questions received by answer_question.")
+answer_coalesced = metrics.counter("answer_coalesced_total", "Questions answered by joining an identical in-flight request.")
+llm_calls_saved = metrics.counter("llm_calls_saved_total", "Gemini calls avoided by request coalescing.")
+
+
+def normalize_question(question):
     """
-    Takes a user's question, retrieves relevant context from the database,
-    and generates a synthesized answer using an LLM.
+    Normalizes a question for matching: lowercase, collapsed whitespace, no trailing punctuation.
     """
-    print(f"\nProcessing question: '{user_question}' for course: '{course_name}'")
+    return re.sub(r'\s+', ' ', question.strip().lower()).rstrip(' ?!.')
 
-    # Map course_name to collection_name
-    course_to_collection_map = {
-        "database-systems": "database",
-        "operating-systems": "operating_systems",
-        "cloud-computing": "aws"
-    }
-    collection_name = course_to_collection_map.get(course_name)
 
-    if not collection_name:
-        return f"Error: No collection found for course '{course_name}'."
-
-    collection = client.get_collection(name=collection_name)
+def answer_question(user_question, course_name, scope=None, session_id=None):
+    """
+    Answers a question, coalescing concurrent identical requests for the same course
+    (and scope, and session) into a single run of the RAG pipeline.
+
+    Args:
+        user_question: The student's question.
+        course_name: Course slug, e.g. "cloud-computing".
+        scope: Optional scoped_index.Scope restricting retrieval to one source file and page range.
+        session_id: Optional session id; follow-ups reuse the session's retrieval (see Retrival/session_cache.py).
+    """
+    answer_requests.inc()
+    key = (course_name, normalize_question(user_question), scope, session_id)
+    answer, shared = _in_flight_answers.do(key, run_answer_pipeline, user_question, course_name, scope, session_id)
+    cache_lookup("answer", "hit" if shared else "miss")
+    if shared:
+        answer_coalesced.inc()
+        llm_calls_saved.inc(LLM_CALLS_PER_ANSWER)
+        print(f"Reused in-flight answer for: '{user_question}' ({course_name})")
+    return answer
+
+
+def retrieve_context(user_question, collection, scope=None):
+    """
+    Retrieves the chunks for a question: extracts search topics with Gemini, embeds them and
+    queries the collection (or the scope's sub-index).
 
+    Returns:
+        tuple: (query embedding, results shaped like collection.query())
+    """
     # New Step: Use Gemini to extract key topics from the user question for better retrieval.
     print("Analyzing user question to extract key topics...")
     topic_extraction_prompt = f"""
@@ -67,34 +184,86 @@ def answer_question(user_question, course_name):
 
     KEYWORDS:
     """
-    try:
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        response = model.generate_content(topic_extraction_prompt)
-        search_query = response.text.strip()
-        print(f"Using extracted topics for search: '{search_query}'")
-    except Exception as e:
-        print(f"Could not extract topics, falling back to original question. Error: {e}")
-        search_query = user_question
+    with span("topics"):
+        try:
+            search_query = generate_text(topic_extraction_prompt, deadline=TOPIC_EXTRACTION_DEADLINE_SECONDS).strip()
+            print(f"Using extracted topics for search: '{search_query}'")
+        except Exception as e:
+            print(f"Could not extract topics, falling back to original question. Error: {e}")
+            search_query = user_question
 
     # Step 1: Embed the search query.
     # The query (either original or extracted topics) is converted into a vector.
-    query_embedding = embedding_model.encode(search_query).tolist()
+    with span("encode"):
+        query_embedding = encode_query(search_query).tolist()
 
     # Step 2: Query the vector database to retrieve relevant context[cite: 51].
     # The database performs a similarity search to find the most contextually relevant text chunks[cite: 47].
     print("Retrieving relevant context from notes...")
-    retrieved_results = collection.query(
-        query_embeddings=[query_embedding],
-        n_results=15 # Retrieve the top 5 most relevant chunks[cite: 232].
-    )
+    with span("query"):
+        if scope is not None:
+            # Scoped questions search only that document's sub-index (see Retrival/scoped_index.py).
+            retrieved_results = scoped_index.query(collection, scope, query_embedding, n_results=15)
+        else:
+            # Two-stage search (document centroids first) when the collection has centroids.
+            retrieved_results = hierarchical.query(
+                get_client(), collection, query_embedding,
+                n_results=15 # Retrieve the top 5 most relevant chunks[cite: 232].
+            )
+
+    return query_embedding, retrieved_results
+
+
+def run_answer_pipeline(user_question, course_name, scope=None, session_id=None):
+    """
+    Takes a user's question, retrieves relevant context from the database,
+    and generates a synthesized answer using an LLM. With a scope, only chunks
+    of that source (and page range) are retrieved. With a session id, a follow-up
+    question re-ranks the chunks the session already retrieved instead of searching.
+    """
+    print(f"\nProcessing question: '{user_question}' for course: '{course_name}'")
+
+    collection_name = COURSE_COLLECTIONS.get(course_name)
+
+    if not collection_name:
+        return f"Error: No collection found for course '{course_name}'."
+
+    with span("collection"):
+        collection = get_course_collection(collection_name)
+
+    # Follow-ups within a session skip topic extraction and the course-wide search.
+    session = session_cache.get_session(session_id, course_name, collection.name) if session_id and scope is None else None
+    followup = False
+    if session is not None:
+        with span("encode"):
+            question_embedding = encode_query(user_question)
+        followup = session_cache.is_followup(user_question, question_embedding, session)
+
+    if followup:
+        print("Follow-up question: re-ranking the session's retrieved context...")
+        query_embedding = session_cache.followup_query(question_embedding, session)
+        with span("query"):
+            retrieved_results = session_cache.query(collection, session, query_embedding, n_results=15)
+    else:
+        query_embedding, retrieved_results = retrieve_context(user_question, collection, scope)
+
+    if session_id and scope is None:
+        session_cache.remember(session_id, course_name, collection.name, user_question, query_embedding,
+                               retrieved_results, session=session, followup=followup)
 
     # Extract the retrieved text chunks (documents) and their metadata.
     retrieved_documents = retrieved_results['documents'][0]
     retrieved_metadatas = retrieved_results['metadatas'][0]
 
+    if scope is not None and not retrieved_documents:
+        return f"Error: No notes found for '{scope.source}' in course '{course_name}' within the requested pages."
+
     # Format the retrieved context into a single string.
     context_string = "\n\n---\n\n".join(retrieved_documents)
 
+    # A follow-up is asked in the context of the question that started its topic.
+    prompt_question = f'{user_question} (follow-up to: "{session["topic"]}")' if followup else user_question
+
     # Step 3: Construct a comprehensive prompt for the LLM[cite: 241].
     # This prompt includes instructions, the retrieved context, and the user's question.
     # This structure forces the LLM to use only the provided context, preventing hallucinations.
@@ -120,18 +289,17 @@ def answer_question(user_question, course_name):
     ASSISTANT'S ANSWER:
     """
 
-    final_prompt = prompt_template.format(context=context_string, question=user_question)
+    with span("prompt"):
+        final_prompt = prompt_template.format(context=context_string, question=prompt_question)
 
     # Step 4: Send the prompt to the LLM to generate the final answer.
     # The LLM synthesizes a coherent answer based *only* on the augmented context.
     print("Generating final answer with Gemini...")
-    try:
-        # Using 'gemini-2.0-flash' which is a more stable and specific model identifier.
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        response = model.generate_content(final_prompt)
-        generated_answer = response.text
-    except Exception as e:
-        return f"An error occurred with the Gemini API: {e}"
+    with span("generate"):
+        try:
+            generated_answer = generate_text(final_prompt)
+        except Exception as e:
+            return f"An error occurred with the Gemini API: {e}"
 
     # Clean the generated answer to remove any stray citation markers.
     cleaned_answer = re.sub(r'\[cite: \d+\]', '', generated_answer).strip()
@@ -144,6 +312,9 @@ def answer_question(user_question, course_name):
         source = metadata.get('source', 'Unknown Source')
         page = metadata.get('page', 'N/A')
         citations.add(f"(Source: {source}, Page: {page})")
+        # A chunk deduplicated at ingestion also stands for its copies on other slides/pages.
+        for ref_source, ref_page in json.loads(metadata.get('references') or '[]'):
+            citations.add(f"(Source: {ref_source}, Page: {ref_page})")
     
     final_answer_with_citations = f"{cleaned_answer}\n\nSources:\n" + "\n".join(sorted(list(citations)))
 
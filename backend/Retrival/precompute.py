@@ -0,0 +1,299 @@
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import hashlib
+import logging
+import argparse
+import tempfile
+import threading
+
+# Add project root to Python path to resolve module imports
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from Retrival.main import COURSE_COLLECTIONS, get_client, normalize_question, run_answer_pipeline
+from Database import aliases
+from Scrapper.fetch_papers import COURSE_SUBJECTS, fetch_papers_from_api
+from Scrapper.qp_analyser import retrieve_questions_from_paper
+from utils import metrics
+from utils.tracing import cache_lookup
+
+# Precomputed answers for past-paper questions.
+#
+# Before exams most questions students ask are the ones in the past papers listed for their
+# course. A batch job (`run`) collects the questions Document AI extracted from every listed
+# paper, answers each distinct one through the normal RAG pipeline at a fixed rate (so it never
+# competes with live traffic for the Gemini key quota) and stores the answer with its citations.
+# /api/answer serves a stored answer directly when a course-wide question matches one.
+#
+# Matching uses question_key(): normalize_question() of the text without its paper numbering
+# ("Q3.", "(b)", "ii)") and marks ("[10 marks]"). Answers are stored per collection version, so
+# re-ingesting a course hides its old answers until the job runs again (and prunes them). The
+# version is the "version" metadata of the collection the course alias points to (set by
+# Database/reindex.py), otherwise that collection's id and record count.
+#
+# Layout:
+#   <PRECOMPUTED_ANSWERS_DIR>/<collection>/<version>/<question key>.json
+#       {"question", "course", "collection", "version", "answer", "citations", "papers", "created_at"}
+#
+# Usage (from the backend directory):
+#   python Retrival/precompute.py run cloud-computing --rpm 4
+#   python Retrival/precompute.py status cloud-computing
+
+PRECOMPUTED_ANSWERS = os.getenv("PRECOMPUTED_ANSWERS", "1") == "1"
+PRECOMPUTED_ANSWERS_DIR = os.getenv("PRECOMPUTED_ANSWERS_DIR", os.path.join(project_root, 'Data', '.cache', 'answers'))
+# Questions the batch job answers per minute; each answer is two Gemini calls.
+PRECOMPUTE_RPM = float(os.getenv("PRECOMPUTE_RPM", "4"))
+# How long a worker trusts a collection's version before reading it again.
+COLLECTION_VERSION_TTL = float(os.getenv("COLLECTION_VERSION_TTL", "60"))
+# The job stops after this many failed answers in a row (quota exhausted, Gemini down, ...).
+MAX_CONSECUTIVE_FAILURES = 3
+
+_NUMBERING = re.compile(r'^\s*(?:q(?:uestion)?\s*\.?\s*)?(?:\d{1,2}|[ivx]{1,4}|[a-h])\s*[.):\]]\s*|^\s*\((?:\d{1,2}|[ivx]{1,4}|[a-h])\)\s*', re.IGNORECASE)
+_MARKS = re.compile(r'\s*(?:[\[(]\s*\d+\s*(?:marks?|m)\s*[\])]|\[\s*\d+\s*\])[\s.?]*$', re.IGNORECASE)
+_ERROR_PREFIXES = ("Error:", "An error occurred with the Gemini API")
+_SOURCES_SEPARATOR = "\n\nSources:\n"
+
+precomputed_answers_served = metrics.counter("precomputed_answers_served_total", "Questions answered from precomputed answers.")
+
+_versions = {}  # versioned collection name -> (version, time.monotonic() when read)
+_versions_lock = threading.Lock()
+
+
+def question_key(question):
+    """
+    Returns the key a question is stored and looked up under (a SHA-1 of its matching form).
+    """
+    text = question
+    while True:
+        stripped = _MARKS.sub('', _NUMBERING.sub('', text, count=1))
+        if stripped == text:
+            break
+        text = stripped
+    return hashlib.sha1(normalize_question(text).encode('utf-8')).hexdigest()
+
+
+def collection_version(collection_name, client=None, refresh=False):
+    """
+    Returns the version of a collection's contents: its "version" metadata, or its id and
+    record count. Cached per process for COLLECTION_VERSION_TTL seconds, per collection the
+    alias resolves to, so an alias swap is seen as soon as the alias is.
+    """
+    client = client or get_client()
+    name = aliases.resolve(client, collection_name, refresh=refresh)
+    with _versions_lock:
+        cached = _versions.get(name)
+        if cached is not None and not refresh and time.monotonic() - cached[1] < COLLECTION_VERSION_TTL:
+            return cached[0]
+    collection = client.get_collection(name=name)
+    version = (collection.metadata or {}).get("version") or f"{collection.id}-{collection.count()}"
+    version = _safe_name(str(version))
+    with _versions_lock:
+        _versions[name] = (version, time.monotonic())
+    return version
+
+
+def _safe_name(name):
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+
+
+def _path(collection_name, version, key):
+    return os.path.join(PRECOMPUTED_ANSWERS_DIR, _safe_name(collection_name), version, key + ".json")
+
+
+def _read(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, json.JSONDecodeError) as e:
+        logging.warning(f"Ignoring unreadable precomputed answer {path}: {e}")
+        return None
+
+
+def _write(path, record):
+    """
+    Writes a record atomically so readers never see a partially written file.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def split_citations(answer):
+    """
+    Splits a pipeline answer into its text and the citation lines of its "Sources:" section.
+    """
+    text, separator, sources = answer.rpartition(_SOURCES_SEPARATOR)
+    if not separator:
+        return answer, []
+    return text, [line for line in sources.splitlines() if line.strip()]
+
+
+def lookup(course_name, question, client=None):
+    """
+    Returns the stored answer record for a course-wide question, or None.
+    """
+    if not PRECOMPUTED_ANSWERS:
+        return None
+    collection_name = COURSE_COLLECTIONS.get(course_name)
+    if not collection_name:
+        return None
+    try:
+        version = collection_version(collection_name, client)
+    except Exception as e:
+        logging.warning(f"Could not read the version of collection '{collection_name}': {e}")
+        return None
+    record = _read(_path(collection_name, version, question_key(question)))
+    cache_lookup("precomputed", "hit" if record else "miss")
+    if record:
+        precomputed_answers_served.inc()
+    return record
+
+
+def store(course_name, collection_name, version, question, answer, papers):
+    """
+    Saves a pipeline answer (with its citations split out) for a question.
+    """
+    _, citations = split_citations(answer)
+    record = {
+        "question": question,
+        "course": course_name,
+        "collection": collection_name,
+        "version": version,
+        "answer": answer,
+        "citations": citations,
+        "papers": papers,
+        "created_at": time.time(),
+    }
+    _write(_path(collection_name, version, question_key(question)), record)
+    return record
+
+
+def collect_questions(course_name):
+    """
+    Returns the distinct questions of every listed paper of a course, most repeated first, as
+    a list of (question, [paper ids]). Papers are analysed (and cached) if they were not yet.
+    """
+    subject = COURSE_SUBJECTS.get(course_name)
+    if not subject:
+        raise ValueError(f"No papers subject for course '{course_name}'")
+    questions = {}
+    for paper in fetch_papers_from_api(subject):
+        if not paper.get("pdf_link"):
+            continue
+        for question in retrieve_questions_from_paper(paper["pdf_link"]) or []:
+            if len(normalize_question(question)) < 8:
+                continue
+            entry = questions.setdefault(question_key(question), (question.strip(), []))
+            if paper["id"] not in entry[1]:
+                entry[1].append(paper["id"])
+    return sorted(questions.values(), key=lambda entry: len(entry[1]), reverse=True)
+
+
+def prune_versions(collection_name, keep_version):
+    """
+    Deletes the answers stored for every other version of a collection.
+
+    Returns:
+        int: Number of versions removed.
+    """
+    collection_dir = os.path.join(PRECOMPUTED_ANSWERS_DIR, _safe_name(collection_name))
+    if not os.path.isdir(collection_dir):
+        return 0
+    removed = 0
+    for version in os.listdir(collection_dir):
+        if version != keep_version:
+            shutil.rmtree(os.path.join(collection_dir, version), ignore_errors=True)
+            removed += 1
+    return removed
+
+
+def precompute_course(course_name, rpm=PRECOMPUTE_RPM, limit=None, refresh=False, client=None):
+    """
+    Answers the past-paper questions of a course that have no stored answer for the current
+    collection version, starting at most `rpm` answers per minute, then prunes other versions.
+
+    Args:
+        course_name: Course slug, e.g. "cloud-computing".
+        rpm: Answers started per minute.
+        limit: Answer at most this many questions in this run.
+        refresh: Answer questions again even if an answer is stored.
+
+    Returns:
+        dict: Counts of questions found, already stored, answered and failed.
+    """
+    collection_name = COURSE_COLLECTIONS.get(course_name)
+    if not collection_name:
+        raise ValueError(f"No collection found for course '{course_name}'")
+    version = collection_version(collection_name, client, refresh=True)
+    questions = collect_questions(course_name)
+    pending = [(q, papers) for q, papers in questions
+               if refresh or not os.path.exists(_path(collection_name, version, question_key(q)))]
+    stats = {"questions": len(questions), "stored": len(questions) - len(pending), "answered": 0, "failed": 0,
+             "version": version}
+    if limit is not None:
+        pending = pending[:limit]
+
+    interval = 60.0 / rpm if rpm > 0 else 0.0
+    next_start, consecutive_failures = time.monotonic(), 0
+    for question, papers in pending:
+        time.sleep(max(0.0, next_start - time.monotonic()))
+        next_start = time.monotonic() + interval
+        answer = run_answer_pipeline(question, course_name)
+        if answer.startswith(_ERROR_PREFIXES):
+            stats["failed"] += 1
+            consecutive_failures += 1
+            logging.warning(f"Could not answer '{question}': {answer}")
+            if consecutive_failures >= MAX_CONSECUTIVE_FAILURES:
+                logging.error(f"Stopping after {consecutive_failures} failed answers in a row")
+                break
+            continue
+        consecutive_failures = 0
+        store(course_name, collection_name, version, question, answer, papers)
+        stats["answered"] += 1
+
+    # Only drop older answers once the collection still has the version answered against.
+    if collection_version(collection_name, client, refresh=True) == version:
+        stats["pruned_versions"] = prune_versions(collection_name, version)
+    return stats
+
+
+def stored_count(course_name, client=None):
+    """
+    Returns the number of answers stored for a course's current collection version.
+    """
+    collection_name = COURSE_COLLECTIONS[course_name]
+    version_dir = os.path.dirname(_path(collection_name, collection_version(collection_name, client, refresh=True), "x"))
+    return len([name for name in os.listdir(version_dir) if name.endswith(".json")]) if os.path.isdir(version_dir) else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Precompute answers to the past-paper questions of a course.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_cmd = commands.add_parser("run", help="Answer the past-paper questions that have no stored answer.")
+    run_cmd.add_argument("courses", nargs="+", choices=sorted(COURSE_COLLECTIONS))
+    run_cmd.add_argument("--rpm", type=float, default=PRECOMPUTE_RPM, help="Answers started per minute.")
+    run_cmd.add_argument("--limit", type=int, default=None)
+    run_cmd.add_argument("--refresh", action="store_true", help="Answer stored questions again.")
+    status_cmd = commands.add_parser("status", help="Print how many answers are stored.")
+    status_cmd.add_argument("courses", nargs="+", choices=sorted(COURSE_COLLECTIONS))
+    args = parser.parse_args()
+
+    for course in args.courses:
+        if args.command == "run":
+            print(f"{course}: {precompute_course(course, rpm=args.rpm, limit=args.limit, refresh=args.refresh)}")
+        else:
+            print(f"{course}: {stored_count(course)} answers stored")
@@ -0,0 +1,239 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict, namedtuple
+
+from utils import metrics
+from utils.singleflight import SingleFlight
+from utils.tracing import cache_lookup
+from Database.indexconfig import collection_space
+
+# Document-scoped retrieval: answer a question from one source file (optionally a page range)
+# instead of the whole course collection.
+#
+# Each scoped source gets a sub-index: its chunks' ids, documents, metadata and one (n, dim)
+# float32 embedding matrix, fetched from Chroma once with a `where` filter on the source and then
+# searched by brute force. A scoped query therefore touches only that document's chunks, and
+# its cost does not grow with the rest of the course. Sub-indexes are copies of the chunks held per
+# worker, so they are kept in an LRU bounded by their total size, SCOPED_INDEX_MAX_MB per worker
+# (embeddings plus text), and rebuilt after SCOPED_INDEX_TTL seconds, so re-ingested documents
+# are picked up; invalidate() drops them immediately.
+#
+# Sources with more than SCOPED_INDEX_MAX_CHUNKS chunks (or every source, with SCOPED_INDEX=0)
+# are queried through Chroma with the same filter pushed down as a `where` clause instead.
+#
+# A chunk deduplicated at ingestion (Embedding/dedup.py) is stored once under its first source;
+# the copy's source is flagged on it as "ref:<source>", so scopes match those chunks as well,
+# at the page their copy has in the scoped source.
+# NumPy is imported on first use, like the other heavy dependencies of Retrival.main.
+
+SCOPED_INDEX_ENABLED = os.getenv("SCOPED_INDEX", "1") == "1"
+SCOPED_INDEX_MAX_BYTES = int(float(os.getenv("SCOPED_INDEX_MAX_MB", "64")) * 2**20)
+SCOPED_INDEX_MAX_CHUNKS = int(os.getenv("SCOPED_INDEX_MAX_CHUNKS", "20000"))
+SCOPED_INDEX_TTL = float(os.getenv("SCOPED_INDEX_TTL", "600"))
+
+# source: the file name as listed by /api/files (the "source" metadata of its chunks).
+# page_start / page_end: inclusive page bounds, either may be None.
+Scope = namedtuple("Scope", ["source", "page_start", "page_end"])
+
+scoped_queries = metrics.counter("scoped_queries_total", "Document-scoped retrieval queries, by the path that served them.")
+
+REFERENCE_KEY_PREFIX = "ref:"   # as in Embedding/chunkrecord.py
+
+_indexes = OrderedDict()   # (collection name, source) -> (SourceIndex or None, built_at)
+_indexes_bytes = 0         # summed nbytes of the cached sub-indexes
+_indexes_lock = threading.Lock()
+_in_flight_builds = SingleFlight()
+
+
+def where_filter(scope):
+    """
+    Returns the Chroma `where` clause selecting the chunks inside a scope.
+    """
+    conditions = [{"source": scope.source}]
+    if scope.page_start is not None:
+        conditions.append({"page": {"$gte": scope.page_start}})
+    if scope.page_end is not None:
+        conditions.append({"page": {"$lte": scope.page_end}})
+    own = conditions[0] if len(conditions) == 1 else {"$and": conditions}
+    # Deduplicated chunks referencing the source are matched whatever their page (the page of the
+    # copy is only in the JSON "references" string, which Chroma cannot filter on).
+    return {"$or": [own, {REFERENCE_KEY_PREFIX + scope.source: True}]}
+
+
+def page_in_source(metadata, source):
+    """
+    Returns the page a chunk has in source: its own page, or that of its first copy in source.
+    """
+    if not metadata:
+        return 0
+    if metadata.get("source") == source or not metadata.get("references"):
+        return metadata.get("page", 0)
+    for ref_source, ref_page in json.loads(metadata["references"]):
+        if ref_source == source:
+            return ref_page
+    return metadata.get("page", 0)
+
+
+class SourceIndex:
+    """
+    The chunks of one source document with their embeddings, searched by brute force.
+    """
+
+    def __init__(self, ids, embeddings, documents, metadatas, space="l2", source=None):
+        import numpy as np
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+        self.embeddings = np.ascontiguousarray(embeddings, dtype=np.float32).reshape(len(ids), -1) if ids \
+            else np.empty((0, 0), dtype=np.float32)
+        self.pages = np.array([page_in_source(m, source) for m in metadatas], dtype=np.int64)
+        self.space = space
+        self.sq_norms = np.einsum("ij,ij->i", self.embeddings, self.embeddings)
+        # Approximate memory held: the arrays plus the chunk text (metadata is small next to it).
+        self.nbytes = (self.embeddings.nbytes + self.sq_norms.nbytes + self.pages.nbytes
+                       + sum(len(document) for document in documents if document))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def distances(self, query):
+        """
+        Distances from query to every chunk, in the collection's space (as Chroma reports them).
+        """
+        import numpy as np
+        dots = self.embeddings @ query
+        if self.space == "ip":
+            return 1.0 - dots
+        if self.space == "cosine":
+            norms = np.sqrt(self.sq_norms) * np.linalg.norm(query)
+            return 1.0 - dots / np.maximum(norms, 1e-12)
+        return np.maximum(self.sq_norms - 2.0 * dots + float(query @ query), 0.0)   # squared L2
+
+    def query(self, query_embedding, n_results, page_start=None, page_end=None):
+        """
+        Returns the n_results nearest chunks within the page range, shaped like collection.query().
+        """
+        import numpy as np
+        if not self.ids:
+            return {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+        query = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+        distances = self.distances(query)
+        candidates = np.arange(len(self.ids))
+        if page_start is not None or page_end is not None:
+            mask = np.ones(len(self.ids), dtype=bool)
+            if page_start is not None:
+                mask &= self.pages >= page_start
+            if page_end is not None:
+                mask &= self.pages <= page_end
+            candidates = candidates[mask]
+            distances = distances[mask]
+
+        k = min(n_results, len(candidates))
+        if k < len(candidates):
+            top = np.argpartition(distances, k - 1)[:k]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.argsort(distances[top], kind="stable")]
+        rows = candidates[top]
+        return {
+            "ids": [[self.ids[i] for i in rows]],
+            "documents": [[self.documents[i] for i in rows]],
+            "metadatas": [[self.metadatas[i] for i in rows]],
+            "distances": [[float(d) for d in distances[top]]],
+        }
+
+
+def build_source_index(collection, source):
+    """
+    Fetches one source's chunks from the collection into a SourceIndex.
+
+    Returns:
+        SourceIndex: The sub-index, or None if the source has more than SCOPED_INDEX_MAX_CHUNKS
+                     chunks (those are served with a pushed-down filter instead).
+    """
+    ids = collection.get(where=where_filter(Scope(source, None, None)), include=[])["ids"]
+    if len(ids) > SCOPED_INDEX_MAX_CHUNKS:
+        return None
+    space = collection_space(collection)
+    if not ids:
+        return SourceIndex([], None, [], [], space, source)
+    records = collection.get(ids=ids, include=["embeddings", "documents", "metadatas"])
+    return SourceIndex(records["ids"], records["embeddings"], records["documents"], records["metadatas"],
+                       space, source)
+
+
+def get_source_index(collection, source):
+    """
+    Returns the cached sub-index for a source, building it on a miss or once it is older than
+    SCOPED_INDEX_TTL. Concurrent misses for the same source share one build. The least recently
+    used sub-indexes are dropped while the cache holds more than SCOPED_INDEX_MAX_BYTES.
+    """
+    global _indexes_bytes
+    key = (collection.name, source)
+    with _indexes_lock:
+        entry = _indexes.get(key)
+        if entry and time.monotonic() - entry[1] < SCOPED_INDEX_TTL:
+            _indexes.move_to_end(key)
+            cache_lookup("scoped_index", "hit")
+            return entry[0]
+
+    cache_lookup("scoped_index", "miss")
+    index, _ = _in_flight_builds.do(key, build_source_index, collection, source)
+    with _indexes_lock:
+        previous = _indexes.pop(key, None)
+        _indexes_bytes -= _nbytes(previous)
+        _indexes[key] = (index, time.monotonic())
+        _indexes_bytes += _nbytes(_indexes[key])
+        while _indexes_bytes > SCOPED_INDEX_MAX_BYTES and len(_indexes) > 1:
+            _, evicted = _indexes.popitem(last=False)
+            _indexes_bytes -= _nbytes(evicted)
+    return index
+
+
+def _nbytes(entry):
+    return entry[0].nbytes if entry is not None and entry[0] is not None else 0
+
+
+def cached_source_index(collection, source):
+    """
+    Returns the sub-index for a source if this worker already has a fresh one, without building it.
+    """
+    with _indexes_lock:
+        entry = _indexes.get((collection.name, source))
+        if entry and time.monotonic() - entry[1] < SCOPED_INDEX_TTL:
+            return entry[0]
+    return None
+
+
+def invalidate(collection_name=None):
+    """
+    Drops cached sub-indexes for one collection (or all of them), e.g. after re-ingestion.
+    """
+    global _indexes_bytes
+    with _indexes_lock:
+        for key in [key for key in _indexes if collection_name is None or key[0] == collection_name]:
+            _indexes_bytes -= _nbytes(_indexes.pop(key))
+
+
+def query(collection, scope, query_embedding, n_results):
+    """
+    Runs a nearest-neighbour query restricted to a scope.
+
+    Args:
+        collection: The course's Chroma collection.
+        scope: A Scope (source file plus optional inclusive page bounds).
+        query_embedding: The query vector.
+        n_results: Number of chunks to return.
+
+    Returns:
+        dict: Results shaped like collection.query() for a single query.
+    """
+    index = get_source_index(collection, scope.source) if SCOPED_INDEX_ENABLED else None
+    if index is not None:
+        scoped_queries.inc(path="subindex")
+        return index.query(query_embedding, n_results, scope.page_start, scope.page_end)
+
+    scoped_queries.inc(path="filter")
+    return collection.query(query_embeddings=[query_embedding], n_results=n_results, where=where_filter(scope))
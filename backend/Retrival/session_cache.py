@@ -0,0 +1,243 @@
+import os
+import re
+import json
+import time
+import base64
+import logging
+import threading
+from collections import OrderedDict
+
+from utils import metrics
+from utils.tracing import cache_lookup
+from Database.indexconfig import collection_space
+from Retrival import scoped_index, hierarchical
+
+# Session-scoped retrieval for follow-up questions.
+#
+# Students ask chains of questions ("explain deadlock" -> "give an example" -> "how is it
+# prevented?"). With a session id on /api/answer, each answer leaves behind a small session
+# record: the last SESSION_MAX_QUERIES query embeddings, the ids of the chunks retrieved for them
+# (at most SESSION_MAX_CHUNKS, newest first), the sources they came from and the question that
+# started the current topic, which the answer prompt of a follow-up refers to.
+#
+# A question is a follow-up when it is short and refers back to the conversation ("it", "this",
+# "an example", ...) or its embedding is within SESSION_FOLLOWUP_SIMILARITY (cosine) of the
+# session's recent queries. A follow-up skips topic extraction (one Gemini call) and the
+# course-wide search: its embedding is pulled towards the session's recent queries
+# (SESSION_CONTEXT_WEIGHT), the session's chunks are re-ranked with it, and the set is extended
+# with the best chunks of the session's top SESSION_EXTEND_SOURCES sources through their
+# sub-indexes (Retrival/scoped_index.py) when the worker has them cached. Any other question
+# takes the normal path and starts a new context in the session.
+#
+# Sessions live in Redis when it is reachable, so any worker can continue a session, and expire
+# SESSION_TTL seconds after their last question. Without Redis an in-process LRU of
+# SESSION_CACHE_MAX_SESSIONS sessions stands in for it. A session record is a few kilobytes:
+# float32 embeddings are stored base64-encoded, chunk texts are not stored at all.
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+SESSION_CACHE_BACKEND = os.getenv("SESSION_CACHE_BACKEND", "auto")     # auto | redis | memory
+SESSION_TTL = int(os.getenv("SESSION_TTL", "1800"))
+SESSION_CACHE_MAX_SESSIONS = int(os.getenv("SESSION_CACHE_MAX_SESSIONS", "5000"))
+SESSION_MAX_QUERIES = int(os.getenv("SESSION_MAX_QUERIES", "4"))
+SESSION_MAX_CHUNKS = int(os.getenv("SESSION_MAX_CHUNKS", "45"))
+SESSION_EXTEND_SOURCES = int(os.getenv("SESSION_EXTEND_SOURCES", "2"))
+SESSION_FOLLOWUP_SIMILARITY = float(os.getenv("SESSION_FOLLOWUP_SIMILARITY", "0.5"))
+SESSION_CONTEXT_WEIGHT = float(os.getenv("SESSION_CONTEXT_WEIGHT", "0.7"))
+SESSION_FOLLOWUP_MAX_WORDS = int(os.getenv("SESSION_FOLLOWUP_MAX_WORDS", "10"))
+
+REDIS_SESSION_PREFIX = "session:"
+SESSION_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,128}$')
+_FOLLOWUP_WORDS = re.compile(r"\b(it|its|it's|this|these|those|they|them|their|above|example|examples|"
+                             r"elaborate|more|further|again|else)\b", re.IGNORECASE)
+
+session_questions = metrics.counter("session_questions_total", "Questions asked with a session id, by the retrieval path taken.")
+
+
+def valid_session_id(session_id):
+    return isinstance(session_id, str) and bool(SESSION_ID_PATTERN.match(session_id))
+
+
+def _encode(vector):
+    import numpy as np
+    return base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode("ascii")
+
+
+def _decode(text):
+    import numpy as np
+    return np.frombuffer(base64.b64decode(text), dtype=np.float32)
+
+
+def _unit(vector):
+    import numpy as np
+    vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+    return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+
+class MemorySessionStore:
+    """
+    In-process session store (an LRU with a TTL), used when Redis is absent.
+    """
+
+    def __init__(self, max_sessions=SESSION_CACHE_MAX_SESSIONS, ttl=SESSION_TTL):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = OrderedDict()   # session id -> (record, time.monotonic() when saved)
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[1] >= self.ttl:
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            return entry[0]
+
+    def save(self, session_id, record):
+        with self._lock:
+            self._sessions[session_id] = (record, time.monotonic())
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+class RedisSessionStore:
+    """
+    Session store shared by every worker through Redis; each session is one JSON string with a TTL.
+    Concurrent questions in the same session are not merged: the last answer to finish wins.
+    """
+
+    def __init__(self, client, ttl=SESSION_TTL):
+        self.client = client
+        self.ttl = ttl
+
+    def get(self, session_id):
+        raw = self.client.get(REDIS_SESSION_PREFIX + session_id)
+        return json.loads(raw) if raw else None
+
+    def save(self, session_id, record):
+        self.client.set(REDIS_SESSION_PREFIX + session_id, json.dumps(record), ex=self.ttl)
+
+    def delete(self, session_id):
+        self.client.delete(REDIS_SESSION_PREFIX + session_id)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """
+    Returns the session store: Redis-backed when reachable (or forced), in-memory otherwise.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if SESSION_CACHE_BACKEND != "memory":
+                    try:
+                        import redis
+                        client = redis.Redis.from_url(REDIS_URL, socket_connect_timeout=1, socket_timeout=2)
+                        client.ping()
+                        _store = RedisSessionStore(client)
+                    except Exception as e:
+                        if SESSION_CACHE_BACKEND == "redis":
+                            raise
+                        logging.warning(f"Redis unavailable ({e}); sessions will be kept in-process.")
+                if _store is None:
+                    _store = MemorySessionStore()
+    return _store
+
+
+def get_session(session_id, course_name, collection_name):
+    """
+    Returns the session record for a course, or None if it is absent, expired, for another course
+    or for an older version of the course's collection (whose chunk ids may be gone).
+    """
+    try:
+        record = get_store().get(session_id)
+    except Exception as e:
+        logging.warning(f"Could not read session {session_id}: {e}")
+        record = None
+    if record is not None and (record.get("course"), record.get("collection")) != (course_name, collection_name):
+        record = None
+    cache_lookup("session", "hit" if record else "miss")
+    return record
+
+
+def is_followup(question, question_embedding, session):
+    """
+    Returns True if a question continues the session's current topic.
+    """
+    if len(question.split()) <= SESSION_FOLLOWUP_MAX_WORDS and _FOLLOWUP_WORDS.search(question):
+        return True
+    context = _unit(sum(_decode(q) for q in session["queries"]))
+    return float(_unit(question_embedding) @ context) >= SESSION_FOLLOWUP_SIMILARITY
+
+
+def followup_query(question_embedding, session):
+    """
+    Returns the search embedding of a follow-up: the question pulled towards the session's recent
+    queries (most recent weighted highest), so "give an example" searches the session's topic.
+    """
+    queries = [_decode(q) for q in session["queries"]]
+    context = _unit(sum(query * (i + 1) for i, query in enumerate(queries)))
+    return (_unit(question_embedding) + SESSION_CONTEXT_WEIGHT * context).tolist()
+
+
+def query(collection, session, query_embedding, n_results):
+    """
+    Re-ranks the session's chunks for a follow-up and extends them with the best chunks of the
+    session's top sources, without a course-wide search.
+
+    Returns:
+        dict: Results shaped like collection.query() for a single query.
+    """
+    results = []
+    if session["chunk_ids"]:
+        records = collection.get(ids=session["chunk_ids"], include=["embeddings", "documents", "metadatas"])
+        if records["ids"]:
+            index = scoped_index.SourceIndex(records["ids"], records["embeddings"], records["documents"],
+                                             records["metadatas"], collection_space(collection))
+            results.append(index.query(query_embedding, n_results))
+    for source in session["sources"][:SESSION_EXTEND_SOURCES]:
+        # Only sub-indexes this worker already holds (e.g. from the two-stage search of the
+        # question that started the topic); building one costs more than the search it replaces.
+        index = scoped_index.cached_source_index(collection, source)
+        if index is not None:
+            results.append(index.query(query_embedding, n_results))
+    return hierarchical.merge_results(results, n_results)
+
+
+def remember(session_id, course_name, collection_name, question, query_embedding, results, session=None, followup=False):
+    """
+    Records a question's query embedding and retrieved chunks in its session. A follow-up adds to
+    the session's context; any other question replaces it.
+    """
+    ids = results["ids"][0]
+    sources = []
+    for metadata in results["metadatas"][0]:
+        source = (metadata or {}).get("source")
+        if source and source not in sources:
+            sources.append(source)
+    if followup and session is not None:
+        queries = (session["queries"] + [_encode(query_embedding)])[-SESSION_MAX_QUERIES:]
+        ids = ids + [chunk_id for chunk_id in session["chunk_ids"] if chunk_id not in set(ids)]
+        sources = sources + [source for source in session["sources"] if source not in sources]
+    else:
+        queries = [_encode(query_embedding)]
+    topic = session["topic"] if followup and session is not None else question
+    record = {"course": course_name, "collection": collection_name, "topic": topic, "queries": queries,
+              "chunk_ids": ids[:SESSION_MAX_CHUNKS], "sources": sources[:SESSION_MAX_CHUNKS]}
+    try:
+        get_store().save(session_id, record)
+    except Exception as e:
+        logging.warning(f"Could not save session {session_id}: {e}")
+    session_questions.inc(path="followup" if followup else "new")
+    return record
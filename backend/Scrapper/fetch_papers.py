@@ -1,35 +1,73 @@
+import os
+import time
 import requests
 import logging
 import json
+import threading
+from requests.adapters import HTTPAdapter
+from utils.tracing import cache_lookup
 
-def fetch_papers_from_api(subject):
+# The API expects subject names to be URL-encoded (e.g., "Operating Systems" -> "Operating%20Systems")
+# The requests library handles this automatically, so no need for manual replacement.
+PAPERS_API_URL = os.getenv("PAPERS_API_URL", "https://papers.codechefvit.com/api/papers")
+
+# Listings are served from memory. After PAPERS_CACHE_TTL seconds an entry is stale: it is still
+# returned immediately while one background refresh fetches a new copy, so a slow or failing
+# upstream never blocks a response. Entries older than PAPERS_CACHE_MAX_STALE are refetched inline.
+PAPERS_CACHE_TTL = float(os.getenv("PAPERS_CACHE_TTL", "600"))
+PAPERS_CACHE_MAX_STALE = float(os.getenv("PAPERS_CACHE_MAX_STALE", "86400"))
+PAPERS_API_TIMEOUT = float(os.getenv("PAPERS_API_TIMEOUT", "15"))
+
+# Tag fields exposed on each paper and accepted as filters.
+FILTER_FIELDS = ("exam", "year", "slot", "semester")
+
+# Subject of each course in the papers API.
+COURSE_SUBJECTS = {
+    "database-systems": "database",
+    "operating-systems": "Operating Systems",
+    "cloud-computing": "aws",
+}
+
+headers = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/114.0.0.0 Safari/537.36"
+    )
+}
+
+# One pooled session per process so repeated listings reuse the TLS connection.
+session = requests.Session()
+session.headers.update(headers)
+session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=8))
+session.mount("http://", HTTPAdapter(pool_connections=2, pool_maxsize=8))
+
+_cache = {}           # subject -> (papers, fetched_at)
+_refreshing = set()   # subjects with a fetch in progress
+_cache_lock = threading.Lock()
+_fetch_done = threading.Condition(_cache_lock)
+
+
+def fetch_papers_uncached(subject):
     """
     Fetches paper information directly from the CodeChef VIT Papers API.
+
+    Returns:
+        list: The papers, or None if the request failed.
     """
-    # The API expects subject names to be URL-encoded (e.g., "Operating Systems" -> "Operating%20Systems")
-    # The requests library handles this automatically, so no need for manual replacement.
-    url = "https://papers.codechefvit.com/api/papers"
     params = {'subject': subject}
-    
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/114.0.0.0 Safari/537.36"
-        )
-    }
 
     try:
         logging.info(f"Fetching papers for subject: {subject} from API")
-        response = requests.get(url, headers=headers, params=params, timeout=15)
+        response = session.get(PAPERS_API_URL, params=params, timeout=PAPERS_API_TIMEOUT)
         response.raise_for_status()  # Raise an exception for bad status codes
 
         data = response.json()
-        
+
         # The API might return a dictionary like {'papers': [...]}.
         # We need to get the list from the 'papers' key.
         papers_list = data.get('papers', []) if isinstance(data, dict) else data
-        
+
         papers = []
 
         for item in papers_list:
@@ -49,17 +87,108 @@ def fetch_papers_from_api(subject):
                 "link": link,
                 "pdf_link": item.get("file_url") # The API provides the direct PDF link
             }
+            for field in FILTER_FIELDS:
+                paper_info[field] = item.get(field)
             papers.append(paper_info)
-        
+
         logging.info(f"Fetched {len(papers)} papers successfully from API.")
         return papers
 
     except requests.exceptions.RequestException as e:
         logging.error(f"Error fetching data from API: {e}")
-        return []
+        return None
     except json.JSONDecodeError:
         logging.error("Failed to decode JSON from API response.")
-        return []
+        return None
+
+
+def _refresh(subject):
+    """
+    Fetches a subject and stores it in the cache. Failed fetches keep the previous entry.
+    """
+    try:
+        papers = fetch_papers_uncached(subject)
+        with _cache_lock:
+            if papers is not None:
+                _cache[subject] = (papers, time.monotonic())
+    finally:
+        with _cache_lock:
+            _refreshing.discard(subject)
+            _fetch_done.notify_all()
+
+
+def fetch_papers_from_api(subject):
+    """
+    Returns the papers for a subject from the in-memory cache, fetching them from the
+    CodeChef VIT Papers API on a miss and refreshing stale entries in the background.
+
+    Returns:
+        list: The papers (empty if the API is unreachable and nothing is cached).
+    """
+    with _cache_lock:
+        entry = _cache.get(subject)
+        age = time.monotonic() - entry[1] if entry else None
+
+        if entry and age < PAPERS_CACHE_TTL:
+            cache_lookup("papers", "hit")
+            return entry[0]
+
+        if entry and age < PAPERS_CACHE_MAX_STALE:
+            cache_lookup("papers", "stale")
+            # Stale-while-revalidate: answer now, refresh once in the background.
+            if subject not in _refreshing:
+                _refreshing.add(subject)
+                threading.Thread(target=_refresh, args=(subject,), daemon=True).start()
+            return entry[0]
+
+        # Miss (or too stale to serve): one caller fetches, concurrent callers wait for it.
+        cache_lookup("papers", "miss")
+        if subject in _refreshing:
+            while subject in _refreshing:
+                _fetch_done.wait()
+            entry = _cache.get(subject)
+            return entry[0] if entry else []
+        _refreshing.add(subject)
+
+    _refresh(subject)
+    with _cache_lock:
+        entry = _cache.get(subject)
+    return entry[0] if entry else []
+
+
+def filter_papers(papers, page=1, per_page=None, **filters):
+    """
+    Filters papers by their tag fields and returns one page of the result.
+
+    Args:
+        papers: Papers as returned by fetch_papers_from_api.
+        page: 1-based page number (>= 1).
+        per_page: Page size (>= 1); None returns every match.
+        **filters: Values for any of FILTER_FIELDS (exam, year, slot, semester); matching is
+                   case-insensitive and empty values are ignored.
+
+    Returns:
+        tuple: (papers on the requested page, total number of matches)
+
+    Raises:
+        ValueError: If page or per_page is below 1.
+    """
+    if page < 1 or (per_page is not None and per_page < 1):
+        raise ValueError("page and per_page must be at least 1")
+    wanted = {field: str(value).strip().lower() for field, value in filters.items()
+              if field in FILTER_FIELDS and value not in (None, "")}
+    if wanted:
+        matches = [paper for paper in papers
+                   if all(str(paper.get(field) or "").lower() == value for field, value in wanted.items())]
+    else:
+        matches = papers
+
+    total = len(matches)
+    if per_page is not None:
+        start = (page - 1) * per_page
+        matches = matches[start:start + per_page]
+    return matches, total
+
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
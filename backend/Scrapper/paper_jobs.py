@@ -0,0 +1,378 @@
+import os
+import sys
+import json
+import time
+import logging
+import threading
+from collections import deque
+
+# Add project root to Python path so the worker can also be started as a script.
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from Scrapper import question_cache
+from utils.tracing import cache_lookup
+from Scrapper.qp_analyser import retrieve_questions_from_paper, paper_id_from_link
+
+# Past-paper analysis (download + Document AI) runs as background jobs instead of inside the
+# HTTP request. The job id is the paper id, so submitting the same paper twice is a no-op.
+#
+# The queue lives in Redis when it is reachable, so jobs submitted by any gunicorn worker can
+# be run by any worker (or by dedicated `python -m Scrapper.paper_jobs` processes). Without
+# Redis an in-process queue stands in for it; its job records are only visible to the process
+# that holds them, so app.py analyses papers inside the request instead (see shared_queue()).
+#
+# A running job holds a lease: lease_until is pushed PAPER_JOB_LEASE_SECONDS ahead by a
+# heartbeat while the analysis runs. If its worker dies the lease runs out, and the next
+# submission of that paper queues it again, as it does for a failed job.
+#
+# Prefetching a paper listing does not submit anything on the request thread: the listing's
+# links are queued in process and the worker threads submit them between jobs.
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+PAPER_JOBS_BACKEND = os.getenv("PAPER_JOBS_BACKEND", "auto")     # auto | redis | memory
+PAPER_JOB_WORKERS = int(os.getenv("PAPER_JOB_WORKERS", "2"))      # worker threads per web process
+PAPER_JOB_TTL = int(os.getenv("PAPER_JOB_TTL", "86400"))          # seconds finished job records are kept
+PAPER_JOB_LEASE_SECONDS = float(os.getenv("PAPER_JOB_LEASE_SECONDS", "120"))
+PAPER_PREFETCH_BACKLOG = int(os.getenv("PAPER_PREFETCH_BACKLOG", "32"))  # listings waiting to be prefetched
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+TERMINAL_STATUSES = (DONE, FAILED)
+
+REDIS_QUEUE_NAME = "paper_jobs:queue"
+REDIS_JOB_PREFIX = "paper_jobs:job:"
+
+
+def _now():
+    return round(time.time(), 3)
+
+
+def _lease_expired(job):
+    return job.get("status") == RUNNING and float(job.get("lease_until") or 0) < _now()
+
+
+def _requeueable(job):
+    """
+    Whether a submission should queue this job again: it failed, or its worker stopped renewing its lease.
+    """
+    return job.get("status") == FAILED or _lease_expired(job)
+
+
+class MemoryJobStore:
+    """
+    In-process job queue and status store, used when Redis is absent.
+    """
+
+    def __init__(self):
+        self._jobs = {}
+        self._queue = deque()
+        self._cond = threading.Condition()
+
+    def create(self, job):
+        """
+        Stores a job and enqueues it unless an active or finished job with that id exists
+        (a failed job, or a running one whose lease expired, is queued again).
+
+        Returns:
+            tuple: (job record, created)
+        """
+        with self._cond:
+            self._prune()
+            existing = self._jobs.get(job["id"])
+            if existing is not None and not _requeueable(existing):
+                return dict(existing), False
+            self._jobs[job["id"]] = dict(job)
+            self._queue.append(job["id"])
+            self._cond.notify()
+            return dict(job), True
+
+    def _prune(self):
+        cutoff = _now() - PAPER_JOB_TTL
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job["status"] in TERMINAL_STATUSES and job.get("updated_at", 0) < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def update(self, job_id, **fields):
+        with self._cond:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields, updated_at=_now())
+
+    def next_job(self, timeout):
+        with self._cond:
+            if not self._queue:
+                self._cond.wait(timeout)
+            return self._queue.popleft() if self._queue else None
+
+
+class RedisJobStore:
+    """
+    Job queue (a Redis list) and status store (one hash per job) shared by all processes.
+    """
+
+    def __init__(self, client):
+        self.r = client
+
+    def _key(self, job_id):
+        return REDIS_JOB_PREFIX + job_id
+
+    def create(self, job):
+        from redis.exceptions import WatchError
+        key = self._key(job["id"])
+        # WATCH makes the check and the enqueue atomic: of concurrent submitters of a new, failed
+        # or abandoned job only one queues it, the others retry and find it queued.
+        with self.r.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    existing = self._decode(pipe.hgetall(key))
+                    if existing is not None and not _requeueable(existing):
+                        pipe.unwatch()
+                        return existing, False
+                    pipe.multi()
+                    pipe.delete(key)
+                    pipe.hset(key, mapping={k: json.dumps(v) for k, v in job.items()})
+                    pipe.expire(key, PAPER_JOB_TTL)
+                    pipe.lpush(REDIS_QUEUE_NAME, job["id"])
+                    pipe.execute()
+                    return job, True
+                except WatchError:
+                    continue
+
+    def get(self, job_id):
+        return self._decode(self.r.hgetall(self._key(job_id)))
+
+    @staticmethod
+    def _decode(raw):
+        if not raw:
+            return None
+        job = {}
+        for k, v in raw.items():
+            k, v = k.decode(), v.decode()
+            try:
+                job[k] = json.loads(v)
+            except json.JSONDecodeError:
+                job[k] = v
+        return job
+
+    def update(self, job_id, **fields):
+        fields["updated_at"] = _now()
+        self.r.hset(self._key(job_id), mapping={k: json.dumps(v) for k, v in fields.items()})
+
+    def next_job(self, timeout):
+        item = self.r.brpop(REDIS_QUEUE_NAME, timeout=max(1, int(timeout)))
+        return item[1].decode() if item else None
+
+
+_store = None
+_store_lock = threading.Lock()
+_workers = []
+_prefetch_listings = deque(maxlen=PAPER_PREFETCH_BACKLOG)  # oldest listing dropped when full
+
+
+def get_store():
+    """
+    Returns the job store: Redis-backed when reachable (or forced), in-memory otherwise.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if PAPER_JOBS_BACKEND != "memory":
+                    try:
+                        import redis
+                        client = redis.Redis.from_url(REDIS_URL, socket_connect_timeout=1)
+                        client.ping()
+                        _store = RedisJobStore(client)
+                    except Exception as e:
+                        if PAPER_JOBS_BACKEND == "redis":
+                            raise
+                        logging.warning(f"Redis unavailable ({e}); paper jobs will use an in-process queue.")
+                if _store is None:
+                    _store = MemoryJobStore()
+    return _store
+
+
+def _analyse(paper_id, paper_link):
+    """
+    Analyses one paper. Returns the fields of its finished job record (status and questions or error).
+    """
+    try:
+        questions = retrieve_questions_from_paper(paper_link)
+    except Exception as e:
+        logging.error(f"Paper job {paper_id} failed: {e}")
+        return {"status": FAILED, "error": str(e)}
+    if question_cache.get_by_paper_id(paper_id) is None:
+        return {"status": FAILED, "error": "Analysis failed; see server logs."}
+    return {"status": DONE, "questions": questions}
+
+
+def run_job(job_id):
+    """
+    Runs one paper analysis job and records its outcome, renewing its lease while it runs.
+    """
+    store = get_store()
+    job = store.get(job_id)
+    # A job can be queued twice when an abandoned one is resubmitted; run it only once.
+    if job is None or job["status"] == DONE or (job["status"] == RUNNING and not _lease_expired(job)):
+        return
+    store.update(job_id, status=RUNNING, started_at=_now(), lease_until=_now() + PAPER_JOB_LEASE_SECONDS)
+
+    stop = threading.Event()
+
+    def keep_alive():
+        while not stop.wait(PAPER_JOB_LEASE_SECONDS / 3):
+            store.update(job_id, lease_until=_now() + PAPER_JOB_LEASE_SECONDS)
+
+    heartbeat = threading.Thread(target=keep_alive, daemon=True)
+    heartbeat.start()
+    try:
+        outcome = _analyse(job_id, job["paper_link"])
+    finally:
+        stop.set()
+        heartbeat.join()
+    store.update(job_id, **outcome)
+
+
+def worker_loop(stop_event=None, poll_seconds=5):
+    """
+    Pulls jobs from the queue and runs them until stop_event is set.
+    """
+    store = get_store()
+    while stop_event is None or not stop_event.is_set():
+        try:
+            submit_prefetched()
+            job_id = store.next_job(poll_seconds)
+        except Exception as e:
+            logging.error(f"Paper job queue unavailable: {e}")
+            time.sleep(poll_seconds)
+            continue
+        if job_id:
+            run_job(job_id)
+
+
+def start_workers(count=PAPER_JOB_WORKERS):
+    """
+    Starts the in-process worker threads once per process.
+    """
+    with _store_lock:
+        if _workers:
+            return
+        for i in range(count):
+            thread = threading.Thread(target=worker_loop, name=f"paper-job-{i}", daemon=True)
+            thread.start()
+            _workers.append(thread)
+
+
+def submit_paper_job(paper_link):
+    """
+    Submits a paper for analysis. Idempotent per paper: an already cached paper is reported as
+    done straight away and a queued or running job is returned as is.
+
+    Returns:
+        dict: The job record (id, status, and questions once done).
+    """
+    paper_id = paper_id_from_link(paper_link)
+    record = question_cache.get_by_paper_id(paper_id)
+    cache_lookup("questions", "hit" if record is not None else "miss")
+    if record is not None:
+        return {"id": paper_id, "status": DONE, "questions": record["questions"]}
+
+    start_workers()
+    job = {"id": paper_id, "paper_link": paper_link, "status": QUEUED, "submitted_at": _now(), "updated_at": _now()}
+    job, _ = get_store().create(job)
+    return job
+
+
+def shared_queue():
+    """
+    Whether jobs are visible to every process (Redis), so a client can poll any worker for them.
+    """
+    return isinstance(get_store(), RedisJobStore)
+
+
+def analyse_paper(paper_link):
+    """
+    Analyses a paper in the calling thread, for when there is no shared queue to poll.
+
+    Returns:
+        dict: The finished job record (status done or failed).
+    """
+    paper_id = paper_id_from_link(paper_link)
+    record = question_cache.get_by_paper_id(paper_id)
+    cache_lookup("questions", "hit" if record is not None else "miss")
+    if record is not None:
+        return {"id": paper_id, "status": DONE, "questions": record["questions"]}
+    return {"id": paper_id, "paper_link": paper_link, **_analyse(paper_id, paper_link)}
+
+
+def get_job(job_id):
+    """
+    Returns the job record for a paper id, falling back to the persistent question cache.
+    """
+    record = question_cache.get_by_paper_id(job_id)
+    if record is not None:
+        return {"id": job_id, "status": DONE, "questions": record["questions"]}
+    return get_store().get(job_id)
+
+
+def wait_for_job(job_id, timeout, poll_seconds=0.25):
+    """
+    Polls a job until it finishes or timeout seconds pass. Returns the latest job record.
+    """
+    deadline = time.monotonic() + timeout
+    job = get_job(job_id)
+    while job is not None and job["status"] not in TERMINAL_STATUSES and time.monotonic() < deadline:
+        time.sleep(poll_seconds)
+        job = get_job(job_id)
+    return job
+
+
+def prefetch_papers(papers):
+    """
+    Hands a paper listing (as returned by fetch_papers_from_api) to the worker threads, which
+    queue analysis for every paper that is not cached yet, so their questions are ready before
+    anyone opens them. Returns at once.
+    """
+    links = [paper["pdf_link"] for paper in papers if paper.get("pdf_link")]
+    if links:
+        start_workers()
+        _prefetch_listings.append(links)
+
+
+def submit_prefetched():
+    """
+    Submits the papers of one pending prefetch listing, skipping those that are cached or
+    already have a job (queued, running, or failed: a failed paper is retried when opened).
+
+    Returns:
+        int: The number of papers submitted.
+    """
+    try:
+        links = _prefetch_listings.popleft()
+    except IndexError:
+        return 0
+    submitted = 0
+    for link in links:
+        if get_job(paper_id_from_link(link)) is None:
+            submit_paper_job(link)
+            submitted += 1
+    return submitted
+
+
+if __name__ == "__main__":
+    # Dedicated worker process: python -m Scrapper.paper_jobs [threads]
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else PAPER_JOB_WORKERS
+    if isinstance(get_store(), MemoryJobStore):
+        print("Redis is not reachable; a standalone worker needs the shared Redis queue.")
+        sys.exit(1)
+    print(f"Running {threads} paper job worker thread(s) against {REDIS_URL}")
+    start_workers(threads)
+    threading.Event().wait()
@@ -3,9 +3,13 @@ import requests
 import logging
 import base64
 import json
+import hashlib
+import datetime
+import threading
+from urllib.parse import urlparse
 from dotenv import load_dotenv
-import google.auth
-from google.auth.transport.requests import Request
+from Scrapper import question_cache
+from utils.singleflight import SingleFlight
 
 # Load environment variables from .env file
 load_dotenv()
@@ -13,6 +17,144 @@ load_dotenv()
 # The endpoint for your Document AI processor
 document_endpoint="https://eu-documentai.googleapis.com/v1/projects/178535507469/locations/eu/processors/13f9c98412bc04f1/processorVersions/pretrained-foundation-model-v1.5-pro-2025-06-20:process"
 
+# (connect, read) timeouts in seconds for the Document AI call and for PDF downloads.
+DOCAI_TIMEOUT = (float(os.getenv("DOCAI_CONNECT_TIMEOUT", "10")), float(os.getenv("DOCAI_READ_TIMEOUT", "120")))
+DOWNLOAD_TIMEOUT = (float(os.getenv("PAPER_DOWNLOAD_CONNECT_TIMEOUT", "10")), float(os.getenv("PAPER_DOWNLOAD_READ_TIMEOUT", "30")))
+# Papers larger than this are rejected while streaming instead of being buffered whole.
+PAPER_MAX_BYTES = int(os.getenv("PAPER_MAX_BYTES", str(20 * 1024 * 1024)))
+# Refresh the access token this many seconds before it expires.
+TOKEN_REFRESH_MARGIN = float(os.getenv("DOCAI_TOKEN_REFRESH_MARGIN", "300"))
+
+
+class PaperTooLarge(Exception):
+    """Raised when a paper download exceeds PAPER_MAX_BYTES."""
+
+
+class DocAIClient:
+    """
+    Long-lived Document AI client: caches the OAuth2 access token until shortly before it
+    expires and sends every request over one pooled session with timeouts and retries (only
+    retries that cannot duplicate a billed request for the :process call).
+    """
+
+    def __init__(self, endpoint=document_endpoint):
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.endpoint = endpoint
+        self._credentials = None
+        self._lock = threading.Lock()
+        # Downloads and token requests retry connection errors and transient 429/5xx responses
+        # (honouring Retry-After).
+        retry = Retry(
+            total=3,
+            backoff_factor=1.0,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET", "POST"],
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        # The :process call is billed once Document AI has accepted it, so it is only re-sent
+        # when it cannot have been processed: a failed connection or a 429/503 rejection. A read
+        # timeout or a 500/502/504 may come after the work was done and is raised instead.
+        process_retry = Retry(
+            total=3,
+            connect=3,
+            read=0,
+            other=0,
+            backoff_factor=1.0,
+            status_forcelist=[429, 503],
+            allowed_methods=["POST"],
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # requests picks the adapter with the longest matching prefix, so only the endpoint gets this one.
+        self.session.mount(endpoint, HTTPAdapter(pool_connections=1, pool_maxsize=16, max_retries=process_retry))
+
+    def access_token(self):
+        """
+        Returns a valid access token, fetching Application Default Credentials once and
+        refreshing them only when the token is missing or about to expire.
+        """
+        # google.auth is only needed once a paper is actually analysed, so it is imported
+        # here rather than at module import to keep the web app's cold start short.
+        import google.auth
+        from google.auth.transport.requests import Request
+
+        with self._lock:
+            if self._credentials is None:
+                logging.info("Fetching authentication credentials...")
+                self._credentials, _ = google.auth.default(scopes=['https://www.googleapis.com/auth/cloud-platform'])
+            credentials = self._credentials
+            expiry = credentials.expiry
+            expiring = expiry is not None and (expiry - datetime.datetime.utcnow()).total_seconds() < TOKEN_REFRESH_MARGIN
+            if not credentials.token or not credentials.valid or expiring:
+                credentials.refresh(Request(session=self.session))
+                logging.info("Successfully fetched access token.")
+            return credentials.token
+
+    def process(self, pdf_content: bytes, mime_type: str = "application/pdf"):
+        """
+        Sends a document to the Document AI endpoint and returns the parsed JSON response.
+        Raises on authentication or HTTP errors.
+        """
+        headers = {
+            "Authorization": f"Bearer {self.access_token()}",
+            "Content-Type": "application/json; charset=utf-8",
+        }
+        # Build the JSON body directly as bytes around the base64 payload, rather than decoding
+        # it to str and letting json.dumps copy and re-encode it.
+        body = b"".join([
+            b'{"rawDocument":{"mimeType":', json.dumps(mime_type).encode("utf-8"),
+            b',"content":"', base64.b64encode(pdf_content), b'"}}',
+        ])
+        logging.info("Sending request to Document AI endpoint...")
+        response = self.session.post(self.endpoint, headers=headers, data=body, timeout=DOCAI_TIMEOUT)
+        response.raise_for_status()
+        logging.info("Successfully processed document.")
+        return response.json()
+
+    def download(self, url: str, max_bytes: int = PAPER_MAX_BYTES):
+        """
+        Streams a file into memory over the pooled session, aborting once it exceeds max_bytes.
+
+        Returns:
+            bytearray: The file content.
+        """
+        with self.session.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+            response.raise_for_status()
+            declared = response.headers.get("Content-Length")
+            if declared and declared.isdigit() and int(declared) > max_bytes:
+                raise PaperTooLarge(f"{url} is {declared} bytes; the limit is {max_bytes}.")
+            buffer = bytearray()
+            for chunk in response.iter_content(chunk_size=256 * 1024):
+                if len(buffer) + len(chunk) > max_bytes:
+                    raise PaperTooLarge(f"{url} exceeds the {max_bytes}-byte limit.")
+                buffer += chunk
+            # bytearray is accepted by hashlib and base64 as-is, so no extra copy is made.
+            return buffer
+
+
+_docai_client = None
+_docai_client_lock = threading.Lock()
+
+
+def get_docai_client():
+    """
+    Returns the process-wide DocAIClient.
+    """
+    global _docai_client
+    if _docai_client is None:
+        with _docai_client_lock:
+            if _docai_client is None:
+                _docai_client = DocAIClient()
+    return _docai_client
+
+
 def process_pdf_with_docai(pdf_content: bytes, mime_type: str = "application/pdf"):
     """
     Sends a PDF to the specified Google Document AI endpoint for processing using OAuth2.
@@ -25,41 +167,10 @@ def process_pdf_with_docai(pdf_content: bytes, mime_type: str = "application/pdf
         dict: The JSON response from the Document AI API.
               Returns None if an error occurs.
     """
-    try:
-        # 1. Get Application Default Credentials and create an access token
-        logging.info("Fetching authentication credentials...")
-        credentials, project = google.auth.default(scopes=['https://www.googleapis.com/auth/cloud-platform'])
-        auth_req = Request()
-        credentials.refresh(auth_req)
-        access_token = credentials.token
-        logging.info("Successfully fetched access token.")
-
-        # 2. Prepare the request headers with the OAuth2 token
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json; charset=utf-8",
-        }
+    import google.auth.exceptions
 
-        # 3. Encode the PDF content in base64
-        encoded_content = base64.b64encode(pdf_content).decode("utf-8")
-
-        # 4. Construct the JSON request body
-        data = {
-            "rawDocument": {
-                "content": encoded_content,
-                "mimeType": mime_type,
-            }
-        }
-
-        # 5. Make the POST request to the Document AI endpoint
-        logging.info("Sending request to Document AI endpoint...")
-        # Note: The URL does not contain the API key anymore
-        response = requests.post(document_endpoint, headers=headers, json=data)
-        
-        response.raise_for_status()
-        
-        logging.info("Successfully processed document.")
-        return response.json()
+    try:
+        return get_docai_client().process(pdf_content, mime_type)
 
     except google.auth.exceptions.DefaultCredentialsError:
         logging.error("Authentication failed. Please run 'gcloud auth application-default login'")
@@ -73,34 +184,72 @@ def process_pdf_with_docai(pdf_content: bytes, mime_type: str = "application/pdf
         logging.error(f"An unexpected error occurred: {e}")
         return None
 
-def retrieve_questions_from_paper(paper_link: str):
+# Concurrent first requests for the same paper within this process share one analysis;
+# question_cache.paper_lock does the same across worker processes.
+_in_flight_papers = SingleFlight()
+
+
+def paper_id_from_link(paper_link: str):
     """
-    Retrieves questions from a given paper using Document AI.
+    Returns the paper's id: the file name at the end of its storage URL.
+    """
+    return os.path.basename(urlparse(paper_link).path)
 
-    Args:
-        paper_link: The URL of the paper to analyze.
+
+def analyse_paper(paper_link: str):
+    """
+    Returns the cached analysis of a paper, downloading it and running Document AI only if
+    neither this paper id nor a PDF with identical content has been analysed before.
 
     Returns:
-        list: A list of questions extracted from the paper.
+        dict: The cache record ({"paper_id", "content_hash", "questions", "entities"}),
+              or None if the download or Document AI call failed (failures are not cached).
     """
-    try:
+    paper_id = paper_id_from_link(paper_link)
+    record = question_cache.get_by_paper_id(paper_id)
+    if record is not None:
+        return record
+
+    with question_cache.paper_lock(paper_id):
+        # Another process may have finished the analysis while we waited for the lock.
+        record = question_cache.get_by_paper_id(paper_id)
+        if record is not None:
+            return record
+
         logging.info(f"Retrieving questions from paper: {paper_link}")
         # Download the PDF content from the paper link
-        pdf_response = requests.get(paper_link)
-        pdf_response.raise_for_status()
-        pdf_bytes = pdf_response.content
+        pdf_bytes = get_docai_client().download(paper_link)
+
+        content_hash = hashlib.sha256(pdf_bytes).hexdigest()
+        record = question_cache.get_by_content_hash(content_hash)
+        if record is not None:
+            return question_cache.link_paper_id(paper_id, record)
 
         # Process the PDF using Document AI
         result = process_pdf_with_docai(pdf_bytes)
-
-        if result:
-            questions = []
-            for entity in result.get('document', {}).get('entities', []):
-                questions.append(entity.get('mentionText', ''))
-            return questions
-        else:
+        if not result:
             logging.error("Failed to get result from Document AI.")
-            return []
+            return None
+
+        entities = result.get('document', {}).get('entities', [])
+        questions = [entity.get('mentionText', '') for entity in entities]
+        return question_cache.store(paper_id, content_hash, questions, entities)
+
+
+def retrieve_questions_from_paper(paper_link: str):
+    """
+    Retrieves questions from a given paper using Document AI.
+    Results are cached persistently per paper, so repeat views return instantly.
+
+    Args:
+        paper_link: The URL of the paper to analyze.
+
+    Returns:
+        list: A list of questions extracted from the paper.
+    """
+    try:
+        record, _ = _in_flight_papers.do(paper_id_from_link(paper_link), analyse_paper, paper_link)
+        return record['questions'] if record else []
 
     except requests.exceptions.RequestException as e:
         logging.error(f"Failed to download PDF: {e}")
@@ -117,9 +266,7 @@ if __name__ == '__main__':
     try:
         logging.info(f"Downloading PDF from {pdf_url}")
         # Download the PDF content from the URL
-        pdf_response = requests.get(pdf_url)
-        pdf_response.raise_for_status()
-        pdf_bytes = pdf_response.content
+        pdf_bytes = get_docai_client().download(pdf_url)
         logging.info("PDF downloaded successfully.")
 
         # Process the PDF using Document AI
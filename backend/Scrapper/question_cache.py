@@ -0,0 +1,113 @@
+import os
+import json
+import logging
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process de-duplication only.
+    fcntl = None
+
+# Persistent cache of the questions extracted from each past paper. Papers never change once
+# published, so a paper is downloaded and sent through Document AI at most once.
+#
+# Layout:
+#   <cache_dir>/papers/<paper_id>.json      {"paper_id", "content_hash", "questions", "entities"}
+#   <cache_dir>/hashes/<content_hash>.json  same record, so a re-uploaded copy of a known PDF
+#                                           under a new id skips Document AI as well
+#   <cache_dir>/locks/<paper_id>.lock       held while a paper is being analysed
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+QUESTION_CACHE_DIR = os.getenv("QUESTION_CACHE_DIR", os.path.join(project_root, 'Data', '.cache', 'questions'))
+
+
+def _safe_name(name):
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+
+
+def _path(kind, name):
+    return os.path.join(QUESTION_CACHE_DIR, kind, _safe_name(name) + ".json")
+
+
+def _read(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, json.JSONDecodeError) as e:
+        logging.warning(f"Ignoring unreadable question cache entry {path}: {e}")
+        return None
+
+
+def _write(path, record):
+    """
+    Writes a record atomically so readers never see a partially written file.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def get_by_paper_id(paper_id):
+    """
+    Returns the cached record for a paper id, or None.
+    """
+    return _read(_path("papers", paper_id))
+
+
+def get_by_content_hash(content_hash):
+    """
+    Returns the cached record for a PDF with this SHA-256, or None.
+    """
+    return _read(_path("hashes", content_hash))
+
+
+def store(paper_id, content_hash, questions, entities):
+    """
+    Saves the extracted questions and the raw Document AI entities for a paper.
+    """
+    record = {
+        "paper_id": paper_id,
+        "content_hash": content_hash,
+        "questions": questions,
+        "entities": entities,
+    }
+    _write(_path("hashes", content_hash), record)
+    _write(_path("papers", paper_id), record)
+    return record
+
+
+def link_paper_id(paper_id, record):
+    """
+    Records that paper_id has the same content as an already analysed paper.
+    """
+    record = dict(record, paper_id=paper_id)
+    _write(_path("papers", paper_id), record)
+    return record
+
+
+@contextmanager
+def paper_lock(paper_id):
+    """
+    Holds an exclusive per-paper file lock, so only one process analyses a given paper at a time.
+    """
+    if fcntl is None:
+        yield
+        return
+    lock_dir = os.path.join(QUESTION_CACHE_DIR, "locks")
+    os.makedirs(lock_dir, exist_ok=True)
+    with open(os.path.join(lock_dir, _safe_name(paper_id) + ".lock"), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -1,43 +1,114 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, send_file, Response, stream_with_context
 from flask_cors import CORS
 import sys
 import os
 import urllib.parse
 import json
+import math
+import time
+import hashlib
+from werkzeug.utils import safe_join
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 # Fallback to CPU if MPS has issues on Apple Silicon. Helps prevent crashes.
 os.environ["PYTORCH_ENABLE_MPS_FALLBACK"] = "0"
-from Scrapper.fetch_papers import fetch_papers_from_api
-from Scrapper.qp_analyser import process_pdf_with_docai, retrieve_questions_from_paper
 # Add project root to Python path to resolve module imports
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__)))
 sys.path.insert(0, project_root)
-import spacy
-
-# Ensure model is available even in Vercel's ephemeral environment
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError as e:
-    # Fail fast if the critical model is missing
-    print(f"CRITICAL ERROR: Failed to load spaCy model: {e}", file=sys.stderr)
-    sys.exit(1)
-    
+from Scrapper.fetch_papers import fetch_papers_from_api, filter_papers, FILTER_FIELDS, COURSE_SUBJECTS
+from Scrapper import paper_jobs
+from Preprocessing.pagerender import render_page, PageNotFound, PAGE_FORMATS, DEFAULT_ZOOM
+
+# Heavy dependencies (chromadb, sentence-transformers, redis)
+# are imported lazily inside Retrival.main on first use. Set PRELOAD_MODELS=1 to
+# load them in the gunicorn worker startup hook instead (see gunicorn.conf.py).
 from Retrival.main import answer_question
+from Retrival.scoped_index import Scope
+from Retrival import precompute, session_cache
+from utils.metrics import render_prometheus
+from utils import tracing
 
 app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
+# Enable CORS for all routes, and let the browser-side PDF viewer read the range/caching headers.
+CORS(app, expose_headers=['Accept-Ranges', 'Content-Range', 'Content-Length', 'ETag', 'Server-Timing'])
+
+DATA_DIRECTORY = os.getenv('DATA_DIRECTORY', os.path.join(project_root, 'Data'))
+# Directory under DATA_DIRECTORY holding each course's files.
+COURSE_DIRECTORIES = {
+    "database-systems": "database",
+    "operating-systems": "operating_systems",
+    "cloud-computing": "aws"
+}
+
+@app.before_request
+def start_request_trace():
+    tracing.start_trace(request.endpoint or 'unknown')
+
+@app.after_request
+def add_server_timing(response):
+    # Per-stage durations (plus cache results and token counts) of this request, readable in
+    # the browser's network panel; the same stages feed request_stage_seconds on /metrics.
+    trace = tracing.end_trace()
+    if trace is not None:
+        response.headers['Server-Timing'] = trace.server_timing()
+        response.headers['Timing-Allow-Origin'] = '*'
+    return response
+
+# Course files are served with a strong, content-based ETag (identical on every node, unlike
+# mtimes) and may be cached by browsers for FILE_CACHE_MAX_AGE seconds before revalidating.
+FILE_CACHE_MAX_AGE = int(os.getenv('FILE_CACHE_MAX_AGE', '86400'))
+
+# Parsed file_path.json listings and file ETags, invalidated when the file's mtime or size changes.
+_listing_cache = {}
+_etag_cache = {}
+
+def load_course_files(json_file_path):
+    """
+    Returns the list of viewable files for a course, re-reading file_path.json only when it changed.
+    """
+    mtime = os.stat(json_file_path).st_mtime_ns
+    cached = _listing_cache.get(json_file_path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    with open(json_file_path, 'r') as f:
+        data = json.load(f)
+
+    links = data.get('links', [])
+    file_list = []
+    for link in links:
+        file_name = os.path.basename(link)
+        file_type = ''
+        if file_name.endswith('.pdf'):
+            file_type = 'pdf'
+        elif file_name.endswith(('.ppt', '.pptx')):
+            file_type = 'ppt'
+
+        if file_type:
+            file_list.append({'name': file_name, 'type': file_type})
 
-DATA_DIRECTORY = os.path.join(project_root, 'Data')
+    _listing_cache[json_file_path] = (mtime, file_list)
+    return file_list
+
+def file_etag(file_path):
+    """
+    Returns a SHA-256 based ETag for a file, hashing it only once per (mtime, size).
+    """
+    stat = os.stat(file_path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _etag_cache.get(file_path)
+    if cached and cached[0] == version:
+        return cached[1]
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    etag = digest.hexdigest()[:32]
+    _etag_cache[file_path] = (version, etag)
+    return etag
 
 @app.route('/api/files/<course_name>')
 def list_files(course_name):
-    course_dir_map = {
-        "database-systems": "database",
-        "operating-systems": "operating_systems",
-        "cloud-computing": "aws"
-    }
-    
-    actual_dir = course_dir_map.get(course_name)
+    actual_dir = COURSE_DIRECTORIES.get(course_name)
     
     if not actual_dir:
         return jsonify({"error": "Course not found"}), 404
@@ -48,46 +119,68 @@ def list_files(course_name):
         return jsonify({"error": "File path data not found for course"}), 404
         
     try:
-        with open(json_file_path, 'r') as f:
-            data = json.load(f)
-        
-        links = data.get('links', [])
-        file_list = []
-        for link in links:
-            file_name = os.path.basename(link)
-            file_type = ''
-            if file_name.endswith('.pdf'):
-                file_type = 'pdf'
-            elif file_name.endswith(('.ppt', '.pptx')):
-                file_type = 'ppt'
-            
-            if file_type:
-                file_list.append({'name': file_name, 'type': file_type})
-
-        return jsonify({'files': file_list})
+        response = jsonify({'files': load_course_files(json_file_path)})
+        # Let clients revalidate the listing with If-None-Match instead of re-downloading it.
+        response.add_etag()
+        return response.make_conditional(request)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/files/<course_name>/<file_name>')
 def get_file(course_name, file_name):
-    course_dir_map = {
-        "database-systems": "database",
-        "operating-systems": "operating_systems",
-        "cloud-computing": "aws"
-    }
-    
-    actual_dir = course_dir_map.get(course_name)
+    actual_dir = COURSE_DIRECTORIES.get(course_name)
     
     if not actual_dir:
         return jsonify({"error": "Course not found"}), 404
 
     course_path = os.path.join(DATA_DIRECTORY, actual_dir)
     
-    try:
-        return send_from_directory(course_path, file_name, as_attachment=False)
-    except FileNotFoundError:
+    file_path = safe_join(course_path, file_name)
+    if file_path is None or not os.path.isfile(file_path):
         return jsonify({'error': 'File not found'}), 404
 
+    # conditional=True answers Range requests with 206 partial content (so the PDF viewer can
+    # fetch only the pages it shows) and If-None-Match / If-Modified-Since with 304.
+    return send_from_directory(course_path, file_name, as_attachment=False, conditional=True,
+                               etag=file_etag(file_path), max_age=FILE_CACHE_MAX_AGE)
+
+
+@app.route('/api/files/<course_name>/<file_name>/pages/<int:page_number>')
+def get_file_page(course_name, file_name, page_number):
+    """
+    Returns one page of a course PDF for citation previews: ?format=png|jpg|pdf (default png)
+    and ?zoom= for the image formats. Renders are cached on disk, so repeat previews are a file read.
+    """
+    actual_dir = COURSE_DIRECTORIES.get(course_name)
+
+    if not actual_dir:
+        return jsonify({"error": "Course not found"}), 404
+
+    file_path = safe_join(os.path.join(DATA_DIRECTORY, actual_dir), file_name)
+    if file_path is None or not os.path.isfile(file_path):
+        return jsonify({'error': 'File not found'}), 404
+    if not file_name.lower().endswith('.pdf'):
+        return jsonify({'error': 'Page previews are only available for PDF files'}), 415
+
+    fmt = request.args.get('format', 'png').lower()
+    if fmt not in PAGE_FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(PAGE_FORMATS)}"}), 400
+    zoom = request.args.get('zoom', default=DEFAULT_ZOOM, type=float)
+    if not math.isfinite(zoom):
+        return jsonify({'error': 'zoom must be a finite number'}), 400
+
+    try:
+        page_path = render_page(file_path, page_number, fmt=fmt, zoom=zoom)
+    except PageNotFound as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    # The cache path changes whenever the source PDF does, so the render itself never changes.
+    return send_file(page_path, mimetype=PAGE_FORMATS[fmt], conditional=True,
+                     etag=f"{file_etag(file_path)}-{os.path.basename(page_path)}",
+                     max_age=FILE_CACHE_MAX_AGE)
+
 
 @app.route('/api/answer', methods=['POST'])
 def get_answer():
@@ -98,37 +191,131 @@ def get_answer():
     if not question or not course_name:
         return jsonify({'error': 'Question and courseName are required'}), 400
 
+    # Optional scope: answer from one file (as listed by /api/files) and an inclusive page range.
+    source = data.get('source')
+    page_start, page_end = data.get('pageStart'), data.get('pageEnd')
+    scope = None
+    if source or page_start is not None or page_end is not None:
+        if not source:
+            return jsonify({'error': 'pageStart and pageEnd require source'}), 400
+        if any(page is not None and (not isinstance(page, int) or isinstance(page, bool))
+               for page in (page_start, page_end)):
+            return jsonify({'error': 'pageStart and pageEnd must be integers'}), 400
+        scope = Scope(source, page_start, page_end)
+
+    # Optional session id: follow-up questions in a session reuse its retrieved context.
+    session_id = data.get('sessionId')
+    if session_id is not None and not session_cache.valid_session_id(session_id):
+        return jsonify({'error': 'sessionId must be 1-128 letters, digits, "-" or "_"'}), 400
+
+    # Past-paper questions answered ahead of time by Retrival/precompute.py are served as stored.
+    # Not within a session: a stored answer has no retrieved context to record for follow-ups.
+    if scope is None and not session_id:
+        precomputed = precompute.lookup(course_name, question)
+        if precomputed:
+            return jsonify({'answer': precomputed['answer'], 'precomputed': True})
+
     try:
-        answer = answer_question(question, course_name)
+        answer = answer_question(question, course_name, scope, session_id)
         return jsonify({'answer': answer})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     
+# Largest page ?per_page= may ask for; larger values are capped.
+PAPERS_MAX_PER_PAGE = int(os.getenv('PAPERS_MAX_PER_PAGE', '100'))
+
 @app.route('/api/papers/<course_name>',)
 def list_papers(course_name):
-    course_dir_map = {
-        "database-systems": "database",
-        "operating-systems": "Operating Systems",
-        "cloud-computing": "aws"
-    }
-    subject = course_dir_map.get(course_name)
+    subject = COURSE_SUBJECTS.get(course_name)
     if not subject:
         return jsonify({"error": "Course not found for papers"}), 404
         
     papers = fetch_papers_from_api(subject)
-    return jsonify({'papers':papers})
+
+    # Warm the question cache for every listed paper in the background (?prefetch=1, or always
+    # with PAPER_PREFETCH=1). The paper-job workers submit them; papers with a job are skipped.
+    if request.args.get('prefetch') == '1' or os.getenv('PAPER_PREFETCH', '0') == '1':
+        paper_jobs.prefetch_papers(papers)
+
+    # Optional server-side filtering (?exam=&year=&slot=&semester=) and pagination (?page=&per_page=).
+    filters = {field: request.args.get(field) for field in FILTER_FIELDS}
+    page = request.args.get('page', default=1, type=int)
+    per_page = request.args.get('per_page', default=None, type=int)
+    if page < 1 or (per_page is not None and per_page < 1):
+        return jsonify({'error': 'page and per_page must be positive integers'}), 400
+    if per_page is not None:
+        per_page = min(per_page, PAPERS_MAX_PER_PAGE)
+    papers, total = filter_papers(papers, page=page, per_page=per_page, **filters)
+    return jsonify({'papers': papers, 'total': total, 'page': page, 'per_page': per_page})
+
+# Seconds /api/papers/<course>/<id> waits for a fresh analysis before answering 202 with a job to poll.
+PAPER_SYNC_WAIT_SECONDS = float(os.getenv('PAPER_SYNC_WAIT_SECONDS', '2'))
+# Seconds an event stream stays open; the browser's EventSource then reconnects, so a waiting
+# client does not hold one of the worker's threads for the whole analysis.
+PAPER_JOB_EVENTS_SECONDS = float(os.getenv('PAPER_JOB_EVENTS_SECONDS', '5'))
+
+def paper_job_response(job):
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    body = {'job_id': job['id'], 'status': job['status'],
+            'status_url': f"/api/paper-jobs/{job['id']}", 'events_url': f"/api/paper-jobs/{job['id']}/events"}
+    if job['status'] == paper_jobs.DONE:
+        body['questions'] = job.get('questions', [])
+    elif job['status'] == paper_jobs.FAILED:
+        body['error'] = job.get('error')
+    return jsonify(body), (200 if job['status'] in paper_jobs.TERMINAL_STATUSES else 202)
 
 @app.route('/api/papers/<course_name>/<id>')
 def questions_from_papers(course_name, id):
     base_url = "https://storage.googleapis.com/papers-codechefvit-prod/papers/"
     paper_link = base_url + id
-    questions = retrieve_questions_from_paper(paper_link)
-    return jsonify({'questions': questions})
+    # The analysis runs as a background job; cached papers come back immediately with their
+    # questions, otherwise the client gets 202 and polls status_url (or streams events_url).
+    # Polling needs the shared Redis queue (REDIS_URL): in-process job records are invisible to
+    # other workers, so without it the paper is analysed within this request.
+    if not paper_jobs.shared_queue():
+        return paper_job_response(paper_jobs.analyse_paper(paper_link))
+    job = paper_jobs.submit_paper_job(paper_link)
+    if job['status'] not in paper_jobs.TERMINAL_STATUSES and PAPER_SYNC_WAIT_SECONDS > 0:
+        job = paper_jobs.wait_for_job(job['id'], PAPER_SYNC_WAIT_SECONDS) or job
+    return paper_job_response(job)
+
+@app.route('/api/paper-jobs/<job_id>')
+def paper_job_status(job_id):
+    return paper_job_response(paper_jobs.get_job(job_id))
+
+@app.route('/api/paper-jobs/<job_id>/events')
+def paper_job_events(job_id):
+    # Server-sent events: one "status" event per change, ending with the terminal status. The
+    # stream closes after PAPER_JOB_EVENTS_SECONDS; EventSource reconnects after `retry` ms and
+    # gets the current status first.
+    def events():
+        last_status = None
+        deadline = time.monotonic() + PAPER_JOB_EVENTS_SECONDS
+        yield 'retry: 1000\n\n'
+        while time.monotonic() < deadline:
+            job = paper_jobs.get_job(job_id)
+            if job is None:
+                yield 'event: error\ndata: {"error": "Job not found"}\n\n'
+                return
+            if job['status'] != last_status:
+                last_status = job['status']
+                yield f"event: status\ndata: {json.dumps(job)}\n\n"
+            if job['status'] in paper_jobs.TERMINAL_STATUSES:
+                return
+            time.sleep(0.5)
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/')
 def index():
     return jsonify({"message": "Study Partner backend is running!"})
 
+@app.route('/metrics')
+def metrics():
+    # Metrics are kept per worker process; this reports the worker that served the request.
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
 
 application = app
 
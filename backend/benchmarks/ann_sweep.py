@@ -0,0 +1,128 @@
+# Sweeps HNSW index settings (Database/indexconfig.py) on a synthetic course and reports, for
+# each combination, recall@k against exact brute-force search next to query latency, build time
+# and index size, so INDEX_* values can be picked from data rather than left at Chroma defaults.
+#
+# Every (space, M, construction_ef) combination builds its own collection in a fresh database
+# directory; search_ef is then varied in place on that collection, as set-search-ef would. A
+# process keeps the search_ef its index was loaded with, so each search_ef is measured in a
+# freshly spawned process, which also gives the memory a worker needs for the loaded index
+# (its RSS growth from opening the client to the end of the queries, so it includes Chroma's own
+# footprint; compare settings by the differences) next to the on-disk size.
+#
+# Embeddings come from the same generator as hierarchical_bench.py and are unit-normalised, like
+# all-MiniLM-L6-v2 output, so l2 and cosine rank neighbours identically and differ only in speed.
+#
+# Usage (from the backend directory):
+#   python benchmarks/ann_sweep.py --chunks 50000 --m 8,16,32 --construction-ef 100,200 --search-ef 10,50,100,200
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+backend_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_root)
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+
+from loadtest import percentile, rss_mb
+from hierarchical_bench import make_course, unit
+from Database.vectorstore import open_client
+from Database.indexconfig import IndexConfig, get_or_create_collection, set_search_ef
+
+
+def directory_mb(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total / (1024 * 1024)
+
+
+def build(client, config, embeddings, batch_size=5000):
+    collection = get_or_create_collection(client, "sweep", config)
+    for start in range(0, len(embeddings), batch_size):
+        end = min(start + batch_size, len(embeddings))
+        collection.add(ids=[str(i) for i in range(start, end)], embeddings=embeddings[start:end])
+    return collection
+
+
+def measure(db_path, queries, truth, k):
+    """
+    Runs in a fresh process: opens the collection (loading its index) and measures the queries.
+    """
+    rss_before = rss_mb(os.getpid())
+    collection = open_client("embedded", db_path=db_path).get_collection("sweep")
+    for query in queries[:20]:   # warm-up
+        collection.query(query_embeddings=[query], n_results=k, include=[])
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        result = collection.query(query_embeddings=[query], n_results=k, include=[])
+        latencies.append((time.perf_counter() - started) * 1000)
+        hits += len(expected & {int(chunk_id) for chunk_id in result["ids"][0]})
+    return {"recall": round(hits / (k * len(queries)), 4), "p50_ms": round(percentile(latencies, 50), 3),
+            "p95_ms": round(percentile(latencies, 95), 3), "index_rss_mb": round(rss_mb(os.getpid()) - rss_before, 1)}
+
+
+def run(args):
+    rng = np.random.default_rng(args.seed)
+    documents = max(args.chunks // args.chunks_per_document, 1)
+    embeddings, _, _ = make_course(rng, documents, args.chunks_per_document, args.dim)
+    picks = rng.integers(0, len(embeddings), args.queries)
+    queries = unit(embeddings[picks] + args.query_noise * unit(rng.standard_normal((args.queries, args.dim))))
+    queries = queries.astype(np.float32)
+    # Exact neighbours; on unit vectors the l2 and cosine orderings are the same.
+    truth = [set(np.argsort(row)[:args.k].tolist()) for row in -(queries @ embeddings.T)]
+    query_lists = [q.tolist() for q in queries]
+
+    results = []
+    spawn = multiprocessing.get_context("spawn")
+    for space in args.space:
+        for m in args.m:
+            for construction_ef in args.construction_ef:
+                work_dir = tempfile.mkdtemp(prefix="ann_sweep_")
+                try:
+                    client = open_client("embedded", db_path=work_dir)
+                    started = time.perf_counter()
+                    collection = build(client, IndexConfig(space, construction_ef, args.search_ef[0], m), embeddings)
+                    row = {"space": space, "M": m, "construction_ef": construction_ef,
+                           "build_s": round(time.perf_counter() - started, 2), "search_ef": {}}
+                    for search_ef in args.search_ef:
+                        set_search_ef(collection, search_ef)
+                        with spawn.Pool(1) as pool:
+                            row["search_ef"][search_ef] = pool.apply(measure, (work_dir, query_lists, truth, args.k))
+                    row["disk_mb"] = round(directory_mb(work_dir), 1)
+                    results.append(row)
+                    print(json.dumps(row), file=sys.stderr)
+                finally:
+                    shutil.rmtree(work_dir, ignore_errors=True)
+    return {"chunks": len(embeddings), "dim": args.dim, "k": args.k, "queries": args.queries, "results": results}
+
+
+if __name__ == "__main__":
+    ints = lambda s: [int(n) for n in s.split(",")]
+    parser = argparse.ArgumentParser(description="Recall, latency and size of HNSW index settings.")
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument("--chunks-per-document", type=int, default=100)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--space", type=lambda s: s.split(","), default=["l2", "cosine"])
+    parser.add_argument("--m", type=ints, default=[8, 16, 32])
+    parser.add_argument("--construction-ef", type=ints, default=[100, 200])
+    parser.add_argument("--search-ef", type=ints, default=[10, 50, 100, 200])
+    parser.add_argument("--query-noise", type=float, default=1.0)
+    parser.add_argument("--k", type=int, default=15)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", default=None)
+    args = parser.parse_args()
+
+    result = run(args)
+    print(json.dumps(result, indent=2))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(result, f, indent=2)
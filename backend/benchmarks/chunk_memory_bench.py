@@ -0,0 +1,77 @@
+# Compares the memory held by one ingested document in the two chunk representations:
+# dict packages with a 384-float Python list per chunk, and a ChunkBatch with one float32 array.
+# Random vectors stand in for the model's output, so the run needs no model weights.
+#
+# Usage (from the backend directory):
+#   python benchmarks/chunk_memory_bench.py --pages 800
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+backend_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_root)
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+
+from synthetic_corpus import generate_corpus
+from Embedding.chunking import create_chunk_batch, create_chunks
+
+
+def measure(fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, {"retained_mb": round(current / 2**20, 2), "peak_mb": round(peak / 2**20, 2),
+                    "seconds": round(elapsed, 3)}
+
+
+def run(args):
+    work_dir = tempfile.mkdtemp(prefix="chunk_memory_")
+    path = generate_corpus(work_dir, documents=1, pages=args.pages, pptx_share=0)[0]
+    vectors = np.random.default_rng(0).standard_normal((args.pages, args.dim)).astype(np.float32)
+
+    def as_packages():
+        packages = create_chunks(path)
+        for i, package in enumerate(packages):
+            package["embedding"] = vectors[i].tolist()   # what create_embedding stores
+        return packages
+
+    def as_batch():
+        batch = create_chunk_batch(path)
+        batch.set_embeddings(vectors[:len(batch)])
+        return batch
+
+    packages, package_stats = measure(as_packages)
+    batch, batch_stats = measure(as_batch)
+    write_ready, write_stats = measure(batch.to_chroma)
+    return {
+        "chunks": len(packages),
+        "dim": args.dim,
+        "dict_packages": package_stats,
+        "chunk_batch": batch_stats,
+        "chunk_batch_to_chroma": write_stats,
+        "retained_ratio": round(package_stats["retained_mb"] / max(batch_stats["retained_mb"], 1e-9), 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory of dict chunk packages vs ChunkBatch.")
+    parser.add_argument("--pages", type=int, default=800)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--json", dest="json_path", default=None)
+    args = parser.parse_args()
+
+    result = run(args)
+    print(json.dumps(result, indent=2))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(result, f, indent=2)
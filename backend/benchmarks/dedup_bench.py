@@ -0,0 +1,144 @@
+# Measures ingestion with and without near-duplicate elimination (Embedding/dedup.py) on a
+# synthetic corpus where --duplicate-share of the pages are repeated slides (verbatim or with
+# one word changed). For both runs it reports chunks stored, time per stage (chunking + dedup,
+# embedding, keywords, Chroma write) and the size of the resulting Chroma directory.
+#
+# Embedding uses the sentence-transformers model when it is in the local cache; otherwise
+# random vectors stand in for it and the embed time is not representative (the stored-chunk
+# count still shows how many forward passes dedup saves). Keywords are skipped without spaCy.
+#
+# Usage (from the backend directory):
+#   python benchmarks/dedup_bench.py --documents 40 --pages 30 --duplicate-share 0.25
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+
+backend_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_root)
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+
+from synthetic_corpus import generate_corpus
+from Database.vectorstore import open_client
+from Embedding.chunking import create_chunk_batch
+from Embedding.dedup import ChunkDeduplicator
+
+
+def pick_embedder(dim):
+    try:
+        from Embedding.sbert import embed_batch, get_model
+        get_model()
+        return "model", embed_batch
+    except Exception as e:
+        print(f"Embedding model unavailable ({type(e).__name__}); using random vectors.", file=sys.stderr)
+
+    def synthetic_embed(batch):
+        vectors = [np.random.default_rng(zlib.crc32(record.id.encode())).standard_normal(dim) for record in batch]
+        if vectors:
+            batch.set_embeddings(np.stack(vectors))
+        return batch
+    return "synthetic", synthetic_embed
+
+
+def pick_keywords():
+    try:
+        from Embedding.keywordextraction import extract_keywords_batch, get_nlp
+        get_nlp()
+        return extract_keywords_batch
+    except Exception as e:
+        print(f"Keyword extraction unavailable ({type(e).__name__}); skipping it.", file=sys.stderr)
+        return None
+
+
+def directory_mb(path):
+    total = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+    return round(total / 2**20, 2)
+
+
+def ingest(paths, db_path, dedup, embed, keywords):
+    deduplicator = ChunkDeduplicator() if dedup else None
+    collection = open_client("embedded", db_path=db_path).get_or_create_collection(name="bench")
+    seconds = {"chunk_and_dedup": 0.0, "embed": 0.0, "keywords": 0.0, "store": 0.0}
+    chunks = 0
+    for path in paths:
+        started = time.perf_counter()
+        batch = create_chunk_batch(path)
+        chunks += len(batch)
+        if deduplicator is not None:
+            deduplicator.filter_batch(batch)
+        seconds["chunk_and_dedup"] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        embed(batch)
+        seconds["embed"] += time.perf_counter() - started
+
+        if keywords is not None:
+            started = time.perf_counter()
+            keywords(batch)
+            seconds["keywords"] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        if len(batch):
+            collection.add(**batch.to_chroma())
+        seconds["store"] += time.perf_counter() - started
+
+    started = time.perf_counter()
+    for update in deduplicator.pending_updates() if deduplicator is not None else ():
+        collection.update(**update)
+    seconds["store"] += time.perf_counter() - started
+    return {
+        "chunks": chunks,
+        "stored": collection.count(),
+        "seconds": {stage: round(value, 3) for stage, value in seconds.items()},
+        "total_seconds": round(sum(seconds.values()), 3),
+        "index_mb": directory_mb(db_path),
+    }
+
+
+def run(args):
+    work_dir = tempfile.mkdtemp(prefix="dedup_bench_")
+    try:
+        paths = generate_corpus(os.path.join(work_dir, "corpus"), documents=args.documents, pages=args.pages,
+                                duplicate_share=args.duplicate_share, seed=args.seed)
+        embedder, embed = pick_embedder(args.dim)
+        keywords = pick_keywords()
+        baseline = ingest(paths, os.path.join(work_dir, "db_all"), False, embed, keywords)
+        deduped = ingest(paths, os.path.join(work_dir, "db_dedup"), True, embed, keywords)
+        return {
+            "documents": args.documents,
+            "pages": args.pages,
+            "duplicate_share": args.duplicate_share,
+            "embedder": embedder,
+            "keywords": keywords is not None,
+            "without_dedup": baseline,
+            "with_dedup": deduped,
+            "stored_reduction": round(1 - deduped["stored"] / baseline["stored"], 3),
+            "index_size_reduction": round(1 - deduped["index_mb"] / baseline["index_mb"], 3),
+            "ingest_time_reduction": round(1 - deduped["total_seconds"] / baseline["total_seconds"], 3),
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index size and ingest time with and without chunk dedup.")
+    parser.add_argument("--documents", type=int, default=40)
+    parser.add_argument("--pages", type=int, default=30)
+    parser.add_argument("--duplicate-share", type=float, default=0.25)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", default=None)
+    args = parser.parse_args()
+
+    result = run(args)
+    print(json.dumps(result, indent=2))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,178 @@
+# Measures ingestion of synthetic PDFs through the Redis work queue (Database/ingest_queue.py)
+# with 1..N worker processes, against the same pipeline run sequentially in one process, and
+# checks every run stores the same chunks.
+#
+# Redis is an in-process fakeredis server on a local port. Extraction is the real PDF code with
+# the Vision API replaced by fake_google_services (--vision-latency-ms per image call, twice per
+# page). Embedding is a stand-in: deterministic vectors plus --embed-ms-per-chunk of waiting, as
+# for a model served on another node; keywords are skipped. Both stages therefore wait rather
+# than compute, which is what lets workers scale on a single core; with the real CPU-bound model,
+# throughput scales with the cores (or machines) the workers run on.
+#
+# A last run adds a worker that claims a task and dies without finishing it, to show the task
+# coming back after the visibility timeout (--visibility-timeout).
+#
+# Usage (from the backend directory):
+#   python benchmarks/distributed_ingest_bench.py --documents 12 --pages 20 --workers 1,2,4,8
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zlib
+
+backend_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_root)
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+
+from loadtest import free_port
+from synthetic_corpus import write_pdf
+from fake_google_services import install_fake_vision
+from Database.vectorstore import open_client
+from Database import ingest_queue
+
+
+def synthetic_embed_task(task, dim=384, ms_per_chunk=0.0):
+    time.sleep(ms_per_chunk * len(task["records"]) / 1000)
+    ids = [chunk_id for chunk_id, _, _ in task["records"]]
+    embeddings = np.stack([np.random.default_rng(zlib.crc32(chunk_id.encode())).standard_normal(dim)
+                           for chunk_id in ids]).astype(np.float32)
+    return {"ids": ids, "embeddings": ingest_queue.encode_embeddings(embeddings), "keywords": [[] for _ in ids]}
+
+
+def bench_worker(redis_url, vision_latency_ms, embed_ms_per_chunk, crash_after_claim=False):
+    install_fake_vision(latency_ms=vision_latency_ms)
+    if crash_after_claim:
+        client = ingest_queue.connect(redis_url)
+        while True:
+            for job in ingest_queue.active_jobs(client):
+                if ingest_queue.TaskQueue(client, job).claim():
+                    os._exit(1)
+            time.sleep(0.05)
+    handlers = {"extract": ingest_queue.run_extract_task,
+                "embed": lambda task: synthetic_embed_task(task, ms_per_chunk=embed_ms_per_chunk)}
+    ingest_queue.worker_loop(redis_url, handlers=handlers, poll_seconds=0.05)
+
+
+def sequential(args, pdfs, db_path):
+    """
+    The same stages in one process, one document after another.
+    """
+    install_fake_vision(latency_ms=args.vision_latency_ms)
+    sys.path.insert(0, os.path.join(backend_root, "Preprocessing"))
+    from texteractionpdf import extract_pdf_pages
+    from Embedding.chunking import create_chunk_batch
+    from Embedding.dedup import ChunkDeduplicator
+
+    collection = open_client("embedded", db_path=db_path).get_or_create_collection(name="bench")
+    deduplicator = ChunkDeduplicator()
+    started = time.perf_counter()
+    for path in pdfs:
+        with open(path + ".txt", "wb") as f:
+            f.write(extract_pdf_pages(path).encode("utf-8"))
+        batch = create_chunk_batch(path + ".txt")
+        deduplicator.filter_batch(batch)
+        if len(batch):
+            result = synthetic_embed_task({"records": [[r.id, r.page_number, r.text] for r in batch]},
+                                          ms_per_chunk=args.embed_ms_per_chunk)
+            batch.set_embeddings(ingest_queue.decode_embeddings(result["embeddings"]))
+            collection.upsert(**batch.to_chroma())
+    return time.perf_counter() - started, collection
+
+
+def distributed(args, pdf_dir, db_path, redis_url, workers, crash=False):
+    for name in os.listdir(pdf_dir):
+        if name.endswith(".txt"):
+            os.remove(os.path.join(pdf_dir, name))
+    spawn = multiprocessing.get_context("spawn")
+    processes = [spawn.Process(target=bench_worker, args=(redis_url, args.vision_latency_ms, args.embed_ms_per_chunk))
+                 for _ in range(workers)]
+    if crash:
+        processes.insert(0, spawn.Process(target=bench_worker, args=(redis_url, args.vision_latency_ms, 0, True)))
+    for process in processes:
+        process.start()
+    time.sleep(args.worker_startup)   # let the workers import before the clock starts
+    try:
+        client = open_client("embedded", db_path=db_path)
+        started = time.perf_counter()
+        stats = ingest_queue.run_coordinator(pdf_dir, "bench", client=client, redis_url=redis_url,
+                                             extract_pages=args.extract_pages, embed_chunks=args.embed_chunks,
+                                             poll_seconds=0.05,
+                                             progress_seconds=3600)
+        elapsed = time.perf_counter() - started
+    finally:
+        for process in processes:
+            process.terminate()
+            process.join()
+    return elapsed, stats, client.get_collection(name="bench")
+
+
+def fingerprint(collection):
+    records = collection.get(include=["embeddings"])
+    order = np.argsort(records["ids"])
+    return [records["ids"][i] for i in order], np.asarray(records["embeddings"])[order]
+
+
+def run(args):
+    work_dir = tempfile.mkdtemp(prefix="distributed_ingest_bench_")
+    port = free_port()
+    from fakeredis import TcpFakeServer
+    server = TcpFakeServer(("127.0.0.1", port), server_type="redis")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    redis_url = f"redis://127.0.0.1:{port}/0"
+    # Workers read this at import, in their own processes.
+    os.environ["INGEST_VISIBILITY_TIMEOUT"] = str(args.visibility_timeout)
+    try:
+        pdf_dir = os.path.join(work_dir, "pdfs")
+        os.makedirs(pdf_dir)
+        pdfs = [write_pdf(os.path.join(pdf_dir, f"deck_{i:03d}.pdf"), pages=args.pages, seed=i)
+                for i in range(args.documents)]
+        pages = args.documents * args.pages
+
+        seconds, collection = sequential(args, pdfs, os.path.join(work_dir, "db_sequential"))
+        expected_ids, expected_embeddings = fingerprint(collection)
+        runs = [{"mode": "sequential", "seconds": round(seconds, 2), "pages_per_s": round(pages / seconds, 1),
+                 "chunks": len(expected_ids)}]
+
+        for workers, crash in [(w, False) for w in args.workers] + [(max(args.workers), True)]:
+            name = f"queue_{workers}_workers" + ("_with_crash" if crash else "")
+            seconds, stats, collection = distributed(args, pdf_dir, os.path.join(work_dir, f"db_{name}"),
+                                                     redis_url, workers, crash)
+            ids, embeddings = fingerprint(collection)
+            runs.append({"mode": name, "seconds": round(seconds, 2), "pages_per_s": round(pages / seconds, 1),
+                         "chunks": len(ids), "tasks": stats["extract_tasks"] + stats["embed_tasks"],
+                         "same_as_sequential": ids == expected_ids and np.array_equal(embeddings, expected_embeddings)})
+            print(json.dumps(runs[-1]), file=sys.stderr)
+        return {"documents": args.documents, "pages": pages, "vision_latency_ms": args.vision_latency_ms,
+                "embed_ms_per_chunk": args.embed_ms_per_chunk, "runs": runs}
+    finally:
+        server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sequential vs work-queue ingestion with several workers.")
+    parser.add_argument("--documents", type=int, default=12)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--workers", type=lambda s: [int(n) for n in s.split(",")], default=[1, 2, 4, 8])
+    parser.add_argument("--vision-latency-ms", type=float, default=50)
+    parser.add_argument("--embed-ms-per-chunk", type=float, default=5)
+    parser.add_argument("--extract-pages", type=int, default=5)
+    parser.add_argument("--embed-chunks", type=int, default=10)
+    parser.add_argument("--visibility-timeout", type=float, default=3)
+    parser.add_argument("--worker-startup", type=float, default=3, help="Seconds to let workers start before timing.")
+    parser.add_argument("--json", dest="json_path", default=None)
+    args = parser.parse_args()
+
+    result = run(args)
+    print(json.dumps(result, indent=2))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,137 @@
+# Offline stand-ins for the Google Cloud services used during ingestion and paper analysis.
+#
+# - install_fake_vision() registers a replacement for Preprocessing/imagedescription.py, so
+#   texteractionpdf can run without the Vision API (each call sleeps latency_ms).
+# - start_fake_docai_server() serves synthetic past papers at /papers/<id>.pdf and answers
+#   Document AI :process requests with question entities after latency_ms.
+#
+# Usage (from the backend directory):
+#   python benchmarks/fake_google_services.py --port 8092 --latency-ms 1500
+
+import argparse
+import json
+import sys
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from synthetic_corpus import make_pdf
+
+
+class FakeVisionStats:
+    def __init__(self):
+        self.labels = 0
+        self.ocr = 0
+        self.lock = threading.Lock()
+
+
+def install_fake_vision(latency_ms=0):
+    """
+    Makes `import imagedescription` return a fake Vision module. Call before importing
+    Preprocessing.texteractionpdf.
+
+    Returns:
+        FakeVisionStats: Call counts.
+    """
+    stats = FakeVisionStats()
+    module = types.ModuleType("imagedescription")
+
+    def generate_image_description(image_path):
+        time.sleep(latency_ms / 1000)
+        with stats.lock:
+            stats.labels += 1
+        return "This image likely contains: Diagram, Rectangle, Font"
+
+    def extract_text_from_image(image_path):
+        time.sleep(latency_ms / 1000)
+        with stats.lock:
+            stats.ocr += 1
+        return "Figure text"
+
+    module.generate_image_description = generate_image_description
+    module.extract_text_from_image = extract_text_from_image
+    sys.modules["imagedescription"] = module
+    return stats
+
+
+class FakeDocAIConfig:
+    def __init__(self, latency_ms=1000, questions_per_paper=12, pages=2):
+        self.latency_ms = latency_ms
+        self.questions_per_paper = questions_per_paper
+        self.pages = pages
+        self.process_requests = 0
+        self.downloads = 0
+        self.lock = threading.Lock()
+
+    def paper_pdf(self, paper_id):
+        # Every paper has distinct content, so the content-hash cache does not merge them.
+        return make_pdf(pages=self.pages, with_images=False, seed=paper_id)
+
+
+def make_handler(config):
+    class FakeDocAIHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, content_type="application/json"):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def do_GET(self):
+            if not self.path.startswith("/papers/"):
+                self._send(404, b'{"error": "Not found"}')
+                return
+            with config.lock:
+                config.downloads += 1
+            self._send(200, config.paper_pdf(self.path.rsplit("/", 1)[-1]), "application/pdf")
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            with config.lock:
+                config.process_requests += 1
+            time.sleep(config.latency_ms / 1000)
+            entities = [{"type": "question", "mentionText": f"Q{i + 1}. Explain topic {i + 1} with an example.",
+                         "confidence": 0.9} for i in range(config.questions_per_paper)]
+            self._send(200, json.dumps({"document": {"entities": entities}}).encode("utf-8"))
+
+    return FakeDocAIHandler
+
+
+def start_fake_docai_server(port=0, **config_kwargs):
+    """
+    Starts the fake Document AI / paper storage server on a background thread.
+
+    Returns:
+        tuple: (server, config, base_url). Papers are at <base_url>/papers/<id>.pdf and the
+               processor endpoint is <base_url>/v1/processors/fake:process.
+    """
+    config = FakeDocAIConfig(**config_kwargs)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, config, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fake Document AI processor and paper store.")
+    parser.add_argument("--port", type=int, default=8092)
+    parser.add_argument("--latency-ms", type=float, default=1000)
+    parser.add_argument("--questions", type=int, default=12)
+    args = parser.parse_args()
+
+    server, _, base_url = start_fake_docai_server(args.port, latency_ms=args.latency_ms,
+                                                  questions_per_paper=args.questions)
+    print(f"Fake Document AI listening on {base_url} (processor: {base_url}/v1/processors/fake:process)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,129 @@
+# A local stand-in for the Gemini generateContent REST endpoint with injectable latency.
+#
+# Point the backend at it with GEMINI_API_BASE=http://127.0.0.1:<port>. Any API key is accepted.
+#
+# Usage (from the backend directory):
+#   python benchmarks/fake_llm_server.py --port 8090 --latency-ms 300 --slow-rate 0.05 --slow-ms 8000
+#
+# Latency per request is latency-ms +/- jitter-ms, except that a slow-rate fraction of requests
+# take slow-ms instead (the tail that hedging is meant to cut). rate-limit-rate returns 429s.
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+GENERATE_PATH = re.compile(r"^/v1beta/models/([^/:]+):generateContent$")
+
+
+class FakeLLMConfig:
+    def __init__(self, latency_ms=200, jitter_ms=50, slow_rate=0.0, slow_ms=5000,
+                 rate_limit_rate=0.0, slow_keys=(), seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.rate_limit_rate = rate_limit_rate
+        # Requests made with these API keys are always slow, to simulate a degraded key/project.
+        self.slow_keys = set(slow_keys)
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.requests_by_key = {}
+
+    def next_delay(self, api_key):
+        with self.lock:
+            self.requests += 1
+            self.requests_by_key[api_key] = self.requests_by_key.get(api_key, 0) + 1
+            if self.rate_limit_rate and self.random.random() < self.rate_limit_rate:
+                return None
+            if api_key in self.slow_keys or (self.slow_rate and self.random.random() < self.slow_rate):
+                return self.slow_ms / 1000
+            return max(0.0, self.latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+
+def make_handler(config):
+    class FakeLLMHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, payload, headers=None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            match = GENERATE_PATH.match(self.path.split("?")[0])
+            if not match:
+                self._send(404, {"error": {"code": 404, "message": "Not found"}})
+                return
+
+            api_key = self.headers.get("x-goog-api-key", "")
+            delay = config.next_delay(api_key)
+            if delay is None:
+                self._send(429, {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED",
+                                           "message": "Quota exceeded (fake)."}}, {"Retry-After": "1"})
+                return
+            time.sleep(delay)
+
+            prompt = "".join(part.get("text", "")
+                             for content in request.get("contents", [])
+                             for part in content.get("parts", []))
+            text = f"Fake answer from {match.group(1)} for a {len(prompt)}-character prompt."
+            self._send(200, {
+                "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}],
+                "usageMetadata": {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": len(text) // 4},
+            })
+
+    return FakeLLMHandler
+
+
+def start_fake_llm_server(port=0, **config_kwargs):
+    """
+    Starts the fake server on a background thread.
+
+    Returns:
+        tuple: (server, config, base_url). Call server.shutdown() to stop it.
+    """
+    config = FakeLLMConfig(**config_kwargs)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, config, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fake Gemini generateContent server.")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Fraction of requests that take --slow-ms.")
+    parser.add_argument("--slow-ms", type=float, default=5000)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with 429.")
+    parser.add_argument("--slow-key", action="append", default=[], help="API key whose requests are always slow.")
+    args = parser.parse_args()
+
+    server, _, base_url = start_fake_llm_server(
+        args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, slow_rate=args.slow_rate,
+        slow_ms=args.slow_ms, rate_limit_rate=args.rate_limit_rate, slow_keys=args.slow_key,
+    )
+    print(f"Fake LLM server listening on {base_url} (set GEMINI_API_BASE={base_url})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
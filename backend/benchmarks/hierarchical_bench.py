@@ -0,0 +1,162 @@
+# Compares flat top-k search with two-stage retrieval (Retrival/hierarchical.py) on synthetic
+# courses of growing size. Every document has its own direction in embedding space, pulled
+# towards one of a few shared course topics, with a few sections around it; chunks are scattered
+# around their section. Nearest neighbours therefore mostly, but not always, come from one
+# document. Queries are perturbed copies of random chunks.
+#
+# The "even" corpus gives every document --chunks-per-document chunks. The "uneven" one draws
+# document lengths from a log-normal with the same mean, so a few long books (with many pages,
+# and so many section centroids) sit next to short decks, as in a real course.
+#
+# For each corpus and course size it reports query latency (p50/p95) and recall@k against exact brute-force
+# search, for flat Chroma search and for two-stage retrieval at several --top-documents values.
+# Two-stage latency is measured warm (sub-indexes built by a first pass over the same queries);
+# the cold first pass is reported separately.
+#
+# Usage (from the backend directory):
+#   python benchmarks/hierarchical_bench.py --documents 50,200,800 --chunks-per-document 100 --corpus even,uneven
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+backend_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_root)
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+
+from loadtest import percentile
+from Database.vectorstore import open_client
+from Embedding.centroids import centroid_records, docs_collection_name
+from Retrival import hierarchical, scoped_index
+
+
+def unit(vectors):
+    return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+
+def document_lengths(rng, documents, chunks_per_document, corpus, sigma=1.2, min_chunks=10):
+    """
+    Chunks per document: all equal for the "even" corpus, log-normal with the same mean for "uneven".
+    """
+    if corpus == "even":
+        return np.full(documents, chunks_per_document)
+    lengths = rng.lognormal(0.0, sigma, documents)
+    return np.maximum(min_chunks, np.round(lengths * chunks_per_document / lengths.mean())).astype(int)
+
+
+def make_course(rng, lengths, dim, topics=10, topic_weight=1.5, sections_per_100=3,
+                section_spread=0.8, chunk_spread=1.2):
+    """
+    Returns (embeddings, sources, pages) for a synthetic course with lengths[d] chunks (one per
+    page) in document d. Documents on the same one of `topics` shared topics overlap, so a
+    chunk's true neighbours can sit in other documents. Longer documents cover more sections.
+    """
+    documents = len(lengths)
+    topic_centres = unit(rng.standard_normal((topics, dim)))
+    centres = unit(topic_weight * topic_centres[rng.integers(0, topics, documents)]
+                   + unit(rng.standard_normal((documents, dim))))
+    embeddings, sources, pages = [], [], []
+    for d, length in enumerate(lengths):
+        sections = max(1, round(sections_per_100 * length / 100))
+        section_centres = unit(centres[d] + section_spread * unit(rng.standard_normal((sections, dim))))
+        doc_pages = np.arange(1, length + 1)
+        noise = unit(rng.standard_normal((length, dim)))
+        embeddings.append(unit(section_centres[(doc_pages - 1) * sections // length] + chunk_spread * noise))
+        sources += [f"deck_{d:04d}.pdf"] * length
+        pages.append(doc_pages)
+    return np.concatenate(embeddings).astype(np.float32), sources, np.concatenate(pages)
+
+
+def build(client, name, embeddings, sources, pages, batch_size=5000):
+    collection = client.get_or_create_collection(name=name)
+    for start in range(0, len(sources), batch_size):
+        end = min(start + batch_size, len(sources))
+        collection.add(ids=[f"chunk_{i}" for i in range(start, end)], embeddings=embeddings[start:end],
+                       documents=[f"chunk {i}" for i in range(start, end)],
+                       metadatas=[{"source": sources[i], "page": int(pages[i]), "keywords": ""} for i in range(start, end)])
+    docs = client.get_or_create_collection(name=docs_collection_name(name))
+    source_array = np.array(sources)
+    for source in dict.fromkeys(sources):
+        mask = source_array == source
+        docs.upsert(**centroid_records(source, pages[mask], embeddings[mask]))
+    return collection
+
+
+def measure(fn, queries, truth, k):
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        result = fn(query)
+        latencies.append((time.perf_counter() - started) * 1000)
+        hits += len(expected & {int(chunk_id.split("_")[1]) for chunk_id in result["ids"][0]})
+    return {"p50_ms": round(percentile(latencies, 50), 3), "p95_ms": round(percentile(latencies, 95), 3),
+            f"recall@{k}": round(hits / (k * len(queries)), 4)}
+
+
+def run_size(args, client, corpus, documents):
+    rng = np.random.default_rng(documents)
+    lengths = document_lengths(rng, documents, args.chunks_per_document, corpus)
+    embeddings, sources, pages = make_course(rng, lengths, args.dim, topics=args.topics,
+                                             topic_weight=args.topic_weight)
+    collection = build(client, f"course_{corpus}_{documents}", embeddings, sources, pages)
+
+    picks = rng.integers(0, len(sources), args.queries)
+    queries = unit(embeddings[picks] + args.query_noise * unit(rng.standard_normal((args.queries, args.dim))))
+    queries = queries.astype(np.float32)
+    distances = (embeddings ** 2).sum(1)[None, :] - 2 * queries @ embeddings.T
+    truth = [set(np.argsort(row)[:args.k].tolist()) for row in distances]
+    query_lists = [q.tolist() for q in queries]
+
+    result = {"corpus": corpus, "documents": documents, "chunks": len(sources),
+              "longest_document": int(lengths.max()),
+              "flat": measure(lambda q: collection.query(query_embeddings=[q], n_results=args.k), query_lists, truth, args.k)}
+    for top in args.top_documents:
+        scoped_index.invalidate()
+        run = lambda q: hierarchical.query(client, collection, q, args.k, top_documents=top)
+        cold = measure(run, query_lists, truth, args.k)
+        warm = measure(run, query_lists, truth, args.k)
+        result[f"two_stage_top{top}"] = dict(warm, cold_p50_ms=cold["p50_ms"])
+    return result
+
+
+def run(args):
+    # Keep every sub-index of the course in memory so the warm pass measures steady state.
+    scoped_index.SCOPED_INDEX_MAX_BYTES = 2**40
+    hierarchical.HIERARCHICAL_MIN_DOCUMENTS = 1
+    work_dir = tempfile.mkdtemp(prefix="hierarchical_bench_")
+    try:
+        client = open_client("embedded", db_path=os.path.join(work_dir, "db"))
+        return {"dim": args.dim, "k": args.k, "queries": args.queries, "chunks_per_document": args.chunks_per_document,
+                "results": [run_size(args, client, corpus, documents)
+                            for corpus in args.corpus for documents in args.documents]}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency and recall of flat vs two-stage retrieval.")
+    parser.add_argument("--documents", type=lambda s: [int(n) for n in s.split(",")], default=[50, 200, 800])
+    parser.add_argument("--chunks-per-document", type=int, default=100, help="Mean chunks per document.")
+    parser.add_argument("--corpus", type=lambda s: s.split(","), default=["even", "uneven"],
+                        help="Document length distributions to run: even, uneven.")
+    parser.add_argument("--top-documents", type=lambda s: [int(n) for n in s.split(",")], default=[2, 4, 8])
+    parser.add_argument("--topics", type=int, default=10)
+    parser.add_argument("--topic-weight", type=float, default=3.0)
+    parser.add_argument("--query-noise", type=float, default=1.0)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=15)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--json", dest="json_path", default=None)
+    args = parser.parse_args()
+
+    result = run(args)
+    print(json.dumps(result, indent=2))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(result, f, indent=2)
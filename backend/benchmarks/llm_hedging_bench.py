@@ -0,0 +1,108 @@
+# Exercises utils.llm_client.generate_text against the local fake LLM server with injected
+# tail latency, with and without hedging, and reports latency percentiles.
+#
+# Usage (from the backend directory):
+#   python benchmarks/llm_hedging_bench.py --calls 200 --slow-rate 0.05 --slow-ms 3000
+#   python benchmarks/llm_hedging_bench.py --deadline 1.0 --slow-rate 0.2 --slow-ms 5000 --no-hedge
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+backend_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_root)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fake_llm_server import start_fake_llm_server
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def run(args):
+    server, config, base_url = start_fake_llm_server(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, slow_rate=args.slow_rate,
+        slow_ms=args.slow_ms, rate_limit_rate=args.rate_limit_rate, seed=args.seed,
+    )
+
+    # Configure the client before importing it: it reads its settings at import time.
+    key_names = [f"FAKE_GEMINI_KEY_{i}" for i in range(args.keys)]
+    for name in key_names:
+        os.environ[name] = f"fake-{name.lower()}"
+    os.environ["API_KEYS"] = ",".join(key_names)
+    os.environ["API_KEY_RPM"] = str(args.key_rpm)
+    os.environ["REDIS_URL"] = args.redis_url
+    os.environ["GEMINI_API_BASE"] = base_url
+    os.environ["LLM_HEDGE_MIN_SAMPLES"] = str(args.min_samples)
+    os.environ["LLM_HEDGE_DELAY_SECONDS"] = str(args.initial_hedge_delay)
+    os.environ["LLM_HEDGE_MIN_DELAY_SECONDS"] = str(args.min_hedge_delay)
+
+    from utils import llm_client
+
+    latencies, errors = [], {}
+
+    def one_call(i):
+        started = time.perf_counter()
+        try:
+            llm_client.generate_text(f"question {i}", deadline=args.deadline, hedge=not args.no_hedge)
+            latencies.append(time.perf_counter() - started)
+        except Exception as e:
+            errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(one_call, range(args.calls)))
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    result = {
+        "hedging": not args.no_hedge,
+        "calls": args.calls,
+        "succeeded": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1) if latencies else None,
+        "max_ms": round(max(latencies) * 1000, 1) if latencies else None,
+        "server_requests": config.requests,
+        "hedged_requests": llm_client.llm_hedges.value(),
+        "hedge_wins": llm_client.llm_hedge_wins.value(),
+        "deadline_exceeded": llm_client.llm_deadlines.value(),
+    }
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark hedged, deadline-bounded Gemini calls against a fake server.")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--keys", type=int, default=4)
+    parser.add_argument("--key-rpm", type=float, default=100000, help="Per-key quota given to the scheduler.")
+    parser.add_argument("--redis-url", default="redis://127.0.0.1:1/0", help="Unreachable by default, so the in-process scheduler is used.")
+    parser.add_argument("--latency-ms", type=float, default=100)
+    parser.add_argument("--jitter-ms", type=float, default=30)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--slow-ms", type=float, default=3000)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--deadline", type=float, default=10.0)
+    parser.add_argument("--min-samples", type=int, default=20, help="Latencies needed before the percentile threshold is used.")
+    parser.add_argument("--initial-hedge-delay", type=float, default=0.5, help="Hedge delay until --min-samples latencies are seen.")
+    parser.add_argument("--min-hedge-delay", type=float, default=0.2)
+    parser.add_argument("--no-hedge", action="store_true")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_path", default=None)
+    args = parser.parse_args()
+
+    result = run(args)
+    print(json.dumps(result, indent=2))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,371 @@
+# End-to-end HTTP load test of app:application under gunicorn.
+#
+# Starts the fake Gemini server and the stub papers API with tunable latency, writes a
+# synthetic course (PDFs + file_path.json) and Chroma collection, launches gunicorn against
+# them, and drives a weighted mix of /api/answer, /api/files/..., page previews and
+# /api/papers/... from --concurrency client threads. Reports throughput, client latency
+# percentiles, server time and queueing delay, and the RSS of every gunicorn process sampled
+# over time. Queueing is client latency minus the Server-Timing total: time waiting for a free
+# worker thread, plus network and body transfer (small on loopback).
+#
+# /api/answer needs the sentence-transformers model in the local Hugging Face cache; without
+# it those requests fail and are counted as errors.
+#
+# Usage (from the backend directory):
+#   python benchmarks/loadtest.py --workers 2 --threads 4 --concurrency 32 --duration 60
+#   python benchmarks/loadtest.py --mix answer=1,files=4,page=4,papers=2 --llm-latency-ms 1500
+#   python benchmarks/loadtest.py --url http://127.0.0.1:8000 --mix files=1   # existing server
+
+import argparse
+import json
+import os
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+backend_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_root)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fake_llm_server import start_fake_llm_server
+from stub_papers_api import start_stub_papers_api
+from synthetic_corpus import generate_corpus, make_questions, write_pdf
+
+COURSE = "cloud-computing"   # served from <data dir>/aws and the "aws" collection
+ENDPOINTS = ("answer", "files", "listing", "page", "papers")
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def rounded_percentile(values, pct):
+    value = percentile(values, pct)
+    return round(value, 1) if value is not None else None
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint '{name}' in --mix; choose from {', '.join(ENDPOINTS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def prepare_fixtures(args, work_dir):
+    """
+    Writes the synthetic course files and Chroma collection the server will use.
+
+    Returns:
+        list: The names of the course PDFs.
+    """
+    course_dir = os.path.join(work_dir, "Data", "aws")
+    os.makedirs(course_dir)
+    names = []
+    for i in range(args.files):
+        name = f"lecture_{i:02d}.pdf"
+        write_pdf(os.path.join(course_dir, name), pages=args.pages, seed=i)
+        names.append(name)
+    with open(os.path.join(course_dir, "file_path.json"), "w") as f:
+        json.dump({"links": [f"https://example.invalid/aws/{name}" for name in names]}, f)
+
+    from offline_bench import build_collection
+    from Embedding.chunking import create_chunks
+    corpus = generate_corpus(os.path.join(work_dir, "corpus"), documents=10, pages=args.pages)
+    chunks = [chunk for path in corpus for chunk in create_chunks(path)]
+    build_collection(os.path.join(work_dir, "db"), "aws", chunks, args.collection_size, 1000)
+    return names
+
+
+def start_gunicorn(args, work_dir, env):
+    port = free_port()
+    command = [sys.executable, "-m", "gunicorn", "app:application", "--bind", f"127.0.0.1:{port}",
+               "--workers", str(args.workers), "--threads", str(args.threads), "--timeout", "120",
+               "--log-level", "warning"]
+    log = open(os.path.join(work_dir, "gunicorn.log"), "w")
+    process = subprocess.Popen(command, cwd=backend_root, env=env, stdout=log, stderr=subprocess.STDOUT)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + args.boot_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"gunicorn exited early; see {log.name}")
+        try:
+            if requests.get(url + "/", timeout=1).ok:
+                return process, url
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit(f"gunicorn did not answer within {args.boot_timeout}s; see {log.name}")
+
+
+def process_tree(pid):
+    """
+    Returns pid and all of its descendants (Linux /proc).
+    """
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    pids, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        pids.append(current)
+        stack.extend(children.get(current, []))
+    return pids
+
+
+def rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+class MemorySampler(threading.Thread):
+    """
+    Samples the RSS of a process and its children every interval seconds.
+    """
+
+    def __init__(self, pid, interval):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples = []   # (seconds since start, {pid: rss_mb})
+        self.stop = threading.Event()
+        self.started_at = time.monotonic()
+
+    def run(self):
+        while not self.stop.is_set():
+            sample = {pid: rss_mb(pid) for pid in process_tree(self.pid)}
+            self.samples.append((round(time.monotonic() - self.started_at, 1),
+                                 {pid: mb for pid, mb in sample.items() if mb is not None}))
+            self.stop.wait(self.interval)
+
+    def summary(self):
+        if not self.samples:
+            return {}
+        peak = {}
+        for _, sample in self.samples:
+            for pid, mb in sample.items():
+                peak[pid] = max(peak.get(pid, 0), mb)
+        return {
+            "processes": len(peak),
+            "peak_total_mb": round(max(sum(sample.values()) for _, sample in self.samples), 1),
+            "peak_per_process_mb": {str(pid): mb for pid, mb in sorted(peak.items())},
+            "timeline_total_mb": [(t, round(sum(sample.values()), 1)) for t, sample in self.samples],
+        }
+
+
+def server_total_ms(response):
+    for entry in response.headers.get("Server-Timing", "").split(","):
+        name, _, rest = entry.strip().partition(";")
+        if name == "total" and rest.startswith("dur="):
+            return float(rest[4:])
+    return None
+
+
+class LoadGenerator:
+    def __init__(self, args, url, file_names, questions):
+        self.args = args
+        self.url = url
+        self.file_names = file_names or ["missing.pdf"]
+        self.questions = questions
+        self.mix = parse_mix(args.mix)
+        self.lock = threading.Lock()
+        self.results = {name: {"latency": [], "server": [], "queueing": [], "statuses": {}} for name in self.mix}
+        self.local = threading.local()
+
+    def session(self):
+        if not hasattr(self.local, "session"):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def request_for(self, name, rng):
+        if name == "answer":
+            question = rng.choice(self.questions)
+            if rng.random() >= self.args.repeat_rate:
+                question = f"{question} ({rng.randrange(10**9)})"
+            return "POST", "/api/answer", {"question": question, "courseName": COURSE}
+        if name == "files":
+            return "GET", f"/api/files/{COURSE}/{rng.choice(self.file_names)}", None
+        if name == "listing":
+            return "GET", f"/api/files/{COURSE}", None
+        if name == "page":
+            page = rng.randint(1, self.args.pages)
+            return "GET", f"/api/files/{COURSE}/{rng.choice(self.file_names)}/pages/{page}", None
+        return "GET", f"/api/papers/{COURSE}?per_page=20", None
+
+    def one(self, rng):
+        name = rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+        method, path, body = self.request_for(name, rng)
+        started = time.perf_counter()
+        try:
+            response = self.session().request(method, self.url + path, json=body, timeout=self.args.timeout)
+            status = str(response.status_code)
+            _ = response.content
+        except requests.RequestException as e:
+            response, status = None, type(e).__name__
+        latency = (time.perf_counter() - started) * 1000
+        with self.lock:
+            result = self.results[name]
+            result["statuses"][status] = result["statuses"].get(status, 0) + 1
+            if response is not None and response.status_code < 400:
+                result["latency"].append(latency)
+                server = server_total_ms(response)
+                if server is not None:
+                    result["server"].append(server)
+                    result["queueing"].append(max(latency - server, 0.0))
+
+    def run(self):
+        stop_at = time.monotonic() + self.args.duration
+        interval = self.args.concurrency / self.args.rate if self.args.rate else 0
+
+        def client(index):
+            rng = random.Random(index)
+            next_at = time.monotonic()
+            while time.monotonic() < stop_at:
+                if interval:
+                    # Open loop: each client sends at a fixed pace regardless of response time.
+                    next_at += interval
+                    delay = next_at - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                self.one(rng)
+
+        threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(self.args.concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started
+
+    def report(self, elapsed):
+        endpoints = {}
+        total_ok = 0
+        for name, result in self.results.items():
+            latency, server, queueing = result["latency"], result["server"], result["queueing"]
+            total_ok += len(latency)
+            endpoints[name] = {
+                "requests": sum(result["statuses"].values()),
+                "statuses": result["statuses"],
+                "throughput_rps": round(len(latency) / elapsed, 2),
+                "p50_ms": rounded_percentile(latency, 50),
+                "p95_ms": rounded_percentile(latency, 95),
+                "p99_ms": rounded_percentile(latency, 99),
+                "server_p50_ms": rounded_percentile(server, 50),
+                "queueing_p50_ms": rounded_percentile(queueing, 50),
+                "queueing_p99_ms": rounded_percentile(queueing, 99),
+            }
+        return {"elapsed_s": round(elapsed, 2), "throughput_rps": round(total_ok / elapsed, 2), "endpoints": endpoints}
+
+
+def run(args):
+    work_dir = tempfile.mkdtemp(prefix="loadtest_")
+    llm_server, llm_config, llm_url = start_fake_llm_server(latency_ms=args.llm_latency_ms,
+                                                            jitter_ms=args.llm_latency_ms / 5, seed=1)
+    papers_server, papers_config, papers_url = start_stub_papers_api(latency_ms=args.papers_latency_ms)
+    process, sampler = None, None
+    try:
+        if args.url:
+            url, file_names = args.url.rstrip("/"), args.file_names.split(",") if args.file_names else []
+        else:
+            file_names = prepare_fixtures(args, work_dir)
+            key_names = [f"LOADTEST_GEMINI_KEY_{i}" for i in range(args.keys)]
+            env = dict(os.environ,
+                       API_KEYS=",".join(key_names), API_KEY_RPM=str(args.key_rpm),
+                       GEMINI_API_BASE=llm_url, PAPERS_API_URL=papers_url,
+                       DATA_DIRECTORY=os.path.join(work_dir, "Data"), CHROMA_DB_PATH=os.path.join(work_dir, "db"),
+                       PAGE_CACHE_DIR=os.path.join(work_dir, "pages"), REDIS_URL=args.redis_url,
+                       PRELOAD_MODELS="1" if args.preload else "0", HF_HUB_OFFLINE="1")
+            env.update({name: f"loadtest-{name.lower()}" for name in key_names})
+            process, url = start_gunicorn(args, work_dir, env)
+            sampler = MemorySampler(process.pid, args.sample_interval)
+            sampler.start()
+
+        generator = LoadGenerator(args, url, file_names, make_questions(max(args.questions, 1)))
+        elapsed = generator.run()
+        result = generator.report(elapsed)
+        result["config"] = {k: v for k, v in vars(args).items() if k != "json_path"}
+        result["upstream"] = {"llm_requests": llm_config.requests, "papers_api_requests": papers_config.requests}
+        if sampler is not None:
+            sampler.stop.set()
+            sampler.join()
+            result["memory"] = sampler.summary()
+        return result
+    finally:
+        if process is not None:
+            process.send_signal(signal.SIGTERM)
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        llm_server.shutdown()
+        papers_server.shutdown()
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the backend under gunicorn with stubbed upstreams.")
+    parser.add_argument("--url", default=None, help="Target an already running server instead of starting gunicorn.")
+    parser.add_argument("--file-names", default="", help="With --url: comma-separated course PDFs to request.")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--preload", action="store_true", help="Start workers with PRELOAD_MODELS=1.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Client threads.")
+    parser.add_argument("--rate", type=float, default=0, help="Total requests/s (open loop); 0 = closed loop.")
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--timeout", type=float, default=120, help="Client request timeout in seconds.")
+    parser.add_argument("--mix", default="answer=1,files=3,listing=2,page=3,papers=2",
+                        help=f"Endpoint weights, from {', '.join(ENDPOINTS)}.")
+    parser.add_argument("--questions", type=int, default=200, help="Distinct questions for /api/answer.")
+    parser.add_argument("--repeat-rate", type=float, default=0.2, help="Share of questions sent verbatim (coalescable).")
+    parser.add_argument("--files", type=int, default=5, help="Synthetic course PDFs.")
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--collection-size", type=int, default=2000)
+    parser.add_argument("--keys", type=int, default=8)
+    parser.add_argument("--key-rpm", type=float, default=100000)
+    parser.add_argument("--redis-url", default="redis://127.0.0.1:1/0", help="Unreachable by default (in-process fallbacks).")
+    parser.add_argument("--llm-latency-ms", type=float, default=800)
+    parser.add_argument("--papers-latency-ms", type=float, default=300)
+    parser.add_argument("--boot-timeout", type=float, default=120)
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="Seconds between RSS samples.")
+    parser.add_argument("--keep", action="store_true", help="Keep the working directory (fixtures, gunicorn.log).")
+    parser.add_argument("--json", dest="json_path", default=None)
+    args = parser.parse_args()
+
+    result = run(args)
+    print(json.dumps(result, indent=2))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(result, f, indent=2)
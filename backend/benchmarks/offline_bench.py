@@ -0,0 +1,349 @@
+# Offline benchmark suite for ingestion and retrieval. Nothing leaves the machine: the corpus is
+# synthetic, Gemini is the local fake server, and Vision / Document AI are local stand-ins.
+#
+# Stages (each reports throughput or latency; a stage whose dependencies are missing is
+# reported as skipped rather than failing the run):
+#   extract   PDF -> text with Preprocessing.texteractionpdf (fake Vision)
+#   papers    past-paper analysis with Scrapper.qp_analyser (fake Document AI), cold and cached
+#   chunk     Embedding.chunking.create_chunks
+#   embed     Embedding.sbert.embed_batch
+#   keywords  Embedding.keywordextraction.extract_keywords_batch (on a sample)
+#   store     ChromaDB writes
+#   answer    Retrival.main.answer_question p50/p95/p99 and per-stage means, per collection size
+#
+# The sentence-transformers model must already be in the local Hugging Face cache; the suite
+# runs with HF_HUB_OFFLINE=1.
+#
+# Usage (from the backend directory):
+#   python benchmarks/offline_bench.py --json before.json
+#   python benchmarks/offline_bench.py --json after.json --compare before.json
+#   python benchmarks/offline_bench.py --stages chunk,store,answer --sizes 1000,10000 --questions 50
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+backend_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_root)
+sys.path.insert(0, os.path.dirname(__file__))
+
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+from synthetic_corpus import generate_corpus, make_questions, write_pdf
+from fake_llm_server import start_fake_llm_server
+from fake_google_services import install_fake_vision, start_fake_docai_server
+
+ALL_STAGES = ("extract", "papers", "chunk", "embed", "keywords", "store", "answer")
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def rate(count, seconds):
+    return round(count / seconds, 2) if seconds > 0 else None
+
+
+def bench_extract(args, work_dir):
+    stats = install_fake_vision(latency_ms=args.vision_latency_ms)
+    from Preprocessing.texteractionpdf import extract_text_and_images_from_pdf
+
+    pdf_dir = os.path.join(work_dir, "pdfs")
+    os.makedirs(pdf_dir)
+    paths = [write_pdf(os.path.join(pdf_dir, f"doc_{i}.pdf"), pages=args.pages, seed=i) for i in range(args.pdfs)]
+    started = time.perf_counter()
+    for path in paths:
+        extract_text_and_images_from_pdf(path)
+    elapsed = time.perf_counter() - started
+    return {"documents": len(paths), "pages": len(paths) * args.pages, "seconds": round(elapsed, 3),
+            "pages_per_s": rate(len(paths) * args.pages, elapsed), "vision_calls": stats.labels + stats.ocr}
+
+
+def bench_papers(args, work_dir):
+    os.environ["QUESTION_CACHE_DIR"] = os.path.join(work_dir, "question_cache")
+    server, config, base_url = start_fake_docai_server(latency_ms=args.docai_latency_ms)
+    from Scrapper import qp_analyser
+
+    client = qp_analyser.DocAIClient(endpoint=f"{base_url}/v1/processors/fake:process")
+    client.access_token = lambda: "offline-token"
+    qp_analyser._docai_client = client
+
+    links = [f"{base_url}/papers/paper{i:04d}.pdf" for i in range(args.papers)]
+    cold, cached = [], []
+    for link in links:
+        started = time.perf_counter()
+        qp_analyser.retrieve_questions_from_paper(link)
+        cold.append(time.perf_counter() - started)
+    for link in links:
+        started = time.perf_counter()
+        qp_analyser.retrieve_questions_from_paper(link)
+        cached.append(time.perf_counter() - started)
+    server.shutdown()
+    return {"papers": len(links), "docai_latency_ms": args.docai_latency_ms,
+            "cold_p50_ms": round(percentile(cold, 50) * 1000, 2),
+            "cached_p50_ms": round(percentile(cached, 50) * 1000, 3),
+            "cached_p99_ms": round(percentile(cached, 99) * 1000, 3),
+            "docai_requests": config.process_requests}
+
+
+def bench_chunk(args, corpus_paths):
+    from Embedding.chunking import create_chunks
+
+    started = time.perf_counter()
+    chunks = []
+    for _ in range(args.repeat):
+        chunks = [chunk for path in corpus_paths for chunk in create_chunks(path)]
+    elapsed = (time.perf_counter() - started) / args.repeat
+    return chunks, {"documents": len(corpus_paths), "chunks": len(chunks), "seconds": round(elapsed, 4),
+                    "chunks_per_s": rate(len(chunks), elapsed)}
+
+
+def sample_batch(chunks, count):
+    from Embedding.chunkrecord import ChunkBatch, ChunkRecord
+
+    records = [ChunkRecord(c["id"], c["source_document"], c["page_number"], c["text"]) for c in chunks[:count]]
+    return ChunkBatch("sample", records)
+
+
+def bench_embed(args, chunks):
+    from Embedding.sbert import embed_batch
+
+    embed_batch(sample_batch(chunks, 2))  # load weights / first-call overhead outside the timing
+    batch = sample_batch(chunks, args.embed_sample)
+    started = time.perf_counter()
+    embed_batch(batch)
+    elapsed = time.perf_counter() - started
+    return {"chunks": len(batch), "seconds": round(elapsed, 3), "chunks_per_s": rate(len(batch), elapsed)}
+
+
+def bench_keywords(args, chunks):
+    from Embedding.keywordextraction import extract_keywords_batch, get_nlp
+
+    get_nlp()  # model load outside the timing
+    batch = sample_batch(chunks, args.keyword_sample)
+    started = time.perf_counter()
+    extract_keywords_batch(batch)
+    elapsed = time.perf_counter() - started
+    return {"chunks": len(batch), "seconds": round(elapsed, 3), "chunks_per_s": rate(len(batch), elapsed)}
+
+
+def synthetic_records(chunks, size, dim=384, seed=0):
+    """
+    Builds `size` collection records from the chunk texts (cycled) with unit-length random
+    embeddings, so collection size can be scaled without encoding every record.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((size, dim)).astype("float32")
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids, documents, metadatas = [], [], []
+    for i in range(size):
+        chunk = chunks[i % len(chunks)]
+        ids.append(f"{chunk['id']}_{i}")
+        documents.append(chunk["text"])
+        metadatas.append({"source": chunk["source_document"], "page": chunk["page_number"], "keywords": ""})
+    return ids, vectors.tolist(), documents, metadatas
+
+
+def build_collection(path, name, chunks, size, batch_size):
+    import chromadb
+
+    client = chromadb.PersistentClient(path=path)
+    collection = client.get_or_create_collection(name=name)
+    ids, embeddings, documents, metadatas = synthetic_records(chunks, size)
+    started = time.perf_counter()
+    for start in range(0, size, batch_size):
+        end = start + batch_size
+        collection.add(ids=ids[start:end], embeddings=embeddings[start:end],
+                       documents=documents[start:end], metadatas=metadatas[start:end])
+    return client, time.perf_counter() - started
+
+
+_clients = {}  # collection size -> Chroma client, shared by the store and answer stages
+
+
+def get_collection_client(args, chunks, work_dir, size):
+    if size not in _clients:
+        client, elapsed = build_collection(os.path.join(work_dir, f"chroma_{size}"), "aws", chunks, size, args.batch_size)
+        _clients[size] = (client, elapsed)
+    return _clients[size]
+
+
+def bench_store(args, chunks, work_dir):
+    results = {}
+    for size in args.sizes:
+        _, elapsed = get_collection_client(args, chunks, work_dir, size)
+        results[str(size)] = {"seconds": round(elapsed, 3), "records_per_s": rate(size, elapsed)}
+    return results
+
+
+def start_fake_llm(args):
+    """
+    Starts the fake Gemini server and points the LLM client and key scheduler at it. Must run
+    before anything imports utils.llm_client, which reads its settings at import time.
+    """
+    key_names = [f"OFFLINE_GEMINI_KEY_{i}" for i in range(4)]
+    for name in key_names:
+        os.environ[name] = f"offline-{name.lower()}"
+    os.environ["API_KEYS"] = ",".join(key_names)
+    os.environ["API_KEY_RPM"] = "1000000"
+    os.environ["REDIS_URL"] = "redis://127.0.0.1:1/0"
+    server, _, base_url = start_fake_llm_server(latency_ms=args.llm_latency_ms, jitter_ms=args.llm_latency_ms / 10, seed=1)
+    os.environ["GEMINI_API_BASE"] = base_url
+    return server
+
+
+def bench_answer(args, chunks, work_dir):
+    from Retrival import main
+    from utils import tracing
+
+    questions = make_questions(args.questions)
+    main.get_embedding_model().encode("warm up")
+    results = {}
+    for size in args.sizes:
+        main._client, _ = get_collection_client(args, chunks, work_dir, size)
+        latencies, stages = [], {}
+        for i, question in enumerate(questions):
+            trace = tracing.start_trace("offline_bench")
+            started = time.perf_counter()
+            main.answer_question(f"{question} #{size}-{i}", "cloud-computing")
+            latencies.append(time.perf_counter() - started)
+            tracing.end_trace()
+            for stage, seconds in trace.spans:
+                stages.setdefault(stage, []).append(seconds)
+        results[str(size)] = {
+            "questions": len(latencies),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "stage_mean_ms": {stage: round(sum(v) / len(v) * 1000, 3) for stage, v in stages.items()},
+        }
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=backend_root,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_stage(name, results, fn, *fn_args):
+    print(f"[{name}] running...", file=sys.stderr)
+    try:
+        results[name] = fn(*fn_args)
+    except ImportError as e:
+        results[name] = {"skipped": f"missing dependency: {e}"}
+    except Exception as e:
+        results[name] = {"skipped": f"{type(e).__name__}: {e}"}
+    return results[name]
+
+
+def run(args):
+    work_dir = tempfile.mkdtemp(prefix="offline_bench_")
+    corpus_paths = generate_corpus(os.path.join(work_dir, "corpus"), args.documents, args.pages, seed=args.seed)
+    stages = {}
+    llm_server = start_fake_llm(args)
+    try:
+        if "extract" in args.stages:
+            run_stage("extract", stages, bench_extract, args, work_dir)
+        if "papers" in args.stages:
+            run_stage("papers", stages, bench_papers, args, work_dir)
+
+        from Embedding.chunking import create_chunks
+        chunks = [chunk for path in corpus_paths for chunk in create_chunks(path)]
+        random.Random(args.seed).shuffle(chunks)
+        if "chunk" in args.stages:
+            run_stage("chunk", stages, lambda: bench_chunk(args, corpus_paths)[1])
+        if "embed" in args.stages:
+            run_stage("embed", stages, bench_embed, args, chunks)
+        if "keywords" in args.stages:
+            run_stage("keywords", stages, bench_keywords, args, chunks)
+        if "store" in args.stages:
+            run_stage("store", stages, bench_store, args, chunks, work_dir)
+        if "answer" in args.stages:
+            run_stage("answer", stages, bench_answer, args, chunks, work_dir)
+    finally:
+        llm_server.shutdown()
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("json_path", "compare")},
+        },
+        "stages": stages,
+    }
+
+
+def flatten(prefix, value, out):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            flatten(f"{prefix}.{key}" if prefix else key, item, out)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        out[prefix] = value
+    return out
+
+
+def compare(baseline, current):
+    """
+    Returns the relative change of every numeric result present in both runs.
+    """
+    before = flatten("", baseline.get("stages", {}), {})
+    after = flatten("", current.get("stages", {}), {})
+    changes = {}
+    for key in sorted(before.keys() & after.keys()):
+        if before[key]:
+            changes[key] = {"before": before[key], "after": after[key],
+                            "change_pct": round((after[key] - before[key]) / before[key] * 100, 1)}
+    return changes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline ingestion and retrieval benchmarks.")
+    parser.add_argument("--stages", default=",".join(ALL_STAGES), help=f"Comma-separated subset of {','.join(ALL_STAGES)}.")
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--pdfs", type=int, default=3, help="PDFs for the extract stage.")
+    parser.add_argument("--papers", type=int, default=10, help="Past papers for the papers stage.")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions of the chunk stage.")
+    parser.add_argument("--embed-sample", type=int, default=200)
+    parser.add_argument("--keyword-sample", type=int, default=20)
+    parser.add_argument("--sizes", default="1000,5000,20000", help="Collection sizes for the store and answer stages.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--questions", type=int, default=30)
+    parser.add_argument("--llm-latency-ms", type=float, default=20)
+    parser.add_argument("--vision-latency-ms", type=float, default=5)
+    parser.add_argument("--docai-latency-ms", type=float, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary working directory.")
+    parser.add_argument("--json", dest="json_path", default=None)
+    parser.add_argument("--compare", default=None, help="Earlier --json output to compare against.")
+    args = parser.parse_args()
+    args.stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    args.sizes = [int(s) for s in str(args.sizes).split(",")]
+
+    result = run(args)
+    if args.compare:
+        with open(args.compare) as f:
+            result["comparison"] = compare(json.load(f), result)
+    print(json.dumps(result, indent=2))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,82 @@
+# Measures paper-listing latency through Scrapper.fetch_papers against the local stub API:
+# the cold miss, cache hits (with filtering and pagination) and stale-while-revalidate reads.
+#
+# Usage (from the backend directory):
+#   python benchmarks/papers_cache_bench.py --papers 500 --latency-ms 800
+
+import argparse
+import json
+import os
+import sys
+import time
+
+backend_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_root)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from stub_papers_api import start_stub_papers_api
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def run(args):
+    server, config, url = start_stub_papers_api(papers_per_subject=args.papers, latency_ms=args.latency_ms)
+    os.environ["PAPERS_API_URL"] = url
+    os.environ["PAPERS_CACHE_TTL"] = str(args.ttl)
+
+    from Scrapper import fetch_papers
+
+    subject = "Operating Systems"
+    papers, miss_ms = timed(fetch_papers.fetch_papers_from_api, subject)
+
+    hit_ms, filtered_ms = [], []
+    for i in range(args.iterations):
+        _, ms = timed(fetch_papers.fetch_papers_from_api, subject)
+        hit_ms.append(ms)
+        cached, _ = timed(fetch_papers.fetch_papers_from_api, subject)
+        _, ms = timed(fetch_papers.filter_papers, cached, exam="FAT", year="2024", page=1, per_page=20)
+        filtered_ms.append(ms)
+
+    # Let the entry go stale: the next read must still return immediately.
+    time.sleep(args.ttl + 0.05)
+    requests_before = config.requests
+    _, stale_ms = timed(fetch_papers.fetch_papers_from_api, subject)
+    time.sleep(args.latency_ms / 1000 + 0.2)
+    server.shutdown()
+
+    return {
+        "papers": len(papers),
+        "upstream_latency_ms": args.latency_ms,
+        "miss_ms": round(miss_ms, 2),
+        "hit_p50_ms": round(percentile(hit_ms, 50), 4),
+        "hit_p99_ms": round(percentile(hit_ms, 99), 4),
+        "hit_plus_filter_p50_ms": round(percentile(filtered_ms, 50), 4),
+        "hit_plus_filter_p99_ms": round(percentile(filtered_ms, 99), 4),
+        "stale_read_ms": round(stale_ms, 4),
+        "background_refreshes": config.requests - requests_before,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the paper listing cache against a stub API.")
+    parser.add_argument("--papers", type=int, default=300)
+    parser.add_argument("--latency-ms", type=float, default=500)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--ttl", type=float, default=1.0, help="Cache TTL used for the run, in seconds.")
+    parser.add_argument("--json", dest="json_path", default=None)
+    args = parser.parse_args()
+
+    result = run(args)
+    print(json.dumps(result, indent=2))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,155 @@
+# Measures what precomputed past-paper answers (Retrival/precompute.py) save on an exam-week
+# question stream: Gemini calls and /api/answer latency with the stored answers served, versus
+# every question going through the RAG pipeline.
+#
+# Nothing leaves the machine: Gemini is the local fake server (--llm-latency-ms per call), paper
+# storage and Document AI are fake_google_services (--questions-per-paper questions, the same in
+# every paper, as topics repeat across years), the collection is synthetic (offline_bench) and
+# queries are encoded by a deterministic stand-in for the sentence-transformers model. Requests
+# go through app.py's /api/answer with Flask's test client.
+#
+# The stream asks --paper-share of its questions from the papers, in the forms students type
+# them (without the "Q3." numbering, in lower case, with a question mark), and the rest are new.
+#
+# Usage (from the backend directory):
+#   python benchmarks/precompute_bench.py --papers 20 --questions-per-paper 30 --requests 300 --paper-share 0.6
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+
+backend_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_root)
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+
+from loadtest import percentile
+from synthetic_corpus import generate_corpus, make_questions
+from fake_google_services import start_fake_docai_server
+from fake_llm_server import start_fake_llm_server
+from offline_bench import build_collection
+
+
+class StandInEncoder:
+    """
+    Deterministic unit vectors per text, in place of all-MiniLM-L6-v2.
+    """
+    def encode(self, text, **kwargs):
+        if not isinstance(text, str):
+            return np.stack([self.encode(t) for t in text])
+        vector = np.random.default_rng(zlib.crc32(text.encode("utf-8"))).standard_normal(384).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+
+
+def student_form(question, rng):
+    """
+    Rewrites a paper question the way a student would type it.
+    """
+    text = question.split(".", 1)[1].strip() if question.startswith("Q") else question
+    return rng.choice([text, text.lower(), text.rstrip(".") + "?", "  " + text.upper()])
+
+
+def start_fake_llm(args):
+    """
+    Starts the fake Gemini server and points the LLM client at it (before it is imported).
+    """
+    os.environ["OFFLINE_GEMINI_KEY_0"] = "offline-key"
+    os.environ.update(API_KEYS="OFFLINE_GEMINI_KEY_0", API_KEY_RPM="1000000", REDIS_URL="redis://127.0.0.1:1/0")
+    server, config, base_url = start_fake_llm_server(latency_ms=args.llm_latency_ms, jitter_ms=args.llm_latency_ms / 10, seed=1)
+    os.environ["GEMINI_API_BASE"] = base_url
+    return server, config
+
+
+def ask_stream(client, stream, llm_config):
+    calls_before = llm_config.requests
+    latencies = {"paper": [], "new": []}
+    served = 0
+    for kind, question in stream:
+        started = time.perf_counter()
+        response = client.post("/api/answer", json={"question": question, "courseName": "cloud-computing"})
+        latencies[kind].append((time.perf_counter() - started) * 1000)
+        served += bool(response.get_json().get("precomputed"))
+    result = {"llm_calls": llm_config.requests - calls_before, "precomputed_served": served}
+    for kind, values in latencies.items():
+        if values:
+            result[f"{kind}_p50_ms"] = round(percentile(values, 50), 2)
+            result[f"{kind}_p95_ms"] = round(percentile(values, 95), 2)
+    return result
+
+
+def run(args):
+    work_dir = tempfile.mkdtemp(prefix="precompute_bench_")
+    os.environ["QUESTION_CACHE_DIR"] = os.path.join(work_dir, "questions")
+    os.environ["PRECOMPUTED_ANSWERS_DIR"] = os.path.join(work_dir, "answers")
+    llm_server, llm_config = start_fake_llm(args)
+    docai_server, docai_config, docai_url = start_fake_docai_server(latency_ms=args.docai_latency_ms,
+                                                                    questions_per_paper=args.questions_per_paper)
+    try:
+        from Embedding.chunking import create_chunks
+        from Retrival import main, precompute
+        from Scrapper import qp_analyser
+        import app
+
+        corpus = generate_corpus(os.path.join(work_dir, "corpus"), documents=10, pages=20)
+        chunks = [chunk for path in corpus for chunk in create_chunks(path)]
+        main._client, _ = build_collection(os.path.join(work_dir, "db"), "aws", chunks, args.collection_size, 5000)
+        main._embedding_model = StandInEncoder()
+
+        docai = qp_analyser.DocAIClient(endpoint=f"{docai_url}/v1/processors/fake:process")
+        docai.access_token = lambda: "offline-token"
+        qp_analyser._docai_client = docai
+        papers = [{"id": f"paper{i:04d}", "pdf_link": f"{docai_url}/papers/paper{i:04d}.pdf"} for i in range(args.papers)]
+        precompute.fetch_papers_from_api = lambda subject: papers
+
+        calls_before = llm_config.requests
+        started = time.perf_counter()
+        job = precompute.precompute_course("cloud-computing", rpm=args.rpm)
+        job.update({"seconds": round(time.perf_counter() - started, 2), "llm_calls": llm_config.requests - calls_before,
+                    "docai_requests": docai_config.process_requests})
+
+        rng = random.Random(args.seed)
+        paper_questions = [question for question, _ in precompute.collect_questions("cloud-computing")]
+        new_questions = iter(make_questions(args.requests, seed=args.seed))
+        stream = [("paper", student_form(rng.choice(paper_questions), rng)) if rng.random() < args.paper_share
+                  else ("new", next(new_questions)) for _ in range(args.requests)]
+
+        client = app.app.test_client()
+        precompute.PRECOMPUTED_ANSWERS = False
+        without = ask_stream(client, stream, llm_config)
+        precompute.PRECOMPUTED_ANSWERS = True
+        with_answers = ask_stream(client, stream, llm_config)
+        return {"papers": args.papers, "distinct_paper_questions": len(paper_questions), "requests": args.requests,
+                "paper_share": args.paper_share, "llm_latency_ms": args.llm_latency_ms,
+                "precompute_job": job, "without_precomputed": without, "with_precomputed": with_answers}
+    finally:
+        llm_server.shutdown()
+        docai_server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gemini calls and latency with and without precomputed answers.")
+    parser.add_argument("--papers", type=int, default=20)
+    parser.add_argument("--questions-per-paper", type=int, default=30)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--paper-share", type=float, default=0.6, help="Share of asked questions taken from the papers.")
+    parser.add_argument("--collection-size", type=int, default=5000)
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--docai-latency-ms", type=float, default=50)
+    parser.add_argument("--rpm", type=float, default=0, help="Precompute rate; 0 runs the job unthrottled.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", default=None)
+    args = parser.parse_args()
+
+    result = run(args)
+    print(json.dumps(result, indent=2))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(result, f, indent=2)
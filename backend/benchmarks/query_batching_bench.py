@@ -0,0 +1,137 @@
+# Measures query-encoding throughput and latency in one worker at 1, 8 and 32 concurrent clients,
+# with every query encoded on its own (QUERY_BATCH_MAX=1) and with micro-batching
+# (Retrival/main.py encode_query, utils/microbatch.py) at one or more batching windows.
+#
+# Each client is a thread calling encode_query in a loop, as request threads do in a gunicorn
+# gthread worker. The model is all-MiniLM-L6-v2 when it is in the local Hugging Face cache
+# (--real-model); otherwise a randomly initialised BERT with the same architecture (6 layers,
+# 384 hidden, 12 heads, 1536 intermediate) and hashed word ids, which costs the same per forward
+# pass. The results are about cost, not embedding quality.
+#
+# Usage (from the backend directory):
+#   python benchmarks/query_batching_bench.py --seconds 10 --windows 0 2 5
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import zlib
+
+backend_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_root)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from loadtest import percentile
+from synthetic_corpus import make_questions
+
+
+class StandInMiniLM:
+    """
+    A MiniLM-L6-sized BERT with random weights, mean-pooled, behind SentenceTransformer.encode.
+    """
+
+    def __init__(self, max_tokens=64, seed=0):
+        import torch
+        from transformers import BertConfig, BertModel
+        torch.manual_seed(seed)
+        self.torch = torch
+        self.max_tokens = max_tokens
+        self.config = BertConfig(vocab_size=30522, hidden_size=384, num_hidden_layers=6, num_attention_heads=12,
+                                 intermediate_size=1536)
+        self.model = BertModel(self.config).eval()
+
+    def _token_ids(self, text):
+        words = text.lower().split()[:self.max_tokens - 2]
+        return [101] + [1000 + zlib.crc32(w.encode("utf-8")) % 29000 for w in words] + [102]
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, **kwargs):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        ids = [self._token_ids(t) for t in texts]
+        width = max(len(i) for i in ids)
+        input_ids = self.torch.tensor([i + [0] * (width - len(i)) for i in ids])
+        mask = self.torch.tensor([[1] * len(i) + [0] * (width - len(i)) for i in ids])
+        with self.torch.inference_mode():
+            hidden = self.model(input_ids=input_ids, attention_mask=mask).last_hidden_state
+            pooled = (hidden * mask.unsqueeze(-1)).sum(1) / mask.sum(1, keepdim=True)
+        vectors = pooled.numpy()
+        return vectors[0] if single else vectors
+
+
+def run_clients(encode, questions, clients, seconds):
+    latencies = [[] for _ in range(clients)]
+    stop = time.perf_counter() + seconds
+
+    def client(n):
+        i = n
+        while time.perf_counter() < stop:
+            started = time.perf_counter()
+            encode(questions[i % len(questions)])
+            latencies[n].append((time.perf_counter() - started) * 1000)
+            i += clients
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    values = [v for per_client in latencies for v in per_client]
+    return {"queries_per_s": round(len(values) / elapsed, 1), "p50_ms": round(percentile(values, 50), 2),
+            "p95_ms": round(percentile(values, 95), 2), "p99_ms": round(percentile(values, 99), 2)}
+
+
+def run(args):
+    from Retrival import main
+    from utils.microbatch import MicroBatcher
+
+    if args.real_model:
+        from sentence_transformers import SentenceTransformer
+        main._embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+    else:
+        main._embedding_model = StandInMiniLM()
+    questions = make_questions(200, seed=args.seed)
+    main._embedding_model.encode(questions[:8])   # warm up
+
+    configs = [("unbatched", None)] + [(f"window_{w:g}ms", w) for w in args.windows]
+    results = {}
+    for clients in args.clients:
+        for label, window in configs:
+            sizes = []
+
+            def encode_batch(texts):
+                sizes.append(len(texts))
+                return main._encode_batch(texts)
+
+            main.QUERY_BATCH_MAX = 1 if window is None else args.max_batch
+            main._query_batcher = MicroBatcher(f"bench-{label}-{clients}", encode_batch, window=(window or 0) / 1000,
+                                               max_batch=args.max_batch)
+            result = run_clients(main.encode_query, questions, clients, args.seconds)
+            if sizes:
+                result["mean_batch"] = round(sum(sizes) / len(sizes), 1)
+                result["max_batch_seen"] = max(sizes)
+            results.setdefault(f"{clients}_clients", {})[label] = result
+            print(json.dumps({"clients": clients, label: result}), file=sys.stderr)
+    return {"model": "all-MiniLM-L6-v2" if args.real_model else "stand-in MiniLM-L6 (random weights)",
+            "max_batch": args.max_batch, "seconds": args.seconds, "results": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query-encoding throughput with and without micro-batching.")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--windows", type=float, nargs="+", default=[0, 2, 5], help="Batching windows in ms.")
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--real-model", action="store_true", help="Use all-MiniLM-L6-v2 from the local cache.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", default=None)
+    args = parser.parse_args()
+
+    result = run(args)
+    print(json.dumps(result, indent=2))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,184 @@
+# Measures what a course rebuild does to serving: query latency, failed queries and how often a
+# query hits an incomplete index, while the course is re-ingested
+#
+#   in_place             the old way: the live collection is dropped and ingested again
+#   versioned            Database/reindex.py: a new version is built next to the live one,
+#                        validated, swapped in through the alias and the old version deleted
+#   versioned_throttled  the same with the build process at REINDEX_NICE priority (--nice)
+#                        and an optional chunks-per-second cap (--rate)
+#
+# next to a baseline with no rebuild running. Both sides use one shared index server
+# (VECTOR_STORE_MODE=server), since embedded Chroma does not see another process's writes. The
+# rebuild runs in its own process; serving is a thread of this one that resolves the alias
+# (with a short COLLECTION_ALIAS_TTL) and queries the collection with random vectors, while a
+# sampler checks the served collection's record count. Chunking and centroids are the real
+# code; embedding is a stand-in that spends --cpu-ms-per-chunk of CPU per chunk, as the model
+# would, so a build competes with serving for the CPU.
+#
+# Usage (from the backend directory):
+#   python benchmarks/reindex_bench.py --documents 30 --pages 20 --cpu-ms-per-chunk 20
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zlib
+
+backend_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_root)
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+
+from loadtest import free_port, percentile
+from synthetic_corpus import generate_corpus
+from Database.vectorstore import open_client, start_server
+from Database import aliases, reindex
+
+ALIAS = "aws"
+
+
+def synthetic_ingest(cpu_ms_per_chunk, dim=384):
+    """
+    Returns an ingest function like Database.process_pipeline.ingest_directory, with a stand-in
+    embedding (deterministic vectors after cpu_ms_per_chunk of CPU work per chunk) and no keywords.
+    """
+    def ingest(directory, collection_name, client, index_config=None, throttle=None):
+        from Embedding.chunking import create_chunk_batch
+        from Embedding.centroids import batch_centroids, docs_collection_name
+        from Database.indexconfig import get_or_create_collection, index_config_of
+
+        collection = get_or_create_collection(client, collection_name, index_config)
+        docs = get_or_create_collection(client, docs_collection_name(collection_name), index_config_of(collection))
+        for name in sorted(os.listdir(directory)):
+            batch = create_chunk_batch(os.path.join(directory, name))
+            if not len(batch):
+                continue
+            end = time.process_time() + cpu_ms_per_chunk * len(batch) / 1000
+            while time.process_time() < end:
+                pass
+            batch.set_embeddings(np.stack([np.random.default_rng(zlib.crc32(r.id.encode())).standard_normal(dim)
+                                           for r in batch]).astype(np.float32))
+            collection.add(**batch.to_chroma())
+            docs.upsert(**batch_centroids(batch))
+            if throttle is not None:
+                throttle(len(batch))
+    return ingest
+
+
+def build(mode, url, corpus_dir, cpu_ms_per_chunk, nice, rate, gc_grace):
+    """
+    Runs in its own process: one rebuild of the course.
+    """
+    client = open_client("server", url=url)
+    ingest = synthetic_ingest(cpu_ms_per_chunk)
+    if mode == "in_place":
+        for name in (ALIAS, ALIAS + "__docs"):
+            client.delete_collection(name)
+        ingest(corpus_dir, ALIAS, client)
+        return
+    if mode == "versioned_throttled":
+        reindex.lower_priority(nice, threads=0)
+    reindex.reindex(ALIAS, corpus_dir, client=client, chunks_per_second=rate if mode == "versioned_throttled" else 0,
+                    gc_grace=gc_grace, ingest=ingest, throttle_process=False)
+
+
+def serve(url, full_count, stop, duration=None):
+    """
+    Queries the course until stop is set (or for duration seconds) and samples its record count.
+    """
+    client = open_client("server", url=url)
+    rng = np.random.default_rng(0)
+    latencies, errors, served = [], 0, []
+    samples = {"total": 0, "incomplete": 0}
+
+    def sample():
+        while not stop.is_set():
+            try:
+                count = client.get_collection(name=aliases.resolve(client, ALIAS)).count()
+            except Exception:
+                count = 0
+            samples["total"] += 1
+            samples["incomplete"] += count < full_count
+            time.sleep(0.05)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    deadline = time.monotonic() + duration if duration else None
+    while not stop.is_set() and (deadline is None or time.monotonic() < deadline):
+        query = rng.standard_normal(384).astype(np.float32)
+        started = time.perf_counter()
+        try:
+            name = aliases.resolve(client, ALIAS)
+            client.get_collection(name=name).query(query_embeddings=[query], n_results=15)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if not served or served[-1] != name:
+                served.append(name)
+        except Exception:
+            errors += 1
+            time.sleep(0.01)
+    stop.set()
+    sampler.join()
+    return {"queries": len(latencies), "errors": errors,
+            "p50_ms": round(percentile(latencies, 50), 2), "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "incomplete_share": round(samples["incomplete"] / max(samples["total"], 1), 3), "served": served}
+
+
+def run(args):
+    aliases.COLLECTION_ALIAS_TTL = 0.5
+    work_dir = tempfile.mkdtemp(prefix="reindex_bench_")
+    url = f"http://127.0.0.1:{free_port()}"
+    server = start_server(os.path.join(work_dir, "db"), url)
+    try:
+        corpus_dir = os.path.join(work_dir, "corpus")
+        generate_corpus(corpus_dir, documents=args.documents, pages=args.pages)
+        client = open_client("server", url=url)
+        synthetic_ingest(0)(corpus_dir, ALIAS, client)
+        full_count = client.get_collection(name=ALIAS).count()
+
+        results = {"baseline": serve(url, full_count, threading.Event(), duration=args.baseline_seconds)}
+        spawn = multiprocessing.get_context("spawn")
+        for mode in ("in_place", "versioned", "versioned_throttled"):
+            stop = threading.Event()
+            process = spawn.Process(target=build, args=(mode, url, corpus_dir, args.cpu_ms_per_chunk, args.nice,
+                                                        args.rate, args.gc_grace))
+            started = time.perf_counter()
+            process.start()
+            watcher = threading.Thread(target=lambda: (process.join(), stop.set()), daemon=True)
+            watcher.start()
+            results[mode] = serve(url, full_count, stop)
+            results[mode]["build_s"] = round(time.perf_counter() - started, 2)
+            results[mode]["build_ok"] = process.exitcode == 0
+            print(json.dumps({mode: results[mode]}), file=sys.stderr)
+        results["versions_left"] = aliases.versions(client, ALIAS)
+        return {"documents": args.documents, "pages": args.pages, "records": full_count,
+                "cpu_ms_per_chunk": args.cpu_ms_per_chunk, "nice": args.nice, "rate": args.rate, "results": results}
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serving latency and correctness during a course rebuild.")
+    parser.add_argument("--documents", type=int, default=30)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--cpu-ms-per-chunk", type=float, default=20)
+    parser.add_argument("--nice", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=0, help="Chunks per second cap for the throttled build (0: none).")
+    parser.add_argument("--gc-grace", type=float, default=2)
+    parser.add_argument("--baseline-seconds", type=float, default=10)
+    parser.add_argument("--json", dest="json_path", default=None)
+    args = parser.parse_args()
+
+    result = run(args)
+    print(json.dumps(result, indent=2))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(result, f, indent=2)
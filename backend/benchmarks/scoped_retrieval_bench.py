@@ -0,0 +1,115 @@
+# Measures document-scoped retrieval (Retrival/scoped_index.py) against course-wide search as the
+# collection grows. Each collection holds --chunks-per-source chunks per synthetic source file
+# with unit-length random embeddings; for every size the script times
+#   course     collection.query over the whole collection (what unscoped questions do)
+#   filter     collection.query with the scope pushed down as a `where` clause
+#   subindex   scoped_index.query served from the per-source sub-index (built once, not timed)
+# and checks that the sub-index returns the same chunks as the filtered Chroma query.
+#
+# Usage (from the backend directory):
+#   python benchmarks/scoped_retrieval_bench.py --sizes 5000,20000,80000 --queries 200
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+backend_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_root)
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+
+from loadtest import percentile
+from Database.vectorstore import open_client
+from Retrival import scoped_index
+from Retrival.scoped_index import Scope
+
+
+def build_collection(client, name, size, chunks_per_source, dim, batch_size=5000):
+    rng = np.random.default_rng(size)
+    collection = client.get_or_create_collection(name=name)
+    for start in range(0, size, batch_size):
+        end = min(start + batch_size, size)
+        vectors = rng.standard_normal((end - start, dim)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        collection.add(ids=[f"chunk_{i}" for i in range(start, end)], embeddings=vectors,
+                       documents=[f"synthetic chunk {i}" for i in range(start, end)],
+                       metadatas=[{"source": f"deck_{i // chunks_per_source}.pdf",
+                                   "page": i % chunks_per_source + 1, "keywords": ""}
+                                  for i in range(start, end)])
+    return collection
+
+
+def timed(fn, queries):
+    latencies, results = [], []
+    for query in queries:
+        started = time.perf_counter()
+        results.append(fn(query))
+        latencies.append((time.perf_counter() - started) * 1000)
+    return {f"p{p}": round(percentile(latencies, p), 3) for p in (50, 95, 99)}, results
+
+
+def run_size(args, client, size):
+    collection = build_collection(client, f"scoped_{size}", size, args.chunks_per_source, args.dim)
+    rng = np.random.default_rng(0)
+    queries = [rng.standard_normal(args.dim).astype(np.float32).tolist() for _ in range(args.queries)]
+    sources = size // args.chunks_per_source
+    scope = Scope(f"deck_{sources // 2}.pdf", args.page_start, args.page_end)
+
+    built = time.perf_counter()
+    index = scoped_index.get_source_index(collection, scope.source)
+    build_ms = (time.perf_counter() - built) * 1000
+
+    course, _ = timed(lambda q: collection.query(query_embeddings=[q], n_results=args.n_results), queries)
+    filtered, filter_results = timed(lambda q: collection.query(query_embeddings=[q], n_results=args.n_results,
+                                                                where=scoped_index.where_filter(scope)), queries)
+    subindex, index_results = timed(lambda q: scoped_index.query(collection, scope, q, args.n_results), queries)
+
+    matches = sum(len(set(a["ids"][0]) & set(b["ids"][0])) for a, b in zip(filter_results, index_results))
+    expected = sum(len(a["ids"][0]) for a in filter_results)
+    return {
+        "records": size,
+        "sources": sources,
+        "scope_chunks": len(index),
+        "subindex_build_ms": round(build_ms, 1),
+        "course_ms": course,
+        "filter_ms": filtered,
+        "subindex_ms": subindex,
+        "speedup_p50_vs_course": round(course["p50"] / max(subindex["p50"], 1e-9), 1),
+        "agreement_with_filter": round(matches / max(expected, 1), 4),
+    }
+
+
+def run(args):
+    work_dir = tempfile.mkdtemp(prefix="scoped_bench_")
+    try:
+        client = open_client("embedded", db_path=os.path.join(work_dir, "db"))
+        return {"dim": args.dim, "n_results": args.n_results, "queries": args.queries,
+                "chunks_per_source": args.chunks_per_source,
+                "page_range": [args.page_start, args.page_end],
+                "results": [run_size(args, client, size) for size in args.sizes]}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency of scoped vs course-wide retrieval.")
+    parser.add_argument("--sizes", type=lambda s: [int(n) for n in s.split(",")], default=[5000, 20000, 80000])
+    parser.add_argument("--chunks-per-source", type=int, default=200)
+    parser.add_argument("--page-start", type=int, default=None)
+    parser.add_argument("--page-end", type=int, default=None)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--n-results", type=int, default=15)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--json", dest="json_path", default=None)
+    args = parser.parse_args()
+
+    result = run(args)
+    print(json.dumps(result, indent=2))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,126 @@
+# Measures follow-up questions with and without a session id on /api/answer
+# (Retrival/session_cache.py): Gemini calls, per-question latency, the time spent in the
+# retrieval stages and the size of a session record.
+#
+# Each conversation is one topic question followed by --followups short follow-ups ("give an
+# example", "how is it prevented?", ...), as students ask them. The same conversations are
+# asked without a session id (every question runs topic extraction and a course-wide search),
+# then with one. Gemini is the local fake server, the collection is synthetic (offline_bench),
+# optionally with centroids for two-stage retrieval (--centroids), and queries are encoded by a
+# deterministic stand-in for the sentence-transformers model, so the numbers are about cost, not
+# answer quality. Sessions are kept in-process (SESSION_CACHE_BACKEND=memory).
+#
+# Usage (from the backend directory):
+#   python benchmarks/session_bench.py --collection-size 20000 --conversations 40 --followups 3
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+backend_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_root)
+sys.path.insert(0, os.path.dirname(__file__))
+
+os.environ.setdefault("SESSION_CACHE_BACKEND", "memory")
+
+from loadtest import percentile
+from synthetic_corpus import generate_corpus, make_questions
+from offline_bench import build_collection
+from precompute_bench import StandInEncoder, start_fake_llm
+
+FOLLOWUPS = ["Give an example.", "How is it prevented?", "Why is this important?", "Explain it in more detail.",
+             "What are its drawbacks?", "Can you elaborate on that?"]
+
+
+def server_timing(response):
+    """
+    Returns {stage: ms} from a response's Server-Timing header.
+    """
+    stages = {}
+    for entry in response.headers.get("Server-Timing", "").split(","):
+        name, _, duration = entry.strip().partition(";dur=")
+        if duration:
+            stages[name] = stages.get(name, 0.0) + float(duration)
+    return stages
+
+
+def ask(client, conversations, llm_config, with_session):
+    calls_before = llm_config.requests
+    latencies = {"topic": [], "followup": []}
+    stages = {}
+    for n, conversation in enumerate(conversations):
+        for turn, question in enumerate(conversation):
+            body = {"question": question, "courseName": "cloud-computing"}
+            if with_session:
+                body["sessionId"] = f"bench-{n}"
+            started = time.perf_counter()
+            response = client.post("/api/answer", json=body)
+            latencies["topic" if turn == 0 else "followup"].append((time.perf_counter() - started) * 1000)
+            if turn:
+                for stage, ms in server_timing(response).items():
+                    stages.setdefault(stage, []).append(ms)
+    result = {"llm_calls": llm_config.requests - calls_before}
+    for kind, values in latencies.items():
+        result[f"{kind}_p50_ms"] = round(percentile(values, 50), 2)
+        result[f"{kind}_p95_ms"] = round(percentile(values, 95), 2)
+    result["followup_stage_mean_ms"] = {stage: round(sum(v) / len(v), 3) for stage, v in stages.items()
+                                        if stage in ("topics", "encode", "query")}
+    return result
+
+
+def run(args):
+    work_dir = tempfile.mkdtemp(prefix="session_bench_")
+    llm_server, llm_config = start_fake_llm(args)
+    try:
+        from Embedding.chunking import create_chunks
+        from Retrival import main, hierarchical, session_cache
+        import app
+
+        corpus = generate_corpus(os.path.join(work_dir, "corpus"), documents=args.documents, pages=20)
+        chunks = [chunk for path in corpus for chunk in create_chunks(path)]
+        main._client, _ = build_collection(os.path.join(work_dir, "db"), "aws", chunks, args.collection_size, 5000)
+        main._embedding_model = StandInEncoder()
+        if args.centroids:
+            hierarchical.build_centroids(main._client, "aws")
+
+        rng = random.Random(args.seed)
+        conversations = [[topic] + rng.sample(FOLLOWUPS, args.followups)
+                         for topic in make_questions(args.conversations, seed=args.seed)]
+        client = app.app.test_client()
+        # Warm the per-source sub-indexes so both runs start from the same caches.
+        ask(client, conversations[:2], llm_config, with_session=False)
+
+        without = ask(client, conversations, llm_config, with_session=False)
+        with_sessions = ask(client, conversations, llm_config, with_session=True)
+        record = session_cache.get_store().get("bench-0")
+        return {"collection_size": args.collection_size, "centroids": args.centroids,
+                "conversations": args.conversations, "followups": args.followups,
+                "llm_latency_ms": args.llm_latency_ms, "without_session": without, "with_session": with_sessions,
+                "session_record_bytes": len(json.dumps(record))}
+    finally:
+        llm_server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Follow-up questions with and without a session.")
+    parser.add_argument("--collection-size", type=int, default=20000)
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--centroids", action="store_true", help="Build centroids for two-stage retrieval.")
+    parser.add_argument("--conversations", type=int, default=40)
+    parser.add_argument("--followups", type=int, default=3)
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", default=None)
+    args = parser.parse_args()
+
+    result = run(args)
+    print(json.dumps(result, indent=2))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(result, f, indent=2)
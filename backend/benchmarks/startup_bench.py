@@ -0,0 +1,170 @@
+# Measures the cold-start cost of the backend: how long importing each module takes in a
+# fresh interpreter, and which dependencies that time is spent in.
+#
+# Every target is imported in its own subprocess with `python -X importtime`, so results are
+# not skewed by modules already cached by a previous import.
+#
+# Usage (from the backend directory):
+#   python benchmarks/startup_bench.py
+#   python benchmarks/startup_bench.py --budget-ms 1500 --json startup.json
+#   python benchmarks/startup_bench.py --warmup   # also time Retrival.main.warmup()
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+backend_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Modules imported by the web app, followed by the heavy third-party dependencies we expect
+# to stay out of the import path of app.py.
+DEFAULT_TARGETS = [
+    "app",
+    "Retrival.main",
+    "utils.api_key_manager",
+    "Scrapper.fetch_papers",
+    "Scrapper.qp_analyser",
+]
+HEAVY_DEPENDENCIES = [
+    "spacy",
+    "chromadb",
+    "sentence_transformers",
+    "google.auth",
+    "redis",
+]
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure_import(module_name: str, python: str = sys.executable):
+    """
+    Imports a module in a fresh interpreter and parses the -X importtime report.
+
+    Returns:
+        dict: wall time, total cumulative import time, per-module self/cumulative times
+              and whether the import succeeded.
+    """
+    code = f"import {module_name}"
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [python, "-X", "importtime", "-c", code],
+        cwd=backend_root,
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    modules = {}
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        modules[name] = {
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+            "depth": len(indent) // 2,
+        }
+
+    target = modules.get(module_name, {})
+    error = None
+    if proc.returncode != 0:
+        error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit code {proc.returncode}"
+
+    return {
+        "module": module_name,
+        "ok": proc.returncode == 0,
+        "error": error,
+        "wall_ms": round(wall_ms, 1),
+        "import_ms": target.get("cumulative_ms"),
+        "heavy_dependencies_loaded": sorted(dep for dep in HEAVY_DEPENDENCIES if dep in modules),
+        "modules": modules,
+    }
+
+
+def top_contributors(result: dict, top: int):
+    """
+    Returns the top-level packages (depth 0) of an import, ordered by cumulative time.
+    """
+    roots = [(name, info["cumulative_ms"]) for name, info in result["modules"].items() if info["depth"] == 0]
+    return sorted(roots, key=lambda item: item[1], reverse=True)[:top]
+
+
+def measure_warmup(python: str = sys.executable):
+    """
+    Times Retrival.main.warmup() (Chroma client, embedding model, API key scheduler) in a fresh interpreter.
+    """
+    code = (
+        "import time, json\n"
+        "t0 = time.perf_counter()\n"
+        "import Retrival.main as m\n"
+        "t1 = time.perf_counter()\n"
+        "steps = {}\n"
+        "from utils import api_key_manager\n"
+        "for name, fn in (('get_client', m.get_client), ('get_embedding_model', m.get_embedding_model),\n"
+        "                 ('get_scheduler', api_key_manager.get_scheduler)):\n"
+        "    s = time.perf_counter()\n"
+        "    try:\n"
+        "        fn()\n"
+        "        steps[name] = round((time.perf_counter() - s) * 1000, 1)\n"
+        "    except Exception as e:\n"
+        "        steps[name] = f'error: {e}'\n"
+        "print(json.dumps({'import_ms': round((t1 - t0) * 1000, 1), 'steps_ms': steps}))\n"
+    )
+    proc = subprocess.run([python, "-c", code], cwd=backend_root, capture_output=True, text=True)
+    try:
+        return json.loads(proc.stdout.strip().splitlines()[-1])
+    except (IndexError, json.JSONDecodeError):
+        return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "no output"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report per-module import time for the backend.")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_TARGETS, help="Modules to import (default: the app's modules).")
+    parser.add_argument("--top", type=int, default=10, help="How many top-level contributors to show per module.")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Fail (exit 1) if importing 'app' exceeds this many ms.")
+    parser.add_argument("--warmup", action="store_true", help="Also time the lazy components built by warmup().")
+    parser.add_argument("--json", dest="json_path", default=None, help="Write machine-readable results to this file.")
+    args = parser.parse_args()
+
+    results = []
+    for module_name in args.modules:
+        result = measure_import(module_name)
+        results.append(result)
+        status = "ok" if result["ok"] else f"FAILED ({result['error']})"
+        print(f"\n{module_name}: wall {result['wall_ms']:.1f} ms, import {result['import_ms']} ms [{status}]")
+        if result["heavy_dependencies_loaded"]:
+            print(f"  heavy dependencies loaded: {', '.join(result['heavy_dependencies_loaded'])}")
+        for name, cumulative_ms in top_contributors(result, args.top):
+            print(f"  {cumulative_ms:10.1f} ms  {name}")
+
+    report = {
+        "python": sys.version.split()[0],
+        "results": [{k: v for k, v in r.items() if k != "modules"} for r in results],
+    }
+
+    if args.warmup:
+        report["warmup"] = measure_warmup()
+        print(f"\nwarmup: {report['warmup']}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.json_path}")
+
+    if args.budget_ms is not None:
+        app_result = next((r for r in results if r["module"] == "app"), None)
+        if app_result is None or app_result["import_ms"] is None:
+            print("\nBudget check skipped: 'app' was not imported successfully.")
+            sys.exit(1)
+        if app_result["import_ms"] > args.budget_ms:
+            print(f"\nCold-start budget exceeded: {app_result['import_ms']:.1f} ms > {args.budget_ms:.1f} ms")
+            sys.exit(1)
+        print(f"\nCold-start budget met: {app_result['import_ms']:.1f} ms <= {args.budget_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
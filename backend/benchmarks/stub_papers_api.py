@@ -0,0 +1,116 @@
+# A local stand-in for the CodeChef VIT papers API (GET /api/papers?subject=...) with tunable latency.
+#
+# Point the backend at it with PAPERS_API_URL=http://127.0.0.1:<port>/api/papers.
+#
+# Usage (from the backend directory):
+#   python benchmarks/stub_papers_api.py --port 8091 --papers 300 --latency-ms 800
+
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+EXAMS = ["CAT1", "CAT2", "FAT"]
+SLOTS = ["A1", "A2", "B1", "B2", "C1", "C2", "D1", "D2"]
+SEMESTERS = ["Fall Semester", "Winter Semester"]
+
+
+def make_papers(subject, count, seed=0):
+    """
+    Builds a deterministic list of papers for a subject in the upstream API's format.
+    """
+    rng = random.Random(f"{subject}-{seed}")
+    papers = []
+    for i in range(count):
+        paper_id = f"{zlib.crc32(subject.encode()) % 10**8:08d}{i:06d}"
+        papers.append({
+            "_id": paper_id,
+            "subject": subject,
+            "exam": rng.choice(EXAMS),
+            "year": str(rng.choice(range(2019, 2026))),
+            "slot": rng.choice(SLOTS),
+            "semester": rng.choice(SEMESTERS),
+            "file_url": f"https://storage.googleapis.com/papers-codechefvit-prod/papers/{paper_id}.pdf",
+        })
+    return papers
+
+
+class StubPapersConfig:
+    def __init__(self, papers_per_subject=200, latency_ms=300, fail_rate=0.0, seed=0):
+        self.papers_per_subject = papers_per_subject
+        self.latency_ms = latency_ms
+        self.fail_rate = fail_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.lock = threading.Lock()
+
+
+def make_handler(config):
+    class StubPapersHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != "/api/papers":
+                self._send(404, {"error": "Not found"})
+                return
+            with config.lock:
+                config.requests += 1
+                fail = config.fail_rate and config.random.random() < config.fail_rate
+            time.sleep(config.latency_ms / 1000)
+            if fail:
+                self._send(503, {"error": "Upstream unavailable (stub)"})
+                return
+            subject = parse_qs(url.query).get("subject", [""])[0]
+            self._send(200, {"papers": make_papers(subject, config.papers_per_subject)})
+
+    return StubPapersHandler
+
+
+def start_stub_papers_api(port=0, **config_kwargs):
+    """
+    Starts the stub API on a background thread.
+
+    Returns:
+        tuple: (server, config, papers_api_url). Call server.shutdown() to stop it.
+    """
+    config = StubPapersConfig(**config_kwargs)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, config, f"http://127.0.0.1:{server.server_address[1]}/api/papers"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a stub CodeChef papers API.")
+    parser.add_argument("--port", type=int, default=8091)
+    parser.add_argument("--papers", type=int, default=200, help="Papers returned per subject.")
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered with 503.")
+    args = parser.parse_args()
+
+    server, _, url = start_stub_papers_api(args.port, papers_per_subject=args.papers,
+                                           latency_ms=args.latency_ms, fail_rate=args.fail_rate)
+    print(f"Stub papers API listening on {url} (set PAPERS_API_URL={url})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,173 @@
+# Deterministic synthetic course material for the offline benchmarks.
+#
+# Writes extracted-text files in the same format the preprocessing scripts produce
+# ("<name>.pdf.txt" with "pageN complete" markers, "<name>.pptx.txt" with "slideN complete"),
+# so they can be fed straight to Embedding.chunking.create_chunks. It can also write small
+# PDFs (text plus one image per page) for the extraction step, and questions to ask.
+# With duplicate_share > 0, that share of pages is drawn from a small pool of repeated slides
+# (title, agenda, reused figures), copied verbatim or with one word changed, as in real decks.
+#
+# Usage (from the backend directory):
+#   python benchmarks/synthetic_corpus.py /tmp/corpus --documents 20 --pages 30
+
+import argparse
+import os
+import random
+
+TOPICS = {
+    "cloud": ["virtual machine", "availability zone", "load balancer", "object storage", "autoscaling group",
+              "identity and access management", "virtual private cloud", "serverless function", "content delivery network",
+              "elastic block store", "security group", "managed database", "message queue", "container registry"],
+    "os": ["process scheduling", "page table", "virtual memory", "context switch", "semaphore", "deadlock avoidance",
+           "file system", "interrupt handler", "system call", "thread pool", "round robin", "working set", "mutex"],
+    "db": ["relational algebra", "normal form", "functional dependency", "transaction isolation", "write-ahead log",
+           "b+ tree index", "query optimizer", "two-phase locking", "join algorithm", "entity relationship model",
+           "primary key", "concurrency control", "recovery manager"],
+}
+
+FILLER = ("the of and to in is a that for it as with are on this be by an which can from or at these "
+          "when each used such more than other into only also its between both within how where").split()
+VERBS = ["stores", "schedules", "maps", "protects", "replicates", "allocates", "balances", "caches", "isolates",
+         "recovers", "indexes", "serialises", "distributes", "monitors"]
+
+
+def _sentence(rng, terms):
+    words = []
+    for _ in range(rng.randint(8, 18)):
+        roll = rng.random()
+        if roll < 0.18:
+            words.append(rng.choice(terms))
+        elif roll < 0.28:
+            words.append(rng.choice(VERBS))
+        else:
+            words.append(rng.choice(FILLER))
+    text = " ".join(words)
+    return text[0].upper() + text[1:] + "."
+
+
+def make_page(rng, terms, words_per_page=180):
+    """
+    Returns one page of lecture-note-like text: a heading followed by short paragraphs.
+    """
+    lines = [rng.choice(terms).title()]
+    words = 0
+    while words < words_per_page:
+        paragraph = " ".join(_sentence(rng, terms) for _ in range(rng.randint(2, 4)))
+        words += len(paragraph.split())
+        lines.append(paragraph)
+    return "\n".join(lines)
+
+
+def make_repeated_pages(rng, terms, count=8, words_per_page=180):
+    """
+    Returns a pool of slides that recur across documents (title, agenda and figure slides).
+    """
+    pages = [f"{topic.title()}\nCourse overview\nFaculty of computing" for topic in terms[:2]]
+    pages.append("Agenda\n" + "\n".join(term.title() for term in terms[:6]))
+    while len(pages) < count:
+        pages.append(make_page(rng, terms, words_per_page))
+    return pages
+
+
+def _perturb(rng, page):
+    words = page.split(" ")
+    words[rng.randrange(len(words))] = rng.choice(FILLER)
+    return " ".join(words)
+
+
+def make_document_text(rng, terms, pages, kind="pdf", words_per_page=180, repeated=None, duplicate_share=0.0):
+    """
+    Returns the text of one document with a "pageN complete" / "slideN complete" marker after each page.
+    """
+    marker = "page" if kind == "pdf" else "slide"
+    parts = []
+    for n in range(1, pages + 1):
+        if repeated and rng.random() < duplicate_share:
+            page = rng.choice(repeated)
+            parts.append(_perturb(rng, page) if rng.random() < 0.5 else page)
+        else:
+            parts.append(make_page(rng, terms, words_per_page))
+        parts.append(f"\n{marker}{n} complete\n")
+    return "\n".join(parts)
+
+
+def generate_corpus(out_dir, documents=10, pages=20, words_per_page=180, topic="cloud", pptx_share=0.3, seed=0,
+                    duplicate_share=0.0):
+    """
+    Writes synthetic extracted-text documents into out_dir.
+
+    Returns:
+        list: Paths of the written .pdf.txt / .pptx.txt files.
+    """
+    rng = random.Random(seed)
+    terms = TOPICS[topic]
+    repeated = make_repeated_pages(random.Random(seed + 1), terms, words_per_page=words_per_page) \
+        if duplicate_share else None
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for i in range(documents):
+        kind = "pptx" if rng.random() < pptx_share else "pdf"
+        path = os.path.join(out_dir, f"synthetic_{topic}_{i:04d}.{kind}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(make_document_text(rng, terms, pages, kind, words_per_page, repeated, duplicate_share))
+        paths.append(path)
+    return paths
+
+
+def make_pdf(pages=10, words_per_page=180, topic="cloud", with_images=True, seed=0):
+    """
+    Returns a synthetic PDF (PyMuPDF) with a text block and, optionally, a small image per page.
+    """
+    import pymupdf
+
+    rng = random.Random(seed)
+    terms = TOPICS[topic]
+    with pymupdf.open() as doc:
+        for _ in range(pages):
+            page = doc.new_page()
+            page.insert_textbox(pymupdf.Rect(50, 50, 545, 600), make_page(rng, terms, words_per_page), fontsize=9)
+            if with_images:
+                pixmap = pymupdf.Pixmap(pymupdf.csRGB, pymupdf.IRect(0, 0, 64, 48), False)
+                pixmap.set_rect(pixmap.irect, (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+                page.insert_image(pymupdf.Rect(50, 620, 178, 716), pixmap=pixmap)
+        return doc.tobytes()
+
+
+def write_pdf(path, pages=10, words_per_page=180, topic="cloud", with_images=True, seed=0):
+    """
+    Writes make_pdf() output to path.
+    """
+    with open(path, "wb") as f:
+        f.write(make_pdf(pages, words_per_page, topic, with_images, seed))
+    return path
+
+
+def make_questions(count, topic="cloud", seed=0):
+    """
+    Returns distinct questions about the corpus topic, phrased like student questions.
+    """
+    rng = random.Random(f"questions-{seed}")
+    terms = TOPICS[topic]
+    templates = ["What is a {a}?", "Explain how a {a} works with a {b}.", "Compare {a} and {b}.",
+                 "Why does a {a} need a {b}?", "Give an example of {a} in practice ({n})."]
+    questions = []
+    for n in range(count):
+        a, b = rng.sample(terms, 2)
+        questions.append(rng.choice(templates).format(a=a, b=b, n=n))
+    return questions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic extracted-text corpus.")
+    parser.add_argument("out_dir")
+    parser.add_argument("--documents", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--words-per-page", type=int, default=180)
+    parser.add_argument("--topic", choices=sorted(TOPICS), default="cloud")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--duplicate-share", type=float, default=0.0)
+    args = parser.parse_args()
+
+    written = generate_corpus(args.out_dir, args.documents, args.pages, args.words_per_page, args.topic, seed=args.seed,
+                              duplicate_share=args.duplicate_share)
+    print(f"Wrote {len(written)} document(s) to {args.out_dir}")
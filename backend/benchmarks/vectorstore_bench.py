@@ -0,0 +1,133 @@
+# Compares the two vector-store modes (Database/vectorstore.py) as the number of worker
+# processes grows: embedded, where every worker opens the Chroma files and loads its own copy
+# of the index, and server, where workers query one shared index server over HTTP.
+#
+# Builds a synthetic collection, then for each mode and worker count starts that many worker
+# processes that run nearest-neighbour queries for --duration seconds. Reports total QPS, query
+# latency percentiles and the summed RSS of the workers (plus the index server in server mode)
+# after the index is loaded.
+#
+# Usage (from the backend directory):
+#   python benchmarks/vectorstore_bench.py --records 20000 --workers 1,4,8 --duration 10
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+backend_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, backend_root)
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+
+from loadtest import free_port, percentile, process_tree, rss_mb
+from Database.vectorstore import MODES, open_client, start_server
+
+COLLECTION = "bench"
+
+
+def build_store(db_path, records, dim, batch_size=5000):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((records, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    collection = open_client("embedded", db_path=db_path).get_or_create_collection(name=COLLECTION)
+    started = time.perf_counter()
+    for start in range(0, records, batch_size):
+        end = min(start + batch_size, records)
+        collection.add(ids=[f"chunk_{i}" for i in range(start, end)], embeddings=vectors[start:end],
+                       documents=[f"synthetic chunk {i}" for i in range(start, end)],
+                       metadatas=[{"source": f"doc_{i % 50}.pdf", "page": i % 40, "keywords": ""}
+                                  for i in range(start, end)])
+    return time.perf_counter() - started
+
+
+def worker(mode, db_path, url, dim, n_results, duration, seed, ready, go, results):
+    collection = open_client(mode, db_path=db_path, url=url).get_collection(name=COLLECTION)
+    rng = np.random.default_rng(seed)
+    collection.query(query_embeddings=rng.standard_normal((1, dim)).astype(np.float32), n_results=n_results)
+    ready.put(os.getpid())
+    go.wait()
+
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        query = rng.standard_normal((1, dim)).astype(np.float32)
+        started = time.perf_counter()
+        collection.query(query_embeddings=query, n_results=n_results)
+        latencies.append((time.perf_counter() - started) * 1000)
+    results.put({"pid": os.getpid(), "rss_mb": rss_mb(os.getpid()), "latencies_ms": latencies})
+
+
+def run_case(args, mode, workers, db_path, url, server_pid):
+    ctx = multiprocessing.get_context("spawn")
+    ready, results, go = ctx.Queue(), ctx.Queue(), ctx.Event()
+    processes = [ctx.Process(target=worker, args=(mode, db_path, url, args.dim, args.n_results,
+                                                  args.duration, i, ready, go, results))
+                 for i in range(workers)]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.get(timeout=300)
+    go.set()
+    reports = [results.get(timeout=args.duration + 120) for _ in processes]
+    for process in processes:
+        process.join()
+
+    latencies = [ms for report in reports for ms in report["latencies_ms"]]
+    worker_rss = sum(report["rss_mb"] or 0 for report in reports)
+    server_rss = sum(rss_mb(pid) or 0 for pid in process_tree(server_pid)) if server_pid else 0
+    return {
+        "workers": workers,
+        "queries": len(latencies),
+        "qps": round(len(latencies) / args.duration, 1),
+        "latency_ms": {f"p{p}": round(percentile(latencies, p), 2) for p in (50, 95, 99)},
+        "worker_rss_mb": round(worker_rss, 1),
+        "server_rss_mb": round(server_rss, 1),
+        "total_rss_mb": round(worker_rss + server_rss, 1),
+    }
+
+
+def run(args):
+    work_dir = tempfile.mkdtemp(prefix="vectorstore_bench_")
+    db_path = os.path.join(work_dir, "db")
+    result = {"records": args.records, "dim": args.dim, "duration_s": args.duration,
+              "build_seconds": round(build_store(db_path, args.records, args.dim), 2)}
+    try:
+        for mode in args.modes:
+            server, url = None, None
+            if mode == "server":
+                url = f"http://127.0.0.1:{free_port()}"
+                server = start_server(db_path, url)
+            try:
+                result[mode] = [run_case(args, mode, workers, db_path, url, server.pid if server else None)
+                                for workers in args.workers]
+            finally:
+                if server is not None:
+                    server.terminate()
+                    server.wait(timeout=30)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="QPS and memory of embedded vs shared vector store.")
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--n-results", type=int, default=5)
+    parser.add_argument("--workers", type=lambda s: [int(n) for n in s.split(",")], default=[1, 4, 8])
+    parser.add_argument("--modes", type=lambda s: s.split(","), default=list(MODES))
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--json", dest="json_path", default=None)
+    args = parser.parse_args()
+
+    result = run(args)
+    print(json.dumps(result, indent=2))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,46 @@
+# Gunicorn configuration, picked up automatically when gunicorn is started from this directory.
+# Command line flags (e.g. --bind, --timeout in the Dockerfiles) still take precedence.
+
+import os
+
+# Serve requests on several threads per worker so concurrent identical questions can be
+# coalesced in-process (see Retrival.main.answer_question). Most of a request's time is
+# spent waiting on Gemini, so threads are cheap here.
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+
+
+def post_worker_init(worker):
+    """
+    Startup hook: when PRELOAD_MODELS=1, load the embedding model, the Chroma client and
+    the API key scheduler before the worker accepts requests instead of on the first request.
+    Leave it unset to keep worker boot fast and pay the cost lazily.
+    """
+    if os.getenv("PRELOAD_MODELS", "0") == "1":
+        from Retrival.main import warmup
+        worker.log.info("Preloading models for worker %s", worker.pid)
+        warmup()
+
+
+_index_server = None
+
+
+def on_starting(server):
+    """
+    Master startup hook: with VECTOR_STORE_MODE=server and VECTOR_STORE_AUTOSTART=1, start the
+    shared index server once, before any worker is forked, so every worker queries the same
+    process instead of loading its own copy of the Chroma index.
+    """
+    global _index_server
+    if os.getenv("VECTOR_STORE_MODE", "embedded") == "server" and os.getenv("VECTOR_STORE_AUTOSTART", "0") == "1":
+        from Database.vectorstore import start_server, VECTOR_STORE_URL
+        server.log.info("Starting index server on %s", VECTOR_STORE_URL)
+        _index_server = start_server()
+
+
+def on_exit(server):
+    """
+    Master shutdown hook: stop the index server started by on_starting.
+    """
+    if _index_server is not None:
+        _index_server.terminate()
+        _index_server.wait(timeout=10)
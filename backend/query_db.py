@@ -1,9 +1,11 @@
-import chromadb
 from sentence_transformers import SentenceTransformer
 import os
 import sys
 import argparse
 
+from Database.vectorstore import open_client, VECTOR_STORE_MODE
+from Database import aliases
+
 def query_database(collection_name: str, query_text: str, n_results: int = 5):
     """
     Connects to the ChromaDB, queries a collection, and prints the results.
@@ -20,24 +22,24 @@ def query_database(collection_name: str, query_text: str, n_results: int = 5):
     print("Connecting to vector database...")
     db_path = os.path.abspath(os.path.join(os.path.dirname(__file__), 'Database', 'db'))
     
-    if not os.path.exists(db_path):
+    if VECTOR_STORE_MODE == "embedded" and not os.path.exists(db_path):
         print(f"Error: Database path not found at {db_path}")
         print("Please ensure you have run the ingestion script to create the database.")
         return
 
     try:
-        client = chromadb.PersistentClient(path=db_path)
+        client = open_client(db_path=db_path)
     except Exception as e:
         print(f"Error connecting to ChromaDB: {e}")
         return
 
     try:
-        collection = client.get_collection(name=collection_name)
+        collection = client.get_collection(name=aliases.resolve(client, collection_name))
     except Exception as e:
         print(f"Error: Could not get collection '{collection_name}'. {e}")
         collections = client.list_collections()
         if collections:
-            print(f"Available collections: {[c.name for c in collections]}")
+            print(f"Available collections: {[c if isinstance(c, str) else c.name for c in collections]}")
         else:
             print("No collections found in the database.")
         return
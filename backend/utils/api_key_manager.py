@@ -1,52 +1,302 @@
 import os
-import redis
+import time
+import logging
+import threading
 from dotenv import load_dotenv
 
 # Load environment variables from .env
 load_dotenv()
 
-# Read API keys from .env (comma-separated)
-API_KEYS = os.getenv("API_KEYS")
-if not API_KEYS:
-    raise Exception("API_KEYS not found in .env file. Please add API_KEYS=key1,key2,key3,key4")
-api_keys_list = [k.strip() for k in API_KEYS.split(",") if k.strip()]
+# API_KEYS holds the *names* of the environment variables that contain the Gemini keys
+# (comma-separated), e.g. API_KEYS=GEMINI_API_KEY_1,GEMINI_API_KEY_2. Only the names are
+# ever stored in Redis.
 
 # Redis connection
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-r = redis.Redis.from_url(REDIS_URL)
-REDIS_LIST_NAME = "api_keys"
+REDIS_SCHEDULE_NAME = "api_keys:schedule"   # sorted set: key name -> time it is next usable
+REDIS_STATS_NAME = "api_keys:stats"         # hash: "<key>:requests" / "<key>:rate_limited" counters
+REDIS_RATE_PREFIX = "api_keys:rate:"        # hash per minute: key name -> requests in that minute
+
+# Per-key quota. Each key is handed out at most API_KEY_RPM times per minute, so the aggregate
+# request rate scales with the number of keys. A key that gets a 429 is parked for the cooldown.
+API_KEY_RPM = float(os.getenv("API_KEY_RPM", "10"))
+API_KEY_COOLDOWN_SECONDS = float(os.getenv("API_KEY_COOLDOWN_SECONDS", "60"))
+API_KEY_WAIT_SECONDS = float(os.getenv("API_KEY_WAIT_SECONDS", "30"))
+
+
+class NoApiKeyAvailable(Exception):
+    """Raised when every API key is rate limited or cooling down for longer than the caller will wait."""
+
+
+# Picks the key that has been usable for the longest, atomically, in one round trip.
+# Scores in the schedule are the server time at which each key may next be used.
+# ARGV[2..] are key names to skip (e.g. the key a hedged request is duplicating).
+# Returns {key, 0} on success or {false, seconds_until_next_key} when all keys are busy.
+ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local excluded = {}
+for i = 2, #ARGV do
+    excluded[ARGV[i]] = true
+end
+local candidates = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now, 'LIMIT', 0, #ARGV)
+local picked = {}
+for _, name in ipairs(candidates) do
+    if not excluded[name] then
+        picked = {name}
+        break
+    end
+end
+if #picked == 0 then
+    local nxt = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    if #nxt == 0 then
+        return {false, '-1'}
+    end
+    return {false, tostring(tonumber(nxt[2]) - now)}
+end
+local key = picked[1]
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[1]), key)
+redis.call('HINCRBY', KEYS[2], key .. ':requests', 1)
+redis.call('HINCRBY', KEYS[3], key, 1)
+redis.call('EXPIRE', KEYS[3], 120)
+return {key, '0'}
+"""
+
+# Parks a key until now + cooldown (never shortening an existing cooldown) and counts the 429.
+COOLDOWN_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local current = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if not current then
+    return 0
+end
+local until_ts = now + tonumber(ARGV[2])
+if tonumber(current) < until_ts then
+    redis.call('ZADD', KEYS[1], until_ts, ARGV[1])
+end
+redis.call('HINCRBY', KEYS[2], ARGV[1] .. ':rate_limited', 1)
+return 1
+"""
+
+
+def load_api_keys():
+    """
+    Reads the API key names from the API_KEYS environment variable (comma-separated).
+    """
+    API_KEYS = os.getenv("API_KEYS")
+    if not API_KEYS:
+        raise Exception("API_KEYS not found in .env file. Please add API_KEYS=key1,key2,key3,key4")
+    return [k.strip() for k in API_KEYS.split(",") if k.strip()]
+
+
+def resolve_api_key(key_name):
+    """
+    Returns the secret stored in the environment variable named by key_name.
+    """
+    value = os.getenv(key_name)
+    if not value:
+        raise Exception(f"{key_name} environment variable not set.")
+    return value
+
+
+class RedisKeyScheduler:
+    """
+    Key scheduler shared by every worker through Redis. Each acquire/cooldown is one Lua script call.
+    """
+
+    def __init__(self, client, key_names, rpm=API_KEY_RPM, cooldown=API_KEY_COOLDOWN_SECONDS):
+        self.r = client
+        self.min_interval = 60.0 / rpm
+        self.cooldown = cooldown
+        self._acquire = client.register_script(ACQUIRE_SCRIPT)
+        self._cooldown = client.register_script(COOLDOWN_SCRIPT)
+        # NX keeps the schedule of keys other workers are already using.
+        self.r.zadd(REDIS_SCHEDULE_NAME, {name: 0 for name in key_names}, nx=True)
+
+    def try_acquire(self, exclude=()):
+        """
+        Returns (key_name, 0) or (None, seconds until a key frees up).
+        """
+        rate_name = f"{REDIS_RATE_PREFIX}{int(time.time() // 60)}"
+        key, wait = self._acquire(keys=[REDIS_SCHEDULE_NAME, REDIS_STATS_NAME, rate_name], args=[self.min_interval, *exclude])
+        if key:
+            return (key.decode() if isinstance(key, bytes) else key), 0.0
+        return None, float(wait)
+
+    def report_rate_limited(self, key_name, retry_after=None):
+        self._cooldown(keys=[REDIS_SCHEDULE_NAME, REDIS_STATS_NAME], args=[key_name, retry_after or self.cooldown])
+
+    def remove(self, key_name):
+        self.r.zrem(REDIS_SCHEDULE_NAME, key_name)
+
+    def stats(self):
+        now = time.time()
+        schedule = self.r.zrange(REDIS_SCHEDULE_NAME, 0, -1, withscores=True)
+        counters = self.r.hgetall(REDIS_STATS_NAME)
+        per_minute = self.r.hgetall(f"{REDIS_RATE_PREFIX}{int(now // 60)}")
+        decode = lambda v: v.decode() if isinstance(v, bytes) else v
+        counters = {decode(k): int(v) for k, v in counters.items()}
+        per_minute = {decode(k): int(v) for k, v in per_minute.items()}
+        result = {}
+        for name, next_free in schedule:
+            name = decode(name)
+            result[name] = {
+                "requests": counters.get(f"{name}:requests", 0),
+                "rate_limited": counters.get(f"{name}:rate_limited", 0),
+                "requests_this_minute": per_minute.get(name, 0),
+                "cooldown_remaining": max(0.0, round(next_free - now, 2)),
+            }
+        return result
+
+
+class LocalKeyScheduler:
+    """
+    In-process scheduler with the same semantics as RedisKeyScheduler, used when Redis is absent.
+    Rotation and cooldowns are then per worker rather than shared.
+    """
+
+    def __init__(self, key_names, rpm=API_KEY_RPM, cooldown=API_KEY_COOLDOWN_SECONDS):
+        self.min_interval = 60.0 / rpm
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._next_free = {name: 0.0 for name in key_names}
+        self._requests = {name: 0 for name in key_names}
+        self._rate_limited = {name: 0 for name in key_names}
+        self._minute_counts = {}
+        self._minute = None
+
+    def try_acquire(self, exclude=()):
+        with self._lock:
+            candidates = [name for name in self._next_free if name not in exclude]
+            if not candidates:
+                return None, -1.0
+            now = time.time()
+            name = min(candidates, key=self._next_free.get)
+            if self._next_free[name] > now:
+                return None, self._next_free[name] - now
+            self._next_free[name] = now + self.min_interval
+            self._requests[name] += 1
+            minute = int(now // 60)
+            if minute != self._minute:
+                self._minute, self._minute_counts = minute, {}
+            self._minute_counts[name] = self._minute_counts.get(name, 0) + 1
+            return name, 0.0
+
+    def report_rate_limited(self, key_name, retry_after=None):
+        with self._lock:
+            if key_name not in self._next_free:
+                return
+            self._next_free[key_name] = max(self._next_free[key_name], time.time() + (retry_after or self.cooldown))
+            self._rate_limited[key_name] += 1
+
+    def remove(self, key_name):
+        with self._lock:
+            self._next_free.pop(key_name, None)
+
+    def stats(self):
+        with self._lock:
+            now = time.time()
+            current = self._minute_counts if self._minute == int(now // 60) else {}
+            return {
+                name: {
+                    "requests": self._requests.get(name, 0),
+                    "rate_limited": self._rate_limited.get(name, 0),
+                    "requests_this_minute": current.get(name, 0),
+                    "cooldown_remaining": max(0.0, round(next_free - now, 2)),
+                }
+                for name, next_free in self._next_free.items()
+            }
+
+
+# The scheduler is created on first use so that importing this module (and therefore the
+# Flask app) never touches the network.
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """
+    Returns the process-wide key scheduler: Redis-backed when Redis is reachable, in-process otherwise.
+    """
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                key_names = load_api_keys()
+                try:
+                    import redis
+                    client = redis.Redis.from_url(REDIS_URL, socket_connect_timeout=1, socket_timeout=2)
+                    client.ping()
+                    _scheduler = RedisKeyScheduler(client, key_names)
+                except Exception as e:
+                    logging.warning(f"Redis unavailable ({e}); using the in-process API key scheduler.")
+                    _scheduler = LocalKeyScheduler(key_names)
+    return _scheduler
+
+
+def acquire_api_key(max_wait=API_KEY_WAIT_SECONDS):
+    """
+    Reserves the least recently used API key that is within its rate limit and not cooling down.
+    Waits up to max_wait seconds for one to free up.
+
+    Returns:
+        str: the name of the environment variable holding the key (see resolve_api_key).
+    """
+    scheduler = get_scheduler()
+    deadline = time.monotonic() + max_wait
+    while True:
+        key_name, wait = scheduler.try_acquire()
+        if key_name is not None:
+            return key_name
+        if wait < 0:
+            raise NoApiKeyAvailable("No API keys configured.")
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise NoApiKeyAvailable(f"All API keys are rate limited; next one is free in {wait:.1f}s.")
+        time.sleep(min(wait, remaining))
+
+
+def try_acquire_api_key(exclude=()):
+    """
+    Reserves a key, other than those in exclude, only if one is free right now.
+
+    Returns:
+        str or None: the key name, or None when every key is busy.
+    """
+    key_name, _ = get_scheduler().try_acquire(exclude)
+    return key_name
+
+
+def report_rate_limited(key_name, retry_after=None):
+    """
+    Puts a key on cooldown after a 429 / quota error.
+    """
+    get_scheduler().report_rate_limited(key_name, retry_after)
+
+
+def get_key_stats():
+    """
+    Returns per-key request counts, requests in the current minute, 429 counts and remaining cooldown.
+    """
+    return get_scheduler().stats()
 
-# Initialize the Redis list if not already present
-if r.llen(REDIS_LIST_NAME) == 0:
-    r.delete(REDIS_LIST_NAME)
-    r.rpush(REDIS_LIST_NAME, *api_keys_list)
 
 def get_next_api_key():
     """
-    Pops the least recently used API key from the front, pushes it to the end, and returns it.
+    Returns the next API key name to use. Kept for existing callers; prefer acquire_api_key().
     """
-    key = r.lpop(REDIS_LIST_NAME)
-    if key is not None:
-        r.rpush(REDIS_LIST_NAME, key)
-        return key.decode() if isinstance(key, bytes) else key
-    else:
-        raise Exception("No API keys available in Redis list.")
+    return acquire_api_key()
+
 
 # Sample usage
 def delete_api_key(key_to_delete):
     """
-    Deletes a specific API key from the Redis list.
+    Removes a specific API key from the rotation.
     """
-    r.lrem(REDIS_LIST_NAME, 0, key_to_delete)
+    get_scheduler().remove(key_to_delete)
 
 if __name__ == "__main__":
-    # print("Current API keys order:", [k.decode() for k in r.lrange(REDIS_LIST_NAME, 0, -1)])
-    key = get_next_api_key()
-    # print("Using API key:", key)
-    # print("New API keys order:", [k.decode() for k in r.lrange(REDIS_LIST_NAME, 0, -1)])
-    # print(get_next_api_key())
-    # print(get_next_api_key())
-    # print(get_next_api_key())
-    # print(get_next_api_key())
-    # print(get_next_api_key())
-    # delete_api_key("GEMINI_API_KEY")
\ No newline at end of file
+    for _ in range(5):
+        print("Using API key:", acquire_api_key())
+    print(get_key_stats())
+    # delete_api_key("GEMINI_API_KEY")
@@ -0,0 +1,294 @@
+import os
+import re
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dotenv import load_dotenv
+from utils.api_key_manager import acquire_api_key, try_acquire_api_key, report_rate_limited, resolve_api_key
+from utils import metrics, tracing
+
+# Thin client for the Gemini generateContent REST endpoint.
+# Every call reserves its own key from the scheduler and sends it with that request only,
+# instead of configuring one process-wide key, so concurrent calls spread across all keys.
+
+load_dotenv()
+
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+# How many different keys to try when a call is rate limited.
+LLM_MAX_KEY_ATTEMPTS = int(os.getenv("LLM_MAX_KEY_ATTEMPTS", "3"))
+
+# Every call must finish within its deadline. If the first request has not answered by the
+# LLM_HEDGE_PERCENTILE of recent latencies, a duplicate goes out on a different key and the
+# first response wins. Until enough latencies are recorded LLM_HEDGE_DELAY_SECONDS is used.
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "60"))
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "1") == "1"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_DELAY_SECONDS", "8"))
+LLM_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "0.5"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_MAX_PARALLEL_CALLS = int(os.getenv("LLM_MAX_PARALLEL_CALLS", "32"))
+
+llm_calls = metrics.counter("llm_requests_total", "HTTP requests sent to Gemini, by outcome.")
+llm_hedges = metrics.counter("llm_hedged_requests_total", "Duplicate Gemini requests sent because the first was slow.")
+llm_hedge_wins = metrics.counter("llm_hedge_wins_total", "Calls answered by the hedged duplicate rather than the first request.")
+llm_deadlines = metrics.counter("llm_deadline_exceeded_total", "Calls that produced no answer within their deadline.")
+
+
+class LLMError(Exception):
+    """Raised when the LLM call fails for a reason other than a retryable rate limit."""
+
+
+class DeadlineExceeded(LLMError):
+    """Raised when no request of a call answered within its deadline."""
+
+
+class RateLimited(LLMError):
+    """Raised when a key receives a 429 / RESOURCE_EXHAUSTED response."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LatencyTracker:
+    """
+    Keeps the most recent successful call latencies to derive the hedging threshold.
+    """
+
+    def __init__(self, size=200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def __len__(self):
+        return len(self._samples)
+
+
+latencies = LatencyTracker()
+
+_session = None
+_session_lock = threading.Lock()
+_executor = None
+
+
+def get_session():
+    """
+    Returns the pooled HTTP session shared by all LLM calls in this process.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def get_executor():
+    """
+    Returns the thread pool that runs individual Gemini requests so callers can wait with a deadline.
+    """
+    global _executor
+    if _executor is None:
+        with _session_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=LLM_MAX_PARALLEL_CALLS, thread_name_prefix="llm")
+    return _executor
+
+
+def hedge_delay():
+    """
+    Seconds to wait for the first request before sending a hedged duplicate.
+    """
+    if len(latencies) < LLM_HEDGE_MIN_SAMPLES:
+        return LLM_HEDGE_DELAY_SECONDS
+    return max(LLM_HEDGE_MIN_DELAY_SECONDS, latencies.percentile(LLM_HEDGE_PERCENTILE))
+
+
+def _retry_after_seconds(response):
+    """
+    Reads the retry delay from a 429 response (Retry-After header or RetryInfo.retryDelay).
+    """
+    header = response.headers.get("Retry-After")
+    if header:
+        try:
+            return float(header)
+        except ValueError:
+            pass
+    match = re.search(r'"retryDelay"\s*:\s*"([\d.]+)s"', response.text or "")
+    return float(match.group(1)) if match else None
+
+
+def call_with_key(key_name, prompt, model_name=GEMINI_MODEL, timeout=None):
+    """
+    Sends one generateContent request authenticated with the given key.
+
+    Args:
+        key_name: Name of the environment variable holding the API key.
+        prompt: The prompt text.
+        model_name: Gemini model identifier.
+        timeout: Seconds to wait for the response (None waits indefinitely).
+
+    Returns:
+        dict: The parsed JSON response.
+    """
+    url = f"{GEMINI_API_BASE}/v1beta/models/{model_name}:generateContent"
+    headers = {"x-goog-api-key": resolve_api_key(key_name), "Content-Type": "application/json"}
+    body = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+    response = get_session().post(url, headers=headers, json=body, timeout=timeout)
+    if response.status_code == 429:
+        raise RateLimited(f"API key {key_name} is rate limited.", _retry_after_seconds(response))
+    if response.status_code >= 400:
+        raise LLMError(f"Gemini API returned {response.status_code}: {response.text[:500]}")
+    return response.json()
+
+
+def response_text(result):
+    """
+    Extracts the generated text from a generateContent response.
+    """
+    candidates = result.get("candidates") or []
+    if not candidates:
+        raise LLMError(f"Gemini API returned no candidates: {result.get('promptFeedback', result)}")
+    parts = candidates[0].get("content", {}).get("parts", [])
+    return "".join(part.get("text", "") for part in parts)
+
+
+class _Attempt:
+    """
+    One HTTP request of a call. A cancelled attempt's result is discarded when it returns.
+    """
+
+    def __init__(self, key_name, hedge):
+        self.key_name = key_name
+        self.hedge = hedge
+        self.cancelled = threading.Event()
+        self.future = None
+
+
+def _run_attempt(attempt, prompt, model_name, timeout):
+    started = time.monotonic()
+    try:
+        result = call_with_key(attempt.key_name, prompt, model_name, timeout)
+        text = response_text(result)
+    except RateLimited:
+        llm_calls.inc(outcome="rate_limited")
+        raise
+    except Exception:
+        llm_calls.inc(outcome="cancelled" if attempt.cancelled.is_set() else "error")
+        raise
+    if attempt.cancelled.is_set():
+        llm_calls.inc(outcome="cancelled")
+    else:
+        llm_calls.inc(outcome="ok")
+        latencies.record(time.monotonic() - started)
+    return text, result.get("usageMetadata", {})
+
+
+def generate_text(prompt, model_name=GEMINI_MODEL, deadline=None, hedge=LLM_HEDGE_ENABLED):
+    """
+    Generates text for a prompt within a deadline.
+
+    The first request goes out on the least recently used key. If it has not answered after
+    hedge_delay() seconds, a duplicate is sent on a different key; the first successful response
+    is returned. The other request is not aborted: it runs to completion (its socket timeouts are
+    bounded by the deadline) and its result is discarded. A rate-limited key is put on cooldown
+    and its request replaced on another key, up to LLM_MAX_KEY_ATTEMPTS requests in total.
+
+    Args:
+        prompt: The prompt text.
+        model_name: Gemini model identifier.
+        deadline: Seconds the whole call may take (default LLM_DEADLINE_SECONDS).
+        hedge: Whether to send a hedged duplicate for slow responses.
+
+    Returns:
+        str: The generated text.
+    """
+    deadline = LLM_DEADLINE_SECONDS if deadline is None else deadline
+    deadline_at = time.monotonic() + deadline
+    executor = get_executor()
+    attempts = []
+    sent = 0
+    last_error = None
+
+    def remaining():
+        return deadline_at - time.monotonic()
+
+    def start(key_name, is_hedge=False):
+        nonlocal sent
+        sent += 1
+        attempt = _Attempt(key_name, is_hedge)
+        # The socket timeouts are bounded by the deadline so a cancelled request cannot
+        # hold its pool thread for longer than the call it belonged to.
+        budget = max(remaining(), 0.1)
+        attempt.future = executor.submit(_run_attempt, attempt, prompt, model_name, (min(10.0, budget), budget))
+        attempts.append(attempt)
+
+    def cancel_all():
+        # Marks the remaining requests as losers and drops any not yet started; one already in
+        # flight finishes in its pool thread.
+        for attempt in attempts:
+            attempt.cancelled.set()
+            attempt.future.cancel()
+
+    start(acquire_api_key(max_wait=max(remaining(), 0)))
+    hedged = not hedge
+
+    while remaining() > 0:
+        wait_for = remaining() if hedged else min(remaining(), hedge_delay())
+        done, _ = wait([a.future for a in attempts], timeout=wait_for, return_when=FIRST_COMPLETED)
+
+        if not done:
+            if not hedged:
+                hedged = True
+                key_name = try_acquire_api_key(exclude=[a.key_name for a in attempts])
+                if key_name is not None:
+                    llm_hedges.inc()
+                    logging.info(f"Gemini call slower than {wait_for:.2f}s; hedging on key {key_name}.")
+                    start(key_name, is_hedge=True)
+            continue
+
+        for attempt in [a for a in attempts if a.future in done]:
+            error = attempt.future.exception()
+            if error is None:
+                if attempt.hedge:
+                    llm_hedge_wins.inc()
+                attempts.remove(attempt)
+                cancel_all()
+                text, usage = attempt.future.result()
+                # Recorded here, on the caller's thread, so the tokens count towards its request.
+                tracing.add_tokens(usage)
+                return text
+            attempts.remove(attempt)
+            last_error = error
+            if isinstance(error, RateLimited):
+                logging.warning(f"{error} Cooling it down and retrying with another key.")
+                report_rate_limited(attempt.key_name, error.retry_after)
+
+        if not attempts:
+            if not isinstance(last_error, RateLimited) or sent >= LLM_MAX_KEY_ATTEMPTS or remaining() <= 0:
+                raise last_error
+            start(acquire_api_key(max_wait=max(remaining(), 0)))
+
+    cancel_all()
+    llm_deadlines.inc()
+    raise DeadlineExceeded(f"No response from Gemini within {deadline:.1f}s.")
@@ -0,0 +1,125 @@
+import threading
+
+# Minimal in-process metrics registry rendered in the Prometheus text exposition format.
+# Values are per worker process; the /metrics endpoint reports the worker that served it.
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(label_key):
+    if not label_key:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in label_key) + "}"
+
+
+class Counter:
+    """
+    A monotonically increasing value, optionally split by labels.
+    """
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+# Upper bounds (seconds) suited to request stages from sub-millisecond lookups to slow LLM calls.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Histogram:
+    """
+    Counts observations into cumulative buckets, optionally split by labels.
+    """
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # label key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def count(self, **labels):
+        entry = self._values.get(_label_key(labels))
+        return entry[-1] if entry else 0
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, entry in self._values.items():
+                for bound, bucket_count in zip(self.buckets, entry):
+                    samples.append((self.name + "_bucket", key + (("le", f"{bound:g}"),), bucket_count))
+                samples.append((self.name + "_bucket", key + (("le", "+Inf"),), entry[-1]))
+                samples.append((self.name + "_sum", key, round(entry[-2], 6)))
+                samples.append((self.name + "_count", key, entry[-1]))
+        return samples
+
+
+def _get_or_create(cls, name, help_text, **kwargs):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = cls(name, help_text, **kwargs)
+            _registry[name] = metric
+        return metric
+
+
+def counter(name, help_text):
+    """
+    Returns the counter registered under name, creating it on first use.
+    """
+    return _get_or_create(Counter, name, help_text)
+
+
+def histogram(name, help_text, buckets=DEFAULT_BUCKETS):
+    """
+    Returns the histogram registered under name, creating it on first use.
+    """
+    return _get_or_create(Histogram, name, help_text, buckets=buckets)
+
+
+def render_prometheus():
+    """
+    Renders every registered metric in the Prometheus text format.
+    """
+    lines = []
+    with _registry_lock:
+        metrics = list(_registry.values())
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for sample_name, key, value in metric.samples():
+            lines.append(f"{sample_name}{_format_labels(key)} {value}")
+    return "\n".join(lines) + "\n"
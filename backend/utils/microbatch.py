@@ -0,0 +1,112 @@
+import os
+import time
+import threading
+from collections import deque
+from utils import metrics
+
+# Dynamic micro-batching: many threads each submit one item, a single batching thread per
+# process runs them through fn as one list. When the batching thread is free it waits at most
+# window seconds for items (until max_batch are waiting), runs them as one batch and hands every
+# caller its own result. Items arriving while a batch runs queue up for the next one, and the
+# window lets callers that just got their result join it too. A lone caller never waits: the
+# window is only waited out when the previous batch had more than one item or more than one item
+# is already waiting, i.e. when there is concurrency to collect.
+#
+# The thread is started on first use and again after a fork (gunicorn workers), so creating a
+# MicroBatcher at import time is cheap.
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+batch_sizes = metrics.histogram("microbatch_size", "Items per micro-batch, by batcher.", buckets=BATCH_SIZE_BUCKETS)
+queue_seconds = metrics.histogram("microbatch_queue_seconds",
+                                  "Time an item waited for its micro-batch to start, by batcher.",
+                                  buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1))
+run_seconds = metrics.histogram("microbatch_run_seconds", "Time spent running each micro-batch, by batcher.")
+
+
+class _Item:
+    __slots__ = ("value", "submitted", "done", "result", "error")
+
+    def __init__(self, value):
+        self.value = value
+        self.submitted = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """
+    Runs fn(list of items) -> sequence of results on batches of concurrently submitted items.
+    """
+
+    def __init__(self, name, fn, window=0.002, max_batch=32):
+        self.name = name
+        self.fn = fn
+        self.window = window
+        self.max_batch = max_batch
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._thread = None
+        self._pid = None
+        self._last_size = 0
+
+    def submit(self, value):
+        """
+        Adds value to the next batch and blocks until its result is ready.
+
+        Returns:
+            The result for value. An exception raised by fn is re-raised in every caller of that batch.
+        """
+        item = _Item(value)
+        with self._cond:
+            self._ensure_thread()
+            self._queue.append(item)
+            self._cond.notify()
+        item.done.wait()
+        if item.error is not None:
+            raise item.error
+        return item.result
+
+    def _ensure_thread(self):
+        # Threads do not survive a fork: the child starts its own (and drops the parent's queue).
+        if self._pid != os.getpid() or self._thread is None or not self._thread.is_alive():
+            if self._pid != os.getpid():
+                self._queue.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name=f"microbatch-{self.name}", daemon=True)
+            self._thread.start()
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            deadline = time.perf_counter() + self.window
+            while len(self._queue) < self.max_batch and (self._last_size > 1 or len(self._queue) > 1):
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = [self._queue.popleft() for _ in range(min(self.max_batch, len(self._queue)))]
+            self._last_size = len(batch)
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            started = time.perf_counter()
+            for item in batch:
+                queue_seconds.observe(started - item.submitted, batcher=self.name)
+            batch_sizes.observe(len(batch), batcher=self.name)
+            try:
+                results = self.fn([item.value for item in batch])
+                if len(results) != len(batch):
+                    raise ValueError(f"{self.name}: {len(results)} results for a batch of {len(batch)}")
+                for item, result in zip(batch, results):
+                    item.result = result
+            except BaseException as e:
+                for item in batch:
+                    item.error = e
+            run_seconds.observe(time.perf_counter() - started, batcher=self.name)
+            for item in batch:
+                item.done.set()
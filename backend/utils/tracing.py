@@ -0,0 +1,112 @@
+import time
+import contextvars
+from contextlib import contextmanager
+from utils import metrics
+
+# Per-request timing spans. app.py starts a trace for each request; code on the request's
+# thread records named stages with span(), LLM token usage with add_tokens() and cache
+# lookups with cache_lookup(). Every stage also feeds a process-wide histogram on /metrics,
+# and the request's own stages are returned to the client in a Server-Timing header.
+#
+# Work done on other threads (LLM pool threads, background jobs) is not attributed to the
+# request unless the result is recorded back on the request's thread.
+
+stage_seconds = metrics.histogram("request_stage_seconds", "Time spent in each stage of a request.")
+tokens_total = metrics.counter("llm_tokens_total", "Gemini tokens used, by kind (prompt, output, thoughts).")
+cache_lookups = metrics.counter("cache_lookups_total", "Cache lookups, by cache and result (hit, miss, stale).")
+
+_current = contextvars.ContextVar("trace", default=None)
+
+
+class Trace:
+    """
+    The stages, token counts and cache results of one request.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.spans = []    # (stage, seconds) in completion order
+        self.tokens = {}   # kind -> count
+        self.caches = {}   # cache name -> result
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """
+        Formats the trace as a Server-Timing header value (durations in milliseconds).
+        """
+        entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.spans]
+        entries += [f'cache-{cache};desc="{result}"' for cache, result in self.caches.items()]
+        if self.tokens:
+            entries.append('tokens;desc="' + " ".join(f"{k}={v}" for k, v in sorted(self.tokens.items())) + '"')
+        entries.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(entries)
+
+
+def start_trace(name):
+    """
+    Starts a trace for the current request and makes it the current one.
+    """
+    trace = Trace(name)
+    _current.set(trace)
+    return trace
+
+
+def end_trace():
+    """
+    Detaches and returns the current trace, recording its total duration.
+    """
+    trace = _current.get()
+    _current.set(None)
+    if trace is not None:
+        stage_seconds.observe(trace.elapsed(), stage="total", route=trace.name)
+    return trace
+
+
+def current_trace():
+    return _current.get()
+
+
+@contextmanager
+def span(stage):
+    """
+    Times a block as a named stage of the current request.
+    """
+    trace = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        stage_seconds.observe(seconds, stage=stage, route=trace.name if trace else "none")
+        if trace is not None:
+            trace.spans.append((stage, seconds))
+
+
+def add_tokens(usage):
+    """
+    Records token counts from a Gemini usageMetadata object.
+    """
+    counts = {
+        "prompt": usage.get("promptTokenCount", 0),
+        "output": usage.get("candidatesTokenCount", 0),
+        "thoughts": usage.get("thoughtsTokenCount", 0),
+    }
+    trace = _current.get()
+    for kind, count in counts.items():
+        if count:
+            tokens_total.inc(count, kind=kind)
+            if trace is not None:
+                trace.tokens[kind] = trace.tokens.get(kind, 0) + count
+
+
+def cache_lookup(cache, result):
+    """
+    Records the result ("hit", "miss" or "stale") of a cache lookup.
+    """
+    cache_lookups.inc(cache=cache, result=result)
+    trace = _current.get()
+    if trace is not None:
+        trace.caches[cache] = result
@@ -10,7 +10,9 @@ import { marked } from 'marked';
 
 
 interface PaperQuestion {
-  questions: string[];
+  questions?: string[];
+  status?: string;
+  status_url?: string;
 }
 
 export default function ChatPage() {
@@ -44,12 +46,28 @@ export default function ChatPage() {
         }
       };
 
+      // Papers that have not been analysed yet come back as 202 with a job to poll. Polling
+      // gives up after MAX_POLL_ATTEMPTS (about three minutes) and reports a failure.
+      const POLL_INTERVAL_MS = 2000;
+      const MAX_POLL_ATTEMPTS = 90;
+      const pollJob = (baseUrl: string, data: PaperQuestion, attempt = 0): Promise<PaperQuestion> => {
+        if (data.questions || !data.status_url || data.status === 'failed') return Promise.resolve(data);
+        if (attempt >= MAX_POLL_ATTEMPTS) return Promise.resolve({ status: 'failed' });
+        return new Promise(resolve => setTimeout(resolve, POLL_INTERVAL_MS))
+          .then(() => fetch(`${baseUrl}${data.status_url}`))
+          .then(res => {
+            if (!res.ok) throw new Error('Network response was not ok');
+            return res.json();
+          })
+          .then(next => pollJob(baseUrl, next, attempt + 1));
+      };
+
       const fetchData = (baseUrl: string | undefined) => {
         if (!baseUrl) return Promise.reject(new Error("Base URL is not defined"));
         return fetch(`${baseUrl}/${endpoint}`).then(res => {
           if (!res.ok) throw new Error('Network response was not ok');
           return res.json();
-        });
+        }).then(data => pollJob(baseUrl, data));
       };
 
       fetchData(primaryBackendUrl)